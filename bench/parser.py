@@ -0,0 +1,174 @@
+"""
+Time ThreadParserH and ThreadParserD against the regular expressions they replaced,
+on generated read.cgi pages and dat, with the messages decoded or left raw,
+and resumed from a known post:
+
+    python -m bench.parser [COUNT] [REPEAT]
+
+"broken" pages have the end of every tenth post cut off, which is where the regular expression backtracks.
+"""
+
+import re
+import statistics
+import sys
+import time
+from html import unescape
+from typing import Dict, List, Union
+
+from gochan.parser import ThreadParserD, ThreadParserH, tokenize
+
+POST = ('<div class="post" id="{n}" data-date="NG" data-userid="ID:{id}" data-id="{n}"><div class="meta">'
+        '<span class="number">{n}</span><span class="name"><b>{name}</b></span>'
+        '<span class="date">2020/05/01(金) 00:{m:02}:00.00</span><span class="uid">ID:{id}</span></div>'
+        '<div class="message">{open} {msg} {close}</div></div><br>')
+
+NAMES = [
+    "名無しさん",
+    '<a href="mailto:sage">名無しさん</a>',
+    '<a href="mailto:">風吹けば名無し</a>',
+    "名無し </b>◆Abc.dEf123 <b>",
+]
+
+MESSAGES = [
+    "本文{n}",
+    "一行目 <br> 二行目 <br>  <br> 四行目",
+    '<a href="../test/read.cgi/news4vip/1588219909/1" rel="noopener noreferrer" target="_blank" '
+    'class="reply_link">&gt;&gt;1</a> <br> それな&amp;これ',
+    '<a href="http://jump.5ch.net/?https://example.com/a.jpg" rel="nofollow" target="_blank">'
+    'https://example.com/a.jpg</a> <br> 画像',
+    "&lt;script&gt; &quot;引用&quot; &#x41;",
+]
+
+
+def make_page(count: int, broken: bool = False) -> str:
+    posts = []
+
+    for n in range(1, count + 1):
+        # Posts with ascii art are wrapped in one more span
+        (open_tag, close_tag) = (('<span class="escaped"><span class="AA">', "</span></span>") if n % 7 == 0
+                                 else ('<span class="escaped">', "</span>"))
+        post = POST.format(n=n, id="abcd%04d" % (n % 50), m=n % 60, name=NAMES[n % len(NAMES)],
+                           msg=MESSAGES[n % len(MESSAGES)].format(n=n), open=open_tag, close=close_tag)
+
+        if broken and n % 10 == 0:
+            post = post[:-len("</div></div><br>")]
+
+        posts.append(post)
+
+    return ('<html><head><title>スレッド\n</title></head><body><div class="thread">' + "".join(posts)
+            + "</div></body></html>")
+
+
+def make_dat(count: int) -> str:
+    lines = []
+
+    for n in range(1, count + 1):
+        name = NAMES[n % len(NAMES)]
+        mail = ""
+
+        if name.startswith("<a"):
+            (mail, name) = re.match(r'<a href="mailto:(.*?)">(.*?)</a>', name).groups()
+
+        msg = MESSAGES[n % len(MESSAGES)].format(n=n)
+        title = "スレッド" if n == 1 else ""
+        lines.append(f"{name}<>{mail}<>2020/05/01(金) 00:{n % 60:02}:00.00 ID:abcd{n % 50:04}<> {msg} <>{title}")
+
+    return "\n".join(lines) + "\n"
+
+
+def regex_dat_responses(dat: str) -> List[Dict[str, Union[str, int]]]:
+    """
+    ThreadParserD.responses as it was before the split, kept to compare against.
+    The line break pattern is the corrected ' ?<br> ' rather than the old '< ?<br> >', which never matched,
+    and the messages are tokenized in the same way, so that only the splitting differs.
+    """
+
+    re_res = re.compile(r"(.*?)<>(.*?)<>(.*? .*?) (.*?)<> (.*?) <>.*")
+    re_b = re.compile(r"</?b>")
+    br = re.compile(r' ?<br> ')
+    tag = re.compile(r'<.*?>')
+
+    responses = []
+
+    for i, l in enumerate(dat.split("\n"), 1):
+        m = re_res.search(l)
+
+        if m is None:
+            continue
+
+        msg = unescape(tag.sub("", br.sub("\n", m.group(5))))
+
+        responses.append({
+            "number": i, "name": re_b.sub("", m.group(1)), "mail": m.group(2), "date": m.group(3),
+            "id": m.group(4), "message": msg, "tokens": tokenize(msg)
+        })
+
+    return responses
+
+
+def regex_responses(html: str) -> List[Dict[str, Union[str, int]]]:
+    """
+    ThreadParserH.responses as it was before the scanner, kept to compare against.
+    The messages are tokenized in the same way, so that only the scanning differs.
+    """
+
+    re_res = re.compile(
+        r'<div class="post" id="(?P<num>\d+)".*?"name"><b>(<a href="mailto:(?P<mail>.*?)">)?(?P<name>.*?)(</a>)?'
+        r'</b></span>.*?"date">(?P<date>.*?)<.*?"uid">(?P<id>.*?)<.*?(<span.*?>)+? (?P<msg>.*?) (</span>)+?</div>'
+        r'</div><br>'
+    )
+
+    br = re.compile(r' ?<br> ')
+    tag = re.compile(r'<.*?>')
+
+    responses = []
+    for res in re_res.finditer(html):
+        msg = res.group("msg")
+        msg = br.sub("\n", msg)
+        msg = tag.sub("", msg)
+        msg = unescape(msg)
+
+        responses.append({
+            "number": int(res.group("num")), "name": tag.sub("", res.group("name")), "mail": res.group("mail"),
+            "date": res.group("date"), "id": res.group("id"), "message": msg, "tokens": tokenize(msg)
+        })
+
+    return responses
+
+
+def measure(name: str, fn, repeat: int):
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    print(f"{name:16} median {statistics.median(times) * 1000:8.1f} ms   min {min(times) * 1000:8.1f} ms")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    for broken in [False, True]:
+        html = make_page(count, broken)
+        label = "broken" if broken else "page"
+
+        measure(f"regex {label}", lambda: regex_responses(html), repeat)
+        measure(f"scanner {label}", lambda: ThreadParserH(html).responses(), repeat)
+
+    dat = make_dat(count)
+    measure("regex dat", lambda: regex_dat_responses(dat), repeat)
+    measure("split dat", lambda: ThreadParserD(dat).responses(), repeat)
+
+    # Messages left undecoded until they are read
+    html = make_page(count)
+    measure("lazy page", lambda: ThreadParserH(html).responses(lazy=True), repeat)
+    # An update which finds the last two posts new
+    measure("resumed page", lambda: ThreadParserH(html).responses(lazy=True, after=count - 2), repeat)
+    measure("lazy dat", lambda: ThreadParserD(dat).responses(lazy=True), repeat)
+
+
+if __name__ == "__main__":
+    main()
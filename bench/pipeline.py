@@ -0,0 +1,51 @@
+"""
+Time the client -> parser -> model pipeline for bbsmenu, a board and a thread.
+
+Record the responses once with network access:
+
+    GOCHAN_TRANSPORT=record GOCHAN_FIXTURE_PATH=fixtures python -m bench.pipeline hebi news4vip 1588219909
+
+then replay them anywhere, optionally with simulated latency (seconds) and bandwidth (bytes per second):
+
+    GOCHAN_TRANSPORT=replay GOCHAN_FIXTURE_PATH=fixtures GOCHAN_REPLAY_LATENCY=0.05 \\
+        python -m bench.pipeline hebi news4vip 1588219909
+"""
+
+import statistics
+import sys
+import time
+
+from gochan.client import transfer_stats
+from gochan.models.bbsmenu import Bbsmenu
+from gochan.models.board import Board
+from gochan.models.thread import Thread
+
+
+def measure(name: str, fn, repeat: int):
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    print(f"{name:10} median {statistics.median(times) * 1000:8.1f} ms   min {min(times) * 1000:8.1f} ms")
+
+
+def main():
+    if len(sys.argv) < 4:
+        print("usage: python -m bench.pipeline SERVER BOARD KEY [REPEAT]")
+        sys.exit(1)
+
+    (server, board, key) = sys.argv[1:4]
+    repeat = int(sys.argv[4]) if len(sys.argv) > 4 else 5
+
+    measure("bbsmenu", lambda: Bbsmenu().update(), repeat)
+    measure("board", lambda: Board(server, board).update(), repeat)
+    measure("thread", lambda: Thread(server, board, key).init(), repeat)
+
+    print(transfer_stats())
+
+
+if __name__ == "__main__":
+    main()
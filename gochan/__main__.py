@@ -6,6 +6,7 @@ from asciimatics.scene import Scene
 from asciimatics.screen import Screen
 from asciimatics.widgets import THEMES
 
+from gochan.effects.event_pump import EventPump
 from gochan.key import KeyLogger
 from gochan.keybinding import KEY_BINDINGS
 from gochan.models.app_context import AppContext
@@ -50,17 +51,18 @@ def demo(screen: Screen, scene: Scene, app_context: AppContext):
     ng_view = NGView(screen, NGVM(app_context))
     favorites_view = FavoritesView(screen, FavoritesVM(app_context))
     keylog = KeyLogger(screen)  # noqa: F841
+    pump = EventPump(screen)
 
     app_context.set_bbsmenu()
 
     scenes = [
         # Scene([keylog], -1, name="Keylog"),
-        Scene([bbsmenu_view], -1, name="Bbsmenu"),
-        Scene([board_view], -1, name="Board"),
-        Scene([thread_view], -1, name="Thread"),
-        Scene([image_view], -1, name="Image"),
-        Scene([ng_view], -1, name="NG"),
-        Scene([favorites_view], -1, name="Favorites")
+        Scene([pump, bbsmenu_view], -1, name="Bbsmenu"),
+        Scene([pump, board_view], -1, name="Board"),
+        Scene([pump, thread_view], -1, name="Thread"),
+        Scene([pump, image_view], -1, name="Image"),
+        Scene([pump, ng_view], -1, name="NG"),
+        Scene([pump, favorites_view], -1, name="Favorites")
     ]
 
     screen.play(scenes, stop_on_resize=True, start_scene=scene, unhandled_input=global_shortcuts, allow_int=True)
@@ -0,0 +1,734 @@
+import contextvars
+import io
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from email.utils import parsedate_to_datetime
+from http.client import HTTPException
+from pathlib import Path
+from typing import BinaryIO, Callable, Deque, Dict, List, Optional, Set, Tuple, Union
+from urllib.parse import urlencode, urljoin, urlsplit
+from urllib.request import HTTPError, URLError
+
+from gochan.client.breaker import CircuitBreaker, CircuitOpenError
+from gochan.client.cookies import CookieStore
+from gochan.client.document import Document, Validator
+from gochan.client.encoding import ACCEPT_ENCODING, ContentDecoder
+from gochan.client.hedge import LatencyTracker
+from gochan.client.httpcache import CacheEntry, HttpCache, endpoint_of
+from gochan.client.image import SNIFF_SIZE, ImageTooLargeError, NotAnImageError, is_image  # noqa: F401
+from gochan.client.pool import ConnectionPool, PooledResponse
+from gochan.client.priority import Priority, current_priority, priority  # noqa: F401
+from gochan.client.proxies import ProxyPool
+from gochan.client.ratelimit import RateLimiter
+from gochan.client.replay import RecordingTransport, ReplayTransport
+from gochan.client.scheduler import Scheduler
+from gochan.client.singleflight import SingleFlight
+from gochan.config import (CACHE_PATH, CIRCUIT_RESET_TIMEOUT, CIRCUIT_THRESHOLD, CONNECTION_IDLE_TIMEOUT, COOKIE,
+                           COOKIE_PATH, DAT_PROXIES, FIXTURE_PATH, HEDGE_DELAY, HOST_TIMEOUTS, HTTP_CACHE,
+                           HTTP_CACHE_SIZE, HTTP_CACHE_TTLS, MAX_CONNECTIONS_PER_HOST, MAX_IMAGE_SIZE, MAX_TRANSFERS,
+                           PROXY_COOLDOWN, RATE_LIMIT, RATE_LIMIT_BURST, REPLAY_BANDWIDTH, REPLAY_LATENCY,
+                           REQUEST_TIMEOUT, TRANSFER_LIMITS, TRANSPORT, USER_AGENT)
+
+MAX_REDIRECTS = 5
+MAX_RETRIES = 2
+CHUNK_SIZE = 16 * 1024
+
+
+class TransferRecord:
+    def __init__(self, url: str, wire_bytes: int, decoded_bytes: int):
+        super().__init__()
+        self.url = url
+        self.wire_bytes = wire_bytes
+        self.decoded_bytes = decoded_bytes
+
+
+pool = ConnectionPool(MAX_CONNECTIONS_PER_HOST, CONNECTION_IDLE_TIMEOUT)
+
+# Where requests are actually sent to
+if TRANSPORT == "record":
+    transport = RecordingTransport(pool, FIXTURE_PATH)
+elif TRANSPORT == "replay":
+    transport = ReplayTransport(FIXTURE_PATH, REPLAY_LATENCY, REPLAY_BANDWIDTH)
+else:
+    transport = pool
+
+# Concurrent fetches of the same url share one request
+flight = SingleFlight()
+
+# Replayed responses don't come from a server, so there's nothing to be polite to
+limiter = RateLimiter(RATE_LIMIT if TRANSPORT != "replay" else 0, RATE_LIMIT_BURST)
+
+breaker = CircuitBreaker(CIRCUIT_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+
+# Every transfer holds a slot of its priority class while it runs
+scheduler = Scheduler(MAX_TRANSFERS, {p: TRANSFER_LIMITS[p.name.lower()] for p in Priority
+                                      if p.name.lower() in TRANSFER_LIMITS})
+
+# Cookies set by the servers, sent back with every request to them and kept across runs
+cookies = CookieStore(COOKIE_PATH)
+
+# Responses of bbsmenu, subject.txt and dat, served without a request while they are fresh.
+# Off while recording or replaying, so that every request reaches the fixtures and none of them are kept.
+http_cache = HttpCache(CACHE_PATH / "http" if HTTP_CACHE and TRANSPORT == "network" else None, HTTP_CACHE_TTLS,
+                       HTTP_CACHE_SIZE)
+
+# Proxies which dat are fetched through when the caller doesn't give one
+proxies = ProxyPool(DAT_PROXIES, PROXY_COOLDOWN)
+
+# Which thread endpoint answers faster on each host
+latency = LatencyTracker(HEDGE_DELAY)
+hedge_executor = ThreadPoolExecutor(thread_name_prefix="gochan-hedge")
+
+# Called with (url, redirected url) for every redirect, from the thread that made the request
+redirect_listeners: List[Callable[[str, str], None]] = []
+
+# The most recent transfers, to compare bytes on the wire with bytes after decompression
+transfer_log: Deque[TransferRecord] = deque(maxlen=100)
+
+
+def get_bbsmenu() -> str:
+    url = "https://menu.5ch.net/bbsmenu.html"
+    return _get_content(url)
+
+
+def get_board(server: str, board: str) -> str:
+    url = f"https://{server}.5ch.net/{board}/subject.txt"
+    return _get_content(url)
+
+
+def get_board_document(server: str, board: str, validator: Optional[Validator] = None) -> Document:
+    url = f"https://{server}.5ch.net/{board}/subject.txt"
+    return _get_document(url, validator)
+
+
+def get_thread_h(server: str, board: str, key: str) -> str:
+    url = f"https://{server}.5ch.net/test/read.cgi/{board}/{key}/"
+    return _get_content(url)
+
+
+def get_thread_p(server: str, board: str, key: str, proxy: Optional[str] = None) -> str:
+    url = f"http://{server}.5ch.net:80/{board}/dat/{key}.dat"
+    return _get_dat(url, 0, proxy).text
+
+
+def get_dat_document(server: str, board: str, key: str, size: int = 0, proxy: Optional[str] = None) -> Document:
+    """
+    Fetch the part of the dat after size bytes with a Range request.
+    The range starts one byte early so that the last newline of the local copy can be verified;
+    if it doesn't match (the dat has been rewritten) or the server answers 416, the whole dat is fetched.
+    Without proxy, the dat is fetched through the proxy pool if one is configured.
+    """
+
+    url = f"http://{server}.5ch.net:80/{board}/dat/{key}.dat"
+    return _get_dat(url, size, proxy)
+
+
+def get_responses_after(server: str, board: str, key: str, after: int) -> str:
+    url = f"https://{server}.5ch.net/test/read.cgi/{board}/{key}/{after + 1}-"
+    return _get_content(url)
+
+
+def get_responses_after_document(server: str, board: str, key: str, after: int,
+                                 validator: Optional[Validator] = None) -> Document:
+    url = f"https://{server}.5ch.net/test/read.cgi/{board}/{key}/{after + 1}-"
+    return _get_document(url, validator)
+
+
+def get_responses_range_document(server: str, board: str, key: str, start: int, end: Optional[int] = None) -> Document:
+    """
+    Fetch responses start to end (to the last one if end is None). Response 1 is always included.
+    """
+
+    last = str(end) if end is not None else ""
+    url = f"https://{server}.5ch.net/test/read.cgi/{board}/{key}/{start}-{last}"
+    return _get_document(url)
+
+
+def get_last_responses_document(server: str, board: str, key: str, count: int) -> Document:
+    """
+    Fetch the last count responses. Response 1 is always included.
+    """
+
+    url = f"https://{server}.5ch.net/test/read.cgi/{board}/{key}/l{count}"
+    return _get_document(url)
+
+
+def get_thread_document(server: str, board: str, key: str, after: int, size: int = 0,
+                        validator: Optional[Validator] = None) -> Tuple[str, Document]:
+    """
+    Fetch the responses after after from read.cgi ("html") or the dat after size bytes ("dat"),
+    whichever has been faster on the server. If it doesn't answer within its p95 latency (or fails),
+    the other one is fired as well and the first successful one is used.
+
+    Returns
+    -------
+    ("html" or "dat", document)
+    """
+
+    html_url = f"https://{server}.5ch.net/test/read.cgi/{board}/{key}/{after + 1}-"
+    dat_url = f"http://{server}.5ch.net:80/{board}/dat/{key}.dat"
+
+    return _get_hedged(f"{server}.5ch.net", {
+        "html": lambda: _get_document(html_url, validator),
+        "dat": lambda: _get_dat(dat_url, size)
+    })
+
+
+def get_dat_documents(threads: List[Tuple[str, str, str]]) -> List[Union[Document, URLError]]:
+    """
+    Fetch the whole dat of each (server, board, key), e.g. to collect pastlogs, as many at a time as there are
+    proxies. A thread which can't be fetched gets its error in place of the document instead of failing the rest.
+    The transfers still take slots of the caller's priority class, so at Priority.ARCHIVAL they run one at a time
+    unless TRANSFER_LIMITS["archival"] is raised.
+    """
+
+    def fetch(url: str) -> Union[Document, URLError]:
+        try:
+            return _get_dat(url, 0)
+        except URLError as e:
+            return e
+
+    urls = [f"http://{server}.5ch.net:80/{board}/dat/{key}.dat" for (server, board, key) in threads]
+
+    with ThreadPoolExecutor(max(1, len(proxies)), thread_name_prefix="gochan-dat") as executor:
+        # Each worker needs its own copy of the context (the priority of the caller)
+        futures = [executor.submit(contextvars.copy_context().run, fetch, url) for url in urls]
+
+    return [f.result() for f in futures]
+
+
+def post_response(server: str, board: str, key: str, name: str, mail: str, msg: str) -> str:
+    url = f"https://{server}.5ch.net/test/bbs.cgi"
+    ref = f"https://{server}.5ch.net/test/read.cgi/{board}/{key}"
+    params = {"bbs": board, "key": key, "time": "1588219909",
+              "FROM": name, "mail": mail, "MESSAGE": msg, "submit": "書き込み", "oekaki_thread1": ""}
+
+    data = urlencode(params, encoding="shift-jis", errors="xmlcharrefreplace").encode()
+    # Cookies the server has set are added to (and take precedence over) the configured ones
+    hdrs = {"Referer": ref, "User-Agent": USER_AGENT, "Cookie": COOKIE,
+            "Content-Type": "application/x-www-form-urlencoded"}
+
+    with scheduler.slot(), _request("POST", url, hdrs, data) as res:
+        content = res.read().decode("shift-jis")
+
+    # The next fetch has to show the new response, however recently the cached copies were fetched
+    http_cache.remove(f"http://{server}.5ch.net:80/{board}/dat/{key}.dat")
+    http_cache.remove(f"https://{server}.5ch.net/{board}/subject.txt")
+
+    return content
+
+
+def save_image(url: str, path: Path, max_bytes: Optional[int] = MAX_IMAGE_SIZE) -> int:
+    """
+    Stream the image at url to path in chunks. It's written to a temporary file first,
+    so path never holds a partial image. Concurrent calls for the same path and max_bytes share one download.
+    Raises ImageTooLargeError past max_bytes and NotAnImageError if the body isn't an image.
+
+    Returns
+    -------
+    size of the image in bytes
+    """
+
+    # A caller with a larger limit mustn't get the error of one with a smaller limit
+    return flight.do(("SAVE", url, str(path), max_bytes), lambda: _save_image(url, path, max_bytes))
+
+
+def pool_stats() -> Dict[str, int]:
+    return pool.stats()
+
+
+def scheduler_stats() -> Dict[str, Dict[str, int]]:
+    return scheduler.stats()
+
+
+def http_cache_stats() -> Dict[str, int]:
+    return http_cache.stats()
+
+
+def coalesce_stats() -> Dict[str, int]:
+    return flight.stats()
+
+
+def proxy_stats() -> Dict[str, Dict[str, Union[float, bool, None]]]:
+    return proxies.stats()
+
+
+def latency_stats() -> Dict[str, Dict[str, Dict[str, Optional[float]]]]:
+    return latency.stats()
+
+
+def transfer_stats() -> Dict[str, int]:
+    records = list(transfer_log)
+
+    return {
+        "requests": len(records),
+        "wire_bytes": sum(x.wire_bytes for x in records),
+        "decoded_bytes": sum(x.decoded_bytes for x in records)
+    }
+
+
+def _get_hedged(host: str, fetchers: Dict[str, Callable[[], Document]]) -> Tuple[str, Document]:
+    order = latency.order(host, list(fetchers))
+    endpoints: Dict[Future, str] = {}
+    pending: Set[Future] = set()
+    error = None
+
+    while len(order) != 0 or len(pending) != 0:
+        timeout = None
+
+        if len(order) != 0:
+            endpoint = order.pop(0)
+            # Each worker needs its own copy of the context (the priority of the caller)
+            f = hedge_executor.submit(contextvars.copy_context().run, _timed, host, endpoint, fetchers[endpoint])
+            endpoints[f] = endpoint
+            pending.add(f)
+
+            if len(order) != 0:
+                timeout = latency.deadline(host, endpoint)
+
+        (done, pending) = wait(pending, timeout, FIRST_COMPLETED)
+
+        for f in done:
+            if f.exception() is None:
+                # The slower one is left to finish, so that its latency is recorded
+                return (endpoints[f], f.result())
+
+            if error is None:
+                error = f.exception()
+
+    raise error
+
+
+def _timed(host: str, endpoint: str, fetch: Callable[[], Document]) -> Document:
+    start = time.monotonic()
+
+    try:
+        doc = fetch()
+    except Exception:
+        latency.failed(host, endpoint)
+        raise
+
+    latency.record(host, endpoint, time.monotonic() - start)
+    return doc
+
+
+def _get_content(url: str, proxy: str = None) -> str:
+    return _get_document(url, proxy=proxy).text
+
+
+def _get_document(url: str, validator: Optional[Validator] = None, proxy: Optional[str] = None) -> Document:
+    """
+    Fetch url. If validator was obtained from the same url, the request is made conditional
+    and a 304 response is returned as a Document whose modified is False.
+    """
+
+    if validator is not None and validator.url == url:
+        key = ("GET", url, proxy, validator.etag, validator.last_modified)
+    else:
+        validator = None
+        key = ("GET", url, proxy)
+
+    return flight.do(key, lambda: _fetch_document(url, validator, proxy))
+
+
+def _fetch_document(url: str, validator: Optional[Validator], proxy: Optional[str]) -> Document:
+    endpoint = endpoint_of(url)
+    entry = http_cache.get(url) if endpoint is not None else None
+
+    if entry is not None and http_cache.is_fresh(entry, endpoint):
+        return _cached_document(entry, validator)
+
+    hdr = {"User-Agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING}
+
+    # A stale copy that has validators is revalidated instead, since it can answer whichever version the caller has
+    if entry is not None and len(entry.validator.headers()) != 0:
+        hdr.update(entry.validator.headers())
+    else:
+        entry = None
+
+        if validator is not None:
+            hdr.update(validator.headers())
+
+    with scheduler.slot(), _request("GET", url, hdr, proxy=proxy) as response:
+        if response.status == 304:
+            response.read()
+
+            if entry is not None:
+                return _cached_document(http_cache.refresh(entry, response.headers.items()), validator)
+
+            return Document(None, validator, False)
+
+        (content, length, body) = _read_text(url, response, proxy, endpoint is not None)
+        new_validator = Validator(url, response.getheader("ETag"), response.getheader("Last-Modified"))
+
+        if body is not None:
+            http_cache.store(url, body, response.headers.items())
+
+    return Document(content, new_validator, size=length)
+
+
+def _cached_document(entry: CacheEntry, validator: Optional[Validator]) -> Document:
+    if validator is not None and validator.matches(entry.validator):
+        return Document(None, validator, False)
+
+    return Document(entry.body.decode("shift-jis", "ignore"), entry.validator, size=len(entry.body))
+
+
+def _read_text(url: str, response: PooledResponse, proxy: Optional[str],
+               keep: bool = False) -> Tuple[str, int, Optional[bytes]]:
+    """
+    proxy is the one the response came through, which is blamed if the body can't be read
+
+    Returns
+    -------
+    (text, length of the decompressed body in bytes, the decompressed body if keep is True and caching is on)
+    """
+
+    decoder = ContentDecoder(response.getheader("Content-Encoding"), keep=keep and http_cache.enabled)
+    parts = []
+
+    while True:
+        try:
+            chunk = response.read(CHUNK_SIZE)
+        except (OSError, HTTPException) as e:
+            breaker.failed(_route(url, proxy))
+            raise URLError(e)
+
+        if not chunk:
+            break
+
+        parts.append(decoder.feed(chunk))
+
+    parts.append(decoder.flush())
+    transfer_log.append(TransferRecord(url, decoder.wire_bytes, decoder.decoded_bytes))
+
+    return ("".join(parts), decoder.decoded_bytes, bytes(decoder.body) if decoder.body is not None else None)
+
+
+def _save_image(url: str, path: Path, max_bytes: Optional[int]) -> int:
+    # Calls with different limits may download to the same path at once
+    tmp = path.with_name(f"{path.name}.{threading.get_ident()}.part")
+
+    try:
+        with open(tmp, "wb") as f:
+            size = _stream_image(url, f, max_bytes)
+
+        tmp.replace(path)
+    except BaseException:
+        if tmp.exists():
+            tmp.unlink()
+
+        raise
+
+    return size
+
+
+def _stream_image(url: str, out: BinaryIO, max_bytes: Optional[int]) -> int:
+    """
+    Copy the image at url to out chunk by chunk
+
+    Returns
+    -------
+    size of the image in bytes
+    """
+
+    with scheduler.slot() as p, _request("GET", url, {"User-Agent": USER_AGENT}) as response:
+        length = response.getheader("Content-Length")
+
+        # Don't start on an image that is known to be too large
+        if max_bytes is not None and length is not None and length.isdecimal() and int(length) > max_bytes:
+            raise ImageTooLargeError(url, max_bytes)
+
+        # The first bytes are held back until they show the body is an image
+        head = b""
+        size = 0
+
+        while True:
+            try:
+                chunk = response.read(CHUNK_SIZE)
+            except (OSError, HTTPException) as e:
+                breaker.failed(_route(url, None))
+                raise URLError(e)
+
+            if not chunk:
+                break
+
+            # Let waiting transfers of higher priority go first
+            scheduler.yield_to_higher(p)
+            size += len(chunk)
+
+            if max_bytes is not None and size > max_bytes:
+                raise ImageTooLargeError(url, max_bytes)
+
+            if head is not None:
+                head += chunk
+
+                if len(head) < SNIFF_SIZE:
+                    continue
+
+                if not is_image(head):
+                    raise NotAnImageError(url)
+
+                (chunk, head) = (head, None)
+
+            out.write(chunk)
+
+        if head is not None:
+            if not is_image(head):
+                raise NotAnImageError(url)
+
+            out.write(head)
+
+    return size
+
+
+def _get_dat(url: str, size: int, proxy: Optional[str] = None) -> Document:
+    if proxy is None and len(proxies) != 0:
+        return _get_dat_proxied(url, size)
+
+    if size <= 0:
+        return _get_document(url, proxy=proxy)
+
+    return flight.do(("RANGE", url, proxy, size), lambda: _fetch_dat_range(url, size, proxy))
+
+
+def _get_dat_proxied(url: str, size: int) -> Document:
+    """
+    Try the proxies of the pool in turn until one of them gets an answer from the server
+    """
+
+    error = None
+
+    for proxy in proxies.order():
+        start = time.monotonic()
+
+        try:
+            doc = _get_dat(url, size, proxy)
+        except URLError as e:
+            if not _is_proxy_failure(e):
+                # The proxy did its job; the server rejected the request or failed itself
+                proxies.record(proxy, time.monotonic() - start)
+                raise
+
+            proxies.failed(proxy)
+            error = e
+            continue
+
+        proxies.record(proxy, time.monotonic() - start)
+        return doc
+
+    raise error
+
+
+def _fetch_dat_range(url: str, size: int, proxy: Optional[str]) -> Document:
+    entry = http_cache.get(url)
+
+    # A fresh copy of the dat can answer the range if it lines up with what the caller has
+    if entry is not None and http_cache.is_fresh(entry, "dat") and entry.body[size - 1:size] == b"\n":
+        rest = entry.body[size:]
+        return Document(rest.decode("shift-jis", "ignore"), None, partial=True, size=len(rest), offset=size)
+
+    # Ranges apply to the encoded body, so the content must not be compressed
+    hdr = {"User-Agent": USER_AGENT, "Accept-Encoding": "identity", "Range": f"bytes={size - 1}-"}
+
+    try:
+        with scheduler.slot(), _request("GET", url, hdr, proxy=proxy) as response:
+            if response.status != 206:
+                # The server ignored the range
+                (content, length, body) = _read_text(url, response, proxy, True)
+
+                if body is not None:
+                    http_cache.store(url, body, response.headers.items())
+
+                return Document(content, None, size=length)
+
+            if response.read(1) == b"\n":
+                (content, length, body) = _read_text(url, response, proxy, entry is not None)
+
+                # The dat only grows, so the cached copy is extended when it has what the caller has
+                if body is not None and entry.body[size - 1:size] == b"\n":
+                    http_cache.store(url, entry.body[:size] + body, response.headers.items())
+
+                return Document(content, None, partial=True, size=length, offset=size)
+    except HTTPError as e:
+        if e.code != 416:
+            raise
+
+    # The dat has been rewritten or has shrunk. This is outside the block above so that the slot is released first.
+    return _get_document(url, proxy=proxy)
+
+
+def is_unavailable(e: URLError) -> bool:
+    """
+    Returns True if e means the server could not be reached or failed, rather than it rejected the request
+    """
+
+    return not isinstance(e, HTTPError) or e.code >= 500
+
+
+def _is_proxy_failure(e: URLError) -> bool:
+    """
+    Returns True if e means the proxy itself failed: it couldn't be connected to or couldn't reach the server.
+    Other errors are answers from the server, passed on by the proxy.
+    """
+
+    return not isinstance(e, HTTPError) or e.code in (502, 504)
+
+
+def is_undelivered(e: URLError) -> bool:
+    """
+    Returns True if e means the request was never handled by the server, so that sending it again can't repeat
+    a request which isn't idempotent. A timeout or a 500 may come after the server has acted on it.
+    """
+
+    if isinstance(e, CircuitOpenError):
+        return True
+
+    if isinstance(e, HTTPError):
+        return e.code in (429, 503)
+
+    return isinstance(e.reason, (ConnectionRefusedError, socket.gaierror))
+
+
+def _request(method: str, url: str, headers: Dict[str, str], body: Optional[bytes] = None,
+             proxy: Optional[str] = None) -> PooledResponse:
+    """
+    Send a request through the connection pool, following redirects.
+    Raises HTTPError and URLError in the same way as urlopen, and CircuitOpenError without sending anything
+    while the server (or the proxy) is considered down.
+    """
+
+    host = _route(url, proxy)
+
+    if not breaker.allow(host):
+        raise CircuitOpenError(host)
+
+    try:
+        response = _send(method, url, headers, body, proxy)
+    except URLError as e:
+        # Through a proxy, only what the proxy is to blame for counts against it
+        if _is_proxy_failure(e) if proxy is not None else is_unavailable(e):
+            breaker.failed(host)
+        else:
+            breaker.succeeded(host)
+
+        raise
+
+    breaker.succeeded(host)
+    return response
+
+
+def _send(method: str, url: str, headers: Dict[str, str], body: Optional[bytes], proxy: Optional[str]) \
+        -> PooledResponse:
+    """
+    GET requests which are throttled by the server (429, 503, connection reset) are retried after backing off
+    """
+
+    redirects = 0
+    retries = 0
+
+    while True:
+        host = urlsplit(url).hostname
+        route = _route(url, proxy)
+
+        if not limiter.try_acquire(route, current_priority()):
+            # A throttled host may keep us waiting for a minute, during which transfers to other hosts can go
+            with scheduler.released():
+                limiter.acquire(route, current_priority())
+
+        try:
+            response = transport.request(method, url, cookies.add_header(url, headers), body, proxy,
+                                         HOST_TIMEOUTS.get(host, REQUEST_TIMEOUT))
+        except (OSError, HTTPException) as e:
+            if isinstance(e, ConnectionResetError):
+                limiter.throttled(route)
+
+                if method == "GET" and retries < MAX_RETRIES:
+                    retries += 1
+                    continue
+
+            raise URLError(e)
+
+        cookies.extract(url, response.headers)
+
+        if response.status in (429, 503):
+            limiter.throttled(route, _retry_after(response.getheader("Retry-After")))
+
+            if method == "GET" and retries < MAX_RETRIES:
+                response.read()
+                retries += 1
+                continue
+        else:
+            limiter.succeeded(route)
+
+        location = response.getheader("Location")
+
+        if response.status in (301, 302, 303, 307, 308) and location is not None:
+            # Drain the body so that the connection goes back to the pool
+            response.read()
+            new_url = urljoin(url, location)
+
+            for listener in redirect_listeners:
+                listener(url, new_url)
+
+            url = new_url
+            redirects += 1
+
+            if redirects > MAX_REDIRECTS:
+                raise URLError("too many redirects")
+
+            if response.status == 303 or (response.status in (301, 302) and method == "POST"):
+                method = "GET"
+                body = None
+
+            continue
+
+        if response.status >= 400:
+            data = response.read()
+            raise HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(data))
+
+        return response
+
+
+def _route(url: str, proxy: Optional[str]) -> str:
+    """
+    What a request is rate limited and circuit broken by: the host, or the proxy which reaches it
+    from an address of its own
+    """
+
+    return proxy if proxy is not None else urlsplit(url).hostname
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+
+    if value.strip().isdecimal():
+        return float(value)
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def download_image(url: str, max_bytes: Optional[int] = MAX_IMAGE_SIZE) -> Union[io.BytesIO, HTTPError, URLError]:
+    """
+    Download the image at url into memory, for when it isn't going to be cached.
+    Limited and checked the same way as save_image.
+    """
+
+    buffer = io.BytesIO()
+
+    try:
+        _stream_image(url, buffer, max_bytes)
+    except HTTPError as e:
+        return e
+    except URLError as e:
+        return e
+
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,112 @@
+"""
+Coroutine versions of the functions in gochan.client.
+
+The standard library has no asynchronous HTTP client, so requests run on a pool of worker threads
+and share the transport (connection pool, decoding, validators) with the blocking functions.
+"""
+
+import asyncio
+import contextvars
+import functools
+import io
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Awaitable, List, Optional, Tuple, Union
+from urllib.request import HTTPError, URLError
+
+import gochan.client as client
+from gochan.client.document import Document, Validator
+from gochan.config import MAX_CLIENT_WORKERS, MAX_IMAGE_SIZE
+
+executor = ThreadPoolExecutor(MAX_CLIENT_WORKERS, thread_name_prefix="gochan-client")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+async def get_bbsmenu() -> str:
+    return await _run(client.get_bbsmenu)
+
+
+async def get_board(server: str, board: str) -> str:
+    return await _run(client.get_board, server, board)
+
+
+async def get_board_document(server: str, board: str, validator: Optional[Validator] = None) -> Document:
+    return await _run(client.get_board_document, server, board, validator)
+
+
+async def get_thread_p(server: str, board: str, key: str, proxy: Optional[str] = None) -> str:
+    return await _run(client.get_thread_p, server, board, key, proxy)
+
+
+async def get_dat_document(server: str, board: str, key: str, size: int = 0,
+                           proxy: Optional[str] = None) -> Document:
+    return await _run(client.get_dat_document, server, board, key, size, proxy)
+
+
+async def get_dat_documents(threads: List[Tuple[str, str, str]]) -> List[Union[Document, URLError]]:
+    return await _run(client.get_dat_documents, threads)
+
+
+async def get_responses_after(server: str, board: str, key: str, after: int) -> str:
+    return await _run(client.get_responses_after, server, board, key, after)
+
+
+async def get_responses_after_document(server: str, board: str, key: str, after: int,
+                                       validator: Optional[Validator] = None) -> Document:
+    return await _run(client.get_responses_after_document, server, board, key, after, validator)
+
+
+async def get_responses_range_document(server: str, board: str, key: str, start: int,
+                                       end: Optional[int] = None) -> Document:
+    return await _run(client.get_responses_range_document, server, board, key, start, end)
+
+
+async def get_last_responses_document(server: str, board: str, key: str, count: int) -> Document:
+    return await _run(client.get_last_responses_document, server, board, key, count)
+
+
+async def get_thread_document(server: str, board: str, key: str, after: int, size: int = 0,
+                              validator: Optional[Validator] = None) -> Tuple[str, Document]:
+    return await _run(client.get_thread_document, server, board, key, after, size, validator)
+
+
+async def post_response(server: str, board: str, key: str, name: str, mail: str, msg: str) -> str:
+    return await _run(client.post_response, server, board, key, name, mail, msg)
+
+
+async def download_image(url: str, max_bytes: Optional[int] = MAX_IMAGE_SIZE) -> Union[io.BytesIO, HTTPError, URLError]:
+    return await _run(client.download_image, url, max_bytes)
+
+
+async def save_image(url: str, path: Path, max_bytes: Optional[int] = MAX_IMAGE_SIZE) -> int:
+    return await _run(client.save_image, url, path, max_bytes)
+
+
+def run_in_background(coro: Awaitable) -> Future:
+    """
+    Schedule coro on the background event loop, which is started on first use.
+    This can be called from any thread; the result is delivered through the returned Future.
+    """
+
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop())
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="gochan-loop", daemon=True).start()
+
+        return _loop
+
+
+async def _run(fn, *args):
+    loop = asyncio.get_running_loop()
+    # Carry context variables over to the worker thread
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(ctx.run, fn, *args))
@@ -0,0 +1,68 @@
+import threading
+import time
+from typing import Dict
+from urllib.error import URLError
+
+
+class CircuitOpenError(URLError):
+    """
+    Raised without touching the network while the circuit of the host is open
+    """
+
+    def __init__(self, host: str):
+        super().__init__(f"{host} is unavailable")
+        self.host = host
+
+
+class _Circuit:
+    def __init__(self):
+        super().__init__()
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+
+class CircuitBreaker:
+    """
+    Open the circuit of a host after threshold consecutive failures.
+    After reset_timeout seconds a single trial request is let through (half-open);
+    its success closes the circuit and its failure opens it again.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        super().__init__()
+        self._threshold = threshold
+        self._reset_timeout = reset_timeout
+        self._circuits: Dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, host: str) -> bool:
+        with self._lock:
+            c = self._circuits.get(host)
+
+            if c is None or c.opened_at is None:
+                return True
+
+            if time.monotonic() - c.opened_at < self._reset_timeout or c.trial:
+                return False
+
+            c.trial = True
+            return True
+
+    def is_open(self, host: str) -> bool:
+        with self._lock:
+            c = self._circuits.get(host)
+            return c is not None and c.opened_at is not None
+
+    def succeeded(self, host: str):
+        with self._lock:
+            self._circuits.pop(host, None)
+
+    def failed(self, host: str):
+        with self._lock:
+            c = self._circuits.setdefault(host, _Circuit())
+            c.failures += 1
+            c.trial = False
+
+            if c.failures >= self._threshold:
+                c.opened_at = time.monotonic()
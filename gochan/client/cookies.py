@@ -0,0 +1,92 @@
+import threading
+from http.cookiejar import LoadError, LWPCookieJar
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.request import Request
+
+
+class _Headers:
+    # What CookieJar.extract_cookies expects of a response
+    def __init__(self, headers):
+        super().__init__()
+        self._headers = headers
+
+    def info(self):
+        return self._headers
+
+
+class CookieStore:
+    """
+    Cookies received from each host, sent back to the same host (following the usual domain and path rules)
+    and saved to path, session cookies included, so that they survive restarts
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        super().__init__()
+        self._path = path
+        self._jar = LWPCookieJar()
+        self._lock = threading.Lock()
+
+        if path is not None and path.is_file():
+            try:
+                self._jar.load(str(path), ignore_discard=True)
+            except (LoadError, OSError):
+                pass
+
+    def add_header(self, url: str, headers: Dict[str, str]) -> Dict[str, str]:
+        """
+        Returns
+        -------
+        copy of headers with the cookies for url added. Cookies already in headers are kept
+        unless a cookie of the same name has been received.
+        """
+
+        request = Request(url)
+
+        with self._lock:
+            self._jar.add_cookie_header(request)
+
+        received = request.get_header("Cookie")
+
+        if received is None:
+            return headers
+
+        cookies = {}
+
+        for k, v in headers.items():
+            if k.lower() == "cookie":
+                cookies.update(_parse(v))
+
+        cookies.update(_parse(received))
+
+        result = {k: v for k, v in headers.items() if k.lower() != "cookie"}
+        result["Cookie"] = "; ".join(f"{k}={v}" for k, v in cookies.items())
+
+        return result
+
+    def extract(self, url: str, response_headers):
+        with self._lock:
+            self._jar.extract_cookies(_Headers(response_headers), Request(url))
+
+    def save(self):
+        if self._path is None:
+            return
+
+        with self._lock:
+            self._path.parent.mkdir(mode=0o777, parents=True, exist_ok=True)
+            self._jar.save(str(self._path), ignore_discard=True)
+
+    def clear(self):
+        with self._lock:
+            self._jar.clear()
+
+
+def _parse(header: str) -> Dict[str, str]:
+    cookies = {}
+
+    for pair in header.split(";"):
+        if "=" in pair:
+            (k, v) = pair.split("=", 1)
+            cookies[k.strip()] = v.strip()
+
+    return cookies
@@ -0,0 +1,59 @@
+from typing import Dict, Optional
+
+
+class Validator:
+    """
+    Cache validators (ETag / Last-Modified) of a document fetched from url
+    """
+
+    def __init__(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        super().__init__()
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def headers(self) -> Dict[str, str]:
+        hdrs = {}
+
+        if self.etag is not None:
+            hdrs["If-None-Match"] = self.etag
+
+        if self.last_modified is not None:
+            hdrs["If-Modified-Since"] = self.last_modified
+
+        return hdrs
+
+    def matches(self, other: "Validator") -> bool:
+        """
+        Returns True if both identify the same version of the same url
+        """
+
+        if self.etag is None and self.last_modified is None:
+            return False
+
+        return (self.url, self.etag, self.last_modified) == (other.url, other.etag, other.last_modified)
+
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        return {"url": self.url, "etag": self.etag, "last_modified": self.last_modified}
+
+    @staticmethod
+    def from_dict(d: Dict[str, Optional[str]]) -> "Validator":
+        return Validator(d["url"], d.get("etag"), d.get("last_modified"))
+
+
+class Document:
+    """
+    Result of a conditional fetch. If modified is False, the server answered 304 and text is None.
+    If partial is True, text is only the part appended after offset, the byte length the caller had.
+    size is the length of the (decompressed) body in bytes.
+    """
+
+    def __init__(self, text: Optional[str], validator: Optional[Validator], modified: bool = True,
+                 partial: bool = False, size: int = 0, offset: int = 0):
+        super().__init__()
+        self.text = text
+        self.validator = validator
+        self.modified = modified
+        self.partial = partial
+        self.size = size
+        self.offset = offset
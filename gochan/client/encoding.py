@@ -0,0 +1,65 @@
+import codecs
+import zlib
+from typing import Optional
+
+ACCEPT_ENCODING = "gzip, deflate"
+
+
+class ContentDecoder:
+    """
+    Decompress (gzip/deflate) and decode a response body chunk by chunk,
+    so that the whole compressed body never has to be held in memory.
+    If keep is True, the decompressed bytes are kept in body as well.
+    """
+
+    def __init__(self, content_encoding: Optional[str], charset: str = "shift-jis", errors: str = "ignore",
+                 keep: bool = False):
+        super().__init__()
+        self._content_encoding = (content_encoding or "").strip().lower()
+        self._decoder = codecs.getincrementaldecoder(charset)(errors)
+        self._decompressor = None
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        self.body = bytearray() if keep else None
+
+        if self._content_encoding in ("gzip", "x-gzip"):
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self._content_encoding == "deflate":
+            self._decompressor = zlib.decompressobj()
+
+    def feed(self, data: bytes) -> str:
+        self.wire_bytes += len(data)
+
+        if self._decompressor is not None:
+            data = self._decompress(data)
+
+        self.decoded_bytes += len(data)
+
+        if self.body is not None:
+            self.body += data
+
+        return self._decoder.decode(data)
+
+    def flush(self) -> str:
+        data = b""
+
+        if self._decompressor is not None:
+            data = self._decompressor.flush()
+
+        self.decoded_bytes += len(data)
+
+        if self.body is not None:
+            self.body += data
+
+        return self._decoder.decode(data, final=True)
+
+    def _decompress(self, data: bytes) -> bytes:
+        try:
+            return self._decompressor.decompress(data)
+        except zlib.error:
+            # Some servers send raw deflate without the zlib header
+            if self._content_encoding == "deflate" and self.decoded_bytes == 0:
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+                return self._decompressor.decompress(data)
+
+            raise
@@ -0,0 +1,122 @@
+import bisect
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Upper bounds of the buckets in seconds, from 10ms growing by half each; the last bucket is for anything slower
+BUCKET_BOUNDS = [0.01 * 1.5 ** i for i in range(24)]
+
+
+class LatencyHistogram:
+    """
+    Counts of latencies in exponentially sized buckets.
+    When max_count samples have been recorded the counts are halved, so that old samples fade out.
+    """
+
+    def __init__(self, max_count: int = 200):
+        super().__init__()
+        self._max_count = max_count
+        self._counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+
+    def record(self, seconds: float):
+        """
+        Failures are recorded as an infinite latency
+        """
+
+        self._counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+
+        if self.count >= self._max_count:
+            self._counts = [x // 2 for x in self._counts]
+            self.count = sum(self._counts)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        Returns
+        -------
+        upper bound of the bucket the p-th percentile (0 to 100) falls in, inf if it's in the last bucket,
+        or None if nothing has been recorded
+        """
+
+        if self.count == 0:
+            return None
+
+        rank = self.count * p / 100
+        total = 0
+
+        for (i, c) in enumerate(self._counts):
+            total += c
+
+            if total >= rank and c != 0:
+                return BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else float("inf")
+
+        return float("inf")
+
+
+class LatencyTracker:
+    """
+    Latency histograms of each endpoint of each host, used to choose the endpoint to try first
+    and how long to wait for it before trying another one.
+    Until an endpoint has min_samples samples, initial_delay is used as its deadline.
+    """
+
+    def __init__(self, initial_delay: float, min_samples: int = 5):
+        super().__init__()
+        self._initial_delay = initial_delay
+        self._min_samples = min_samples
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, host: str, endpoint: str, seconds: float):
+        with self._lock:
+            self._histograms.setdefault((host, endpoint), LatencyHistogram()).record(seconds)
+
+    def failed(self, host: str, endpoint: str):
+        self.record(host, endpoint, float("inf"))
+
+    def order(self, host: str, endpoints: List[str]) -> List[str]:
+        """
+        Sort endpoints by median latency. Endpoints without enough samples come first so that they get measured;
+        among them the given order is kept.
+        """
+
+        def median(endpoint: str) -> float:
+            p = self._percentile(host, endpoint, 50)
+            return p if p is not None else 0
+
+        return sorted(endpoints, key=median)
+
+    def deadline(self, host: str, endpoint: str) -> float:
+        """
+        Seconds to wait for endpoint before firing the next one: its p95 latency
+        """
+
+        p = self._percentile(host, endpoint, 95)
+
+        if p is None or p == float("inf"):
+            return self._initial_delay
+
+        return p
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, Optional[float]]]]:
+        with self._lock:
+            keys = list(self._histograms)
+
+        d = {}
+        for (host, endpoint) in keys:
+            d.setdefault(host, {})[endpoint] = {
+                "count": self._histograms[(host, endpoint)].count,
+                "p50": self._percentile(host, endpoint, 50),
+                "p95": self._percentile(host, endpoint, 95)
+            }
+
+        return d
+
+    def _percentile(self, host: str, endpoint: str, p: float) -> Optional[float]:
+        with self._lock:
+            h = self._histograms.get((host, endpoint))
+
+            if h is None or h.count < self._min_samples:
+                return None
+
+            return h.percentile(p)
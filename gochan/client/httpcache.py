@@ -0,0 +1,270 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from gochan.client.document import Validator
+
+# Headers about the connection or the encoding on the wire rather than the body itself
+SKIPPED_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-encoding", "content-length",
+                   "content-range", "set-cookie"}
+
+DAT_PATH = re.compile(r"/dat/\d+\.dat$")
+
+
+def endpoint_of(url: str) -> Optional[str]:
+    """
+    Returns
+    -------
+    "bbsmenu", "subject" or "dat" for the documents the cache applies to, otherwise None
+    """
+
+    path = urlsplit(url).path
+
+    if path.endswith("/bbsmenu.html"):
+        return "bbsmenu"
+
+    if path.endswith("/subject.txt"):
+        return "subject"
+
+    if DAT_PATH.search(path) is not None:
+        return "dat"
+
+    return None
+
+
+class CacheEntry:
+    """
+    Body of a response (after decompression) with its headers and the time it was fetched (or last revalidated)
+    """
+
+    def __init__(self, url: str, body: bytes, headers: List[Tuple[str, str]], fetched: float):
+        super().__init__()
+        self.url = url
+        self.body = body
+        self.headers = headers
+        self.fetched = fetched
+
+    def header(self, name: str) -> Optional[str]:
+        for k, v in self.headers:
+            if k.lower() == name.lower():
+                return v
+
+        return None
+
+    @property
+    def validator(self) -> Validator:
+        return Validator(self.url, self.header("ETag"), self.header("Last-Modified"))
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched
+
+
+class HttpCache:
+    """
+    Responses kept under path as <hash>.json (url, headers, fetch and access time) and <hash>.body.
+    An entry is fresh, and served without a request, until it is older than the ttl of its endpoint;
+    after that it is revalidated with its validators. The least recently used entries are removed
+    once the bodies take more than max_bytes. Nothing is kept if path is None.
+    """
+
+    def __init__(self, path: Optional[Path], ttls: Dict[str, float], max_bytes: int):
+        super().__init__()
+        self._path = path
+        self._ttls = ttls
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Hash of each entry to the size of its body, least recently used first. Read from the metadata on first use.
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._total = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._path is not None
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        if self._path is None:
+            return None
+
+        (meta_path, body_path) = self._paths(url)
+
+        with self._lock:
+            try:
+                meta = json.loads(meta_path.read_text())
+                body = body_path.read_bytes()
+            except (OSError, ValueError):
+                return None
+
+            # Written by a different url with the same hash, or left half written
+            if meta["url"] != url or meta["size"] != len(body):
+                return None
+
+            # Access times aren't reliable on the file system (noatime, relatime), so they're kept in the metadata
+            meta["accessed"] = time.time()
+
+            try:
+                self._write_meta(meta_path, meta)
+            except OSError:
+                pass
+
+            self._load_index()
+            self._touch(meta_path.stem, len(body))
+
+        return CacheEntry(url, body, [tuple(x) for x in meta["headers"]], meta["fetched"])
+
+    def is_fresh(self, entry: CacheEntry, endpoint: str) -> bool:
+        return entry.age < self._ttls.get(endpoint, 0)
+
+    def store(self, url: str, body: bytes, headers: List[Tuple[str, str]]) -> Optional[CacheEntry]:
+        """
+        Keep the response unless the server forbids it (Cache-Control: no-store)
+        """
+
+        if self._path is None:
+            return None
+
+        for k, v in headers:
+            if k.lower() == "cache-control" and "no-store" in v.lower():
+                self.remove(url)
+                return None
+
+        entry = CacheEntry(url, body, [(k, v) for (k, v) in headers if k.lower() not in SKIPPED_HEADERS],
+                           time.time())
+        self._write(entry, True)
+        self.trim()
+
+        return entry
+
+    def refresh(self, entry: CacheEntry, headers: List[Tuple[str, str]]) -> CacheEntry:
+        """
+        Mark entry as fetched now after the server answered 304, taking the headers sent with it
+        """
+
+        names = {k.lower() for (k, v) in headers if k.lower() not in SKIPPED_HEADERS}
+        merged = [(k, v) for (k, v) in entry.headers if k.lower() not in names]
+        merged += [(k, v) for (k, v) in headers if k.lower() not in SKIPPED_HEADERS]
+
+        entry = CacheEntry(entry.url, entry.body, merged, time.time())
+
+        if self._path is not None:
+            self._write(entry, False)
+
+        return entry
+
+    def remove(self, url: str):
+        if self._path is None:
+            return
+
+        with self._lock:
+            self._load_index()
+            self._discard(hashlib.sha1(url.encode()).hexdigest())
+
+    def trim(self):
+        """
+        Remove the least recently used entries until the bodies fit in max_bytes
+        """
+
+        if self._path is None:
+            return
+
+        with self._lock:
+            self._load_index()
+
+            while self._total > self._max_bytes and len(self._index) != 0:
+                self._discard(next(iter(self._index)))
+
+    def clear(self):
+        if self._path is None or not self._path.exists():
+            return
+
+        with self._lock:
+            for p in self._path.iterdir():
+                p.unlink()
+
+            self._index = OrderedDict()
+            self._total = 0
+
+    def stats(self) -> Dict[str, int]:
+        if self._path is None:
+            return {"entries": 0, "bytes": 0}
+
+        with self._lock:
+            self._load_index()
+            return {"entries": len(self._index), "bytes": self._total}
+
+    def _write(self, entry: CacheEntry, with_body: bool):
+        (meta_path, body_path) = self._paths(entry.url)
+        meta = {"url": entry.url, "size": len(entry.body), "headers": entry.headers, "fetched": entry.fetched,
+                "accessed": time.time()}
+
+        with self._lock:
+            self._path.mkdir(mode=0o777, parents=True, exist_ok=True)
+
+            # Written to temporary files first so that an interrupted write doesn't leave a broken entry
+            if with_body:
+                tmp = body_path.with_name(body_path.name + ".part")
+                tmp.write_bytes(entry.body)
+                tmp.replace(body_path)
+
+            self._write_meta(meta_path, meta)
+            self._load_index()
+            self._touch(meta_path.stem, len(entry.body))
+
+    def _write_meta(self, meta_path: Path, meta: Dict):
+        tmp = meta_path.with_name(meta_path.name + ".part")
+        tmp.write_text(json.dumps(meta, ensure_ascii=False))
+        tmp.replace(meta_path)
+
+    def _load_index(self):
+        """
+        Read the sizes and access times of the entries, once. Called with the lock held.
+        """
+
+        if self._index is not None:
+            return
+
+        entries = []
+
+        if self._path.exists():
+            for meta_path in self._path.glob("*.json"):
+                try:
+                    meta = json.loads(meta_path.read_text())
+                except (OSError, ValueError):
+                    continue
+
+                entries.append((meta.get("accessed", meta["fetched"]), meta_path.stem, meta["size"]))
+
+        entries.sort()
+        self._index = OrderedDict((name, size) for (_, name, size) in entries)
+        self._total = sum(self._index.values())
+
+    def _touch(self, name: str, size: int):
+        """
+        Record that the entry was used just now. Called with the lock held.
+        """
+
+        self._total += size - self._index.pop(name, 0)
+        self._index[name] = size
+
+    def _discard(self, name: str):
+        """
+        Called with the lock held
+        """
+
+        self._total -= self._index.pop(name, 0)
+
+        for p in self._files(name):
+            if p.exists():
+                p.unlink()
+
+    def _paths(self, url: str) -> Tuple[Path, Path]:
+        return self._files(hashlib.sha1(url.encode()).hexdigest())
+
+    def _files(self, name: str) -> Tuple[Path, Path]:
+        return (self._path.joinpath(name + ".json"), self._path.joinpath(name + ".body"))
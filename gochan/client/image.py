@@ -0,0 +1,37 @@
+from urllib.error import URLError
+
+# Bytes needed to tell the formats below apart
+SNIFF_SIZE = 12
+
+
+class ImageTooLargeError(URLError):
+    """
+    Raised when an image turns out to be larger than the limit
+    """
+
+    def __init__(self, url: str, max_bytes: int):
+        super().__init__(f"{url} is larger than {max_bytes} bytes")
+        self.url = url
+        self.max_bytes = max_bytes
+
+
+class NotAnImageError(URLError):
+    """
+    Raised when the body doesn't start like any image format we can show
+    """
+
+    def __init__(self, url: str):
+        super().__init__(f"{url} is not an image")
+        self.url = url
+
+
+def is_image(head: bytes) -> bool:
+    """
+    Check the magic bytes at the start of a file for JPEG, PNG, GIF, BMP and WebP
+    """
+
+    return (head.startswith(b"\xff\xd8\xff")
+            or head.startswith(b"\x89PNG\r\n\x1a\n")
+            or head.startswith(b"GIF87a") or head.startswith(b"GIF89a")
+            or head.startswith(b"BM")
+            or (head.startswith(b"RIFF") and head[8:12] == b"WEBP"))
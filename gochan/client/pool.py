@@ -0,0 +1,203 @@
+import threading
+import time
+from http.client import HTTPConnection, HTTPException, HTTPResponse, HTTPSConnection
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# (scheme, host, port, proxy)
+PoolKey = Tuple[str, str, int, Optional[str]]
+
+# Requests which may be sent again on a new connection when a reused one turns out to be dead
+IDEMPOTENT_METHODS = ("GET", "HEAD")
+
+
+class PooledResponse:
+    """
+    Wrap a HTTPResponse and give the connection back to the pool once the body has been read to the end
+    """
+
+    def __init__(self, pool: "ConnectionPool", key: PoolKey, conn: HTTPConnection, response: HTTPResponse):
+        super().__init__()
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+        self._response = response
+        self._done = False
+
+    @property
+    def status(self) -> int:
+        return self._response.status
+
+    @property
+    def reason(self) -> str:
+        return self._response.reason
+
+    @property
+    def headers(self):
+        return self._response.headers
+
+    def getheader(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self._response.getheader(name, default)
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        data = self._response.read(amt)
+
+        # Reading past the end must not give the connection back a second time
+        if self._response.isclosed() and not self._done:
+            self._finish()
+
+        return data
+
+    def close(self):
+        if not self._done:
+            self._finish()
+
+    def _finish(self):
+        self._done = True
+
+        # The connection can be reused only if the whole body was consumed
+        if self._response.isclosed() and not self._response.will_close:
+            self._pool._release(self._key, self._conn)
+        else:
+            self._response.close()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Keep persistent HTTP/1.1 connections per host so that successive requests to the same server skip
+    DNS lookup and TCP/TLS handshakes
+    """
+
+    def __init__(self, max_connections: int, idle_timeout: float):
+        super().__init__()
+        self._max_connections = max_connections
+        self._idle_timeout = idle_timeout
+        self._idle: Dict[PoolKey, List[Tuple[HTTPConnection, float]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def request(self, method: str, url: str, headers: Dict[str, str], body: Optional[bytes] = None,
+                proxy: Optional[str] = None, timeout: Optional[float] = None) -> PooledResponse:
+        u = urlsplit(url)
+        scheme = u.scheme
+        host = u.hostname
+        port = u.port or (443 if scheme == "https" else 80)
+        key = (scheme, host, port, proxy)
+
+        if proxy is not None and scheme == "http":
+            # Plain http through a proxy sends the absolute url as the request target
+            target = url
+        else:
+            target = u.path or "/"
+
+            if u.query:
+                target += "?" + u.query
+
+        while True:
+            if method in IDEMPOTENT_METHODS:
+                conn, reused = self._acquire(key, timeout)
+            else:
+                # A request which fails on an idle connection the server has dropped can't be told apart from
+                # one which reached the server, and can't be sent again, so it always gets a new connection
+                with self._lock:
+                    self.misses += 1
+
+                conn, reused = self._connect(key, timeout), False
+
+            try:
+                conn.request(method, target, body, headers)
+                response = conn.getresponse()
+            except (OSError, HTTPException):
+                conn.close()
+
+                # The server may have dropped an idle connection, so retry idempotent requests on a new one
+                if reused:
+                    continue
+
+                raise
+
+            return PooledResponse(self, key, conn, response)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            idle = sum(len(x) for x in self._idle.values())
+
+        return {"hits": self.hits, "misses": self.misses, "idle": idle}
+
+    def clear(self):
+        with self._lock:
+            items = self._idle
+            self._idle = {}
+
+        for conns in items.values():
+            for conn, _ in conns:
+                conn.close()
+
+    def _acquire(self, key: PoolKey, timeout: Optional[float]) -> Tuple[HTTPConnection, bool]:
+        now = time.monotonic()
+        expired = []
+        conn = None
+
+        with self._lock:
+            conns = self._idle.get(key, [])
+
+            while len(conns) > 0:
+                c, released_at = conns.pop()
+
+                if now - released_at > self._idle_timeout:
+                    expired.append(c)
+                else:
+                    conn = c
+                    break
+
+            if conn is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        for c in expired:
+            c.close()
+
+        if conn is not None:
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            conn.timeout = timeout
+            return (conn, True)
+
+        return (self._connect(key, timeout), False)
+
+    def _release(self, key: PoolKey, conn: HTTPConnection):
+        with self._lock:
+            conns = self._idle.setdefault(key, [])
+
+            if len(conns) < self._max_connections:
+                conns.append((conn, time.monotonic()))
+                return
+
+        conn.close()
+
+    def _connect(self, key: PoolKey, timeout: Optional[float]) -> HTTPConnection:
+        (scheme, host, port, proxy) = key
+
+        if proxy is None:
+            if scheme == "https":
+                return HTTPSConnection(host, port, timeout=timeout)
+            else:
+                return HTTPConnection(host, port, timeout=timeout)
+
+        p = urlsplit(proxy if "://" in proxy else "http://" + proxy)
+
+        if scheme == "https":
+            conn = HTTPSConnection(p.hostname, p.port or 80, timeout=timeout)
+            conn.set_tunnel(host, port)
+            return conn
+        else:
+            return HTTPConnection(p.hostname, p.port or 80, timeout=timeout)
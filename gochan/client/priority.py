@@ -0,0 +1,39 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    """
+    Smaller value is served first
+    """
+
+    # What the user is waiting for right now (opening a board or a thread, posting)
+    INTERACTIVE = 0
+    # Refreshing what is on screen (favorites, the rest of the open thread)
+    VISIBLE_REFRESH = 1
+    # What the user may look at next (images linked from the open thread)
+    PREFETCH = 2
+    # Anything else, e.g. crawls for the cache
+    ARCHIVAL = 3
+
+
+_priority: ContextVar[Priority] = ContextVar("priority", default=Priority.INTERACTIVE)
+
+
+def current_priority() -> Priority:
+    return _priority.get()
+
+
+@contextmanager
+def priority(value: Priority):
+    """
+    Requests made inside this block (including coroutines in gochan.client.aio) are sent with the given priority
+    """
+
+    token = _priority.set(value)
+
+    try:
+        yield
+    finally:
+        _priority.reset(token)
@@ -0,0 +1,95 @@
+import threading
+import time
+from typing import Dict, List, Optional, Union
+
+
+class _Health:
+    def __init__(self):
+        super().__init__()
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.failed_at: Optional[float] = None
+
+
+class ProxyPool:
+    """
+    Proxies to fetch dat through. Each call to order() starts one further along the list (round robin),
+    then moves proxies which are much slower or fail more often than the best one, and those still cooling down
+    after a failure, to the back. Latency and error rate are moving averages weighted by alpha.
+    """
+
+    def __init__(self, proxies: List[str], cooldown: float, alpha: float = 0.3):
+        super().__init__()
+        self._proxies = list(proxies)
+        self._cooldown = cooldown
+        self._alpha = alpha
+        self._health = {p: _Health() for p in self._proxies}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._proxies)
+
+    def order(self) -> List[str]:
+        with self._lock:
+            if len(self._proxies) == 0:
+                return []
+
+            start = self._next
+            self._next = (self._next + 1) % len(self._proxies)
+            rotated = self._proxies[start:] + self._proxies[:start]
+            now = time.monotonic()
+
+            cooling = [p for p in rotated if self._is_cooling(p, now)]
+            available = [p for p in rotated if p not in cooling]
+            best = min((self._score(p) for p in available), default=0)
+
+            # Anything up to twice as bad as the best takes its turn
+            healthy = [p for p in available if self._score(p) <= best * 2]
+            unhealthy = sorted([p for p in available if p not in healthy], key=self._score)
+
+            # Cooling proxies are still tried as a last resort, the one which failed longest ago first
+            cooling.sort(key=lambda p: self._health[p].failed_at)
+
+            return healthy + unhealthy + cooling
+
+    def record(self, proxy: str, seconds: float):
+        """
+        The proxy delivered a response (even an error from the server) in seconds
+        """
+
+        with self._lock:
+            h = self._health[proxy]
+            h.latency = seconds if h.latency is None else h.latency + self._alpha * (seconds - h.latency)
+            h.error_rate -= self._alpha * h.error_rate
+            h.failed_at = None
+
+    def failed(self, proxy: str):
+        with self._lock:
+            h = self._health[proxy]
+            h.error_rate += self._alpha * (1 - h.error_rate)
+            h.failed_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Dict[str, Union[float, bool, None]]]:
+        with self._lock:
+            now = time.monotonic()
+
+            return {p: {"latency": h.latency, "error_rate": h.error_rate, "cooling": self._is_cooling(p, now)}
+                    for (p, h) in self._health.items()}
+
+    def _is_cooling(self, proxy: str, now: float) -> bool:
+        failed_at = self._health[proxy].failed_at
+        return failed_at is not None and now - failed_at < self._cooldown
+
+    def _score(self, proxy: str) -> float:
+        """
+        Expected seconds per successful fetch. Proxies which haven't been tried yet score 0 so that they get measured.
+        """
+
+        h = self._health[proxy]
+
+        if h.latency is None:
+            # Untried proxies go first, ones which have only ever failed go last
+            return 0 if h.error_rate == 0 else float("inf")
+
+        return h.latency / max(0.05, 1 - h.error_rate)
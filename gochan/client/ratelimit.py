@@ -0,0 +1,127 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from gochan.client.priority import Priority
+
+MAX_BACKOFF = 60
+
+
+class TokenBucket:
+    """
+    Token bucket whose rate adapts to the server: it is halved when the server throttles us
+    and recovers step by step while requests succeed (AIMD).
+    Interactive requests take tokens before any waiting background request.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        super().__init__()
+        self._max_rate = rate
+        self._min_rate = rate / 16
+        self._burst = burst
+        self.rate = rate
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._failures = 0
+        self._waiting = {p: 0 for p in Priority}
+        self._cond = threading.Condition()
+
+    def acquire(self, priority: Priority = Priority.INTERACTIVE):
+        with self._cond:
+            self._waiting[priority] += 1
+
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+
+                    if now < self._blocked_until:
+                        self._cond.wait(self._blocked_until - now)
+                        continue
+
+                    if self._has_precedence(priority):
+                        if self._tokens >= 1:
+                            self._tokens -= 1
+                            return
+
+                        self._cond.wait((1 - self._tokens) / self.rate)
+                    else:
+                        # Wait until requests of higher priority have taken their tokens
+                        self._cond.wait(1 / self.rate)
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+    def try_acquire(self, priority: Priority = Priority.INTERACTIVE) -> bool:
+        """
+        Take a token if one can be taken without waiting
+        """
+
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+
+            if now < self._blocked_until or not self._has_precedence(priority) or self._tokens < 1:
+                return False
+
+            self._tokens -= 1
+            return True
+
+    def throttled(self, retry_after: Optional[float] = None):
+        with self._cond:
+            self._failures += 1
+            self.rate = max(self._min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0)
+
+            if retry_after is None:
+                retry_after = min(MAX_BACKOFF, 2 ** (self._failures - 1))
+
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+    def succeeded(self):
+        with self._cond:
+            self._failures = 0
+            self.rate = min(self._max_rate, self.rate + self._max_rate / 10)
+
+    def _has_precedence(self, priority: Priority) -> bool:
+        return all(self._waiting[p] == 0 for p in Priority if p < priority)
+
+    def _refill(self, now: float):
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class RateLimiter:
+    """
+    Keep a TokenBucket for each host
+    """
+
+    def __init__(self, rate: float, burst: float):
+        super().__init__()
+        self._rate = rate
+        self._burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self._rate, self._burst)
+
+            return self._buckets[host]
+
+    def acquire(self, host: str, priority: Priority = Priority.INTERACTIVE):
+        if self._rate > 0:
+            self.bucket(host).acquire(priority)
+
+    def try_acquire(self, host: str, priority: Priority = Priority.INTERACTIVE) -> bool:
+        return self._rate <= 0 or self.bucket(host).try_acquire(priority)
+
+    def throttled(self, host: str, retry_after: Optional[float] = None):
+        if self._rate > 0:
+            self.bucket(host).throttled(retry_after)
+
+    def succeeded(self, host: str):
+        if self._rate > 0:
+            self.bucket(host).succeeded()
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import threading
+import time
+from http.client import HTTPMessage
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from gochan.client.pool import ConnectionPool
+
+
+def fixture_name(method: str, url: str, headers: Dict[str, str]) -> str:
+    key = method + " " + url
+
+    # A ranged request gets a different response from the same url
+    for k, v in headers.items():
+        if k.lower() == "range":
+            key += " " + v
+
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def save_fixture(directory: Path, method: str, url: str, request_headers: Dict[str, str], status: int, reason: str,
+                 headers: List[Tuple[str, str]], body: bytes):
+    """
+    Store a response as <name>.json (status and headers) and <name>.body (the body as sent on the wire)
+    """
+
+    directory.mkdir(mode=0o777, parents=True, exist_ok=True)
+    name = fixture_name(method, url, request_headers)
+
+    meta = {"method": method, "url": url, "status": status, "reason": reason, "headers": headers}
+    directory.joinpath(name + ".json").write_text(json.dumps(meta, ensure_ascii=False, indent=2))
+    directory.joinpath(name + ".body").write_bytes(body)
+
+
+class ReplayResponse:
+    """
+    Response read from a fixture. If bandwidth is given, read() is throttled to that many bytes per second.
+    """
+
+    def __init__(self, status: int, reason: str, headers: List[Tuple[str, str]], body: bytes,
+                 bandwidth: Optional[float] = None):
+        super().__init__()
+        self.status = status
+        self.reason = reason
+        self.headers = HTTPMessage()
+        self._body = body
+        self._pos = 0
+        self._bandwidth = bandwidth
+
+        for k, v in headers:
+            self.headers[k] = v
+
+    def getheader(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.headers.get(name, default)
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        end = len(self._body) if amt is None else min(len(self._body), self._pos + amt)
+        data = self._body[self._pos:end]
+        self._pos = end
+
+        if self._bandwidth:
+            time.sleep(len(data) / self._bandwidth)
+
+        return data
+
+    def close(self):
+        self._pos = len(self._body)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ReplayTransport:
+    """
+    Serve responses from a fixture directory instead of the network, with optional latency (seconds
+    before the response starts) and bandwidth (bytes per second)
+    """
+
+    def __init__(self, directory: Path, latency: float = 0, bandwidth: Optional[float] = None):
+        super().__init__()
+        self._directory = directory
+        self._latency = latency
+        self._bandwidth = bandwidth
+
+    def request(self, method: str, url: str, headers: Dict[str, str], body: Optional[bytes] = None,
+                proxy: Optional[str] = None, timeout: Optional[float] = None) -> ReplayResponse:
+        name = fixture_name(method, url, headers)
+        meta_path = self._directory.joinpath(name + ".json")
+
+        if not meta_path.is_file():
+            raise FileNotFoundError(f"no fixture for {method} {url}")
+
+        meta = json.loads(meta_path.read_text())
+        data = self._directory.joinpath(name + ".body").read_bytes()
+
+        if self._latency:
+            time.sleep(self._latency)
+
+        return ReplayResponse(meta["status"], meta["reason"], [tuple(x) for x in meta["headers"]], data,
+                              self._bandwidth)
+
+
+class RecordingTransport:
+    """
+    Send requests through the connection pool and save every response to a fixture directory
+    """
+
+    def __init__(self, pool: ConnectionPool, directory: Path):
+        super().__init__()
+        self._pool = pool
+        self._directory = directory
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, headers: Dict[str, str], body: Optional[bytes] = None,
+                proxy: Optional[str] = None, timeout: Optional[float] = None) -> ReplayResponse:
+        with self._pool.request(method, url, headers, body, proxy, timeout) as response:
+            data = response.read()
+            status = response.status
+            reason = response.reason
+            hdrs = list(response.headers.items())
+
+        with self._lock:
+            save_fixture(self._directory, method, url, headers, status, reason, hdrs, data)
+
+        return ReplayResponse(status, reason, hdrs, data)
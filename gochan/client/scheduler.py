@@ -0,0 +1,124 @@
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from gochan.client.priority import Priority, current_priority
+
+
+class Scheduler:
+    """
+    Decide when each transfer may start. Each priority class has its own concurrency limit and,
+    except for interactive transfers, all of them share max_total. A transfer waits while any transfer
+    of a higher class is waiting, so user actions never queue behind background work.
+    Interactive transfers don't count against max_total, so they never wait for background ones to finish.
+    """
+
+    def __init__(self, max_total: int, limits: Dict[Priority, int]):
+        super().__init__()
+        self._max_total = max_total
+        self._limits = limits
+        self._running = {p: 0 for p in Priority}
+        self._waiting = {p: 0 for p in Priority}
+        self._cond = threading.Condition()
+        # Priorities of the slots the current thread holds
+        self._held = threading.local()
+
+    @contextmanager
+    def slot(self, priority: Optional[Priority] = None):
+        """
+        Hold a slot for the transfer made inside this block.
+        The priority of the caller (see gochan.client.priority) is used if priority is None.
+        """
+
+        if priority is None:
+            priority = current_priority()
+
+        with self._cond:
+            self._wait(priority)
+
+        held = self._held.__dict__.setdefault("priorities", [])
+        held.append(priority)
+
+        try:
+            yield priority
+        finally:
+            held.pop()
+
+            with self._cond:
+                self._running[priority] -= 1
+                self._cond.notify_all()
+
+    @contextmanager
+    def released(self):
+        """
+        Give back the slot the current thread holds while it waits for something other than the transfer itself
+        (e.g. the rate limit of a throttled host), and take it again afterwards.
+        Does nothing if the thread holds no slot.
+        """
+
+        held = self._held.__dict__.get("priorities")
+
+        if not held:
+            yield
+            return
+
+        priority = held[-1]
+
+        with self._cond:
+            self._running[priority] -= 1
+            self._cond.notify_all()
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._wait(priority)
+
+    def yield_to_higher(self, priority: Priority):
+        """
+        Called by long transfers between chunks. If transfers of a higher class are waiting, the slot is
+        handed over to them and this returns when it's this transfer's turn again.
+        """
+
+        with self._cond:
+            # Only waiting transfers which the slot would let start are worth yielding to
+            if not any(self._waiting[p] != 0 and self._running[p] < self._limits.get(p, self._max_total)
+                       for p in Priority if p < priority):
+                return
+
+            self._running[priority] -= 1
+            self._cond.notify_all()
+            self._wait(priority)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._cond:
+            return {p.name.lower(): {"running": self._running[p], "waiting": self._waiting[p]} for p in Priority}
+
+    def _wait(self, priority: Priority):
+        self._waiting[priority] += 1
+
+        try:
+            while not self._can_start(priority):
+                self._cond.wait()
+        finally:
+            self._waiting[priority] -= 1
+
+        self._running[priority] += 1
+        # Lower classes may be able to go now that this one is no longer waiting
+        self._cond.notify_all()
+
+    def _can_start(self, priority: Priority) -> bool:
+        if self._running[priority] >= self._limits.get(priority, self._max_total):
+            return False
+
+        if self._higher_waiting(priority):
+            return False
+
+        if priority == Priority.INTERACTIVE:
+            return True
+
+        background = sum(n for (p, n) in self._running.items() if p != Priority.INTERACTIVE)
+        return background < self._max_total
+
+    def _higher_waiting(self, priority: Priority) -> bool:
+        return any(self._waiting[p] != 0 for p in Priority if p < priority)
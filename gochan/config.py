@@ -1,4 +1,5 @@
 import json
+import os
 from pathlib import Path
 
 APP_DIR = Path("~/.gochan").expanduser()
@@ -9,9 +10,19 @@ NG_PATH = APP_DIR / "ng.json"
 THEME_PATH = APP_DIR / "theme.json"
 HISTORY_PATH = APP_DIR / "history.json"
 FAVORITES_PATH = APP_DIR / "favorites.json"
+SERVERS_PATH = APP_DIR / "servers.json"
+COOKIE_PATH = APP_DIR / "cookies.txt"
 
 CACHE_IMAGE = True
 MAX_IMAGE_CACHE = 5
+# Images larger than this are not downloaded (None for no limit)
+MAX_IMAGE_SIZE = 10 * 1024 * 1024
+
+# Images linked from the open thread are downloaded into the image cache in the background
+PREFETCH_IMAGES = True
+PREFETCH_IMAGE_COUNT = 10
+PREFETCH_IMAGE_BYTES = 30 * 1024 * 1024
+PREFETCH_IMAGE_WORKERS = 2
 
 CACHE_THREAD = True
 MAX_THREAD_CACHE = 50
@@ -19,6 +30,12 @@ MAX_THREAD_CACHE = 50
 CACHE_BOARD = True
 MAX_BOARD_CACHE = 50
 
+# Responses of bbsmenu, subject.txt and dat are kept with their headers in CACHE_PATH / "http".
+# Each is served without a request for as many seconds as HTTP_CACHE_TTLS gives its endpoint, and revalidated after
+HTTP_CACHE = True
+HTTP_CACHE_SIZE = 200 * 1024 * 1024
+HTTP_CACHE_TTLS = {"bbsmenu": 24 * 60 * 60, "subject": 10, "dat": 5}
+
 MAX_HISTORY = 50
 
 NEW_THREAD_INTERVAL = 30
@@ -28,8 +45,52 @@ BROWSER_PATH = None
 USER_AGENT = "Mozilla/5.0"
 COOKIE = "yuki=akari"
 
+# A post which never reached the server (refused, 429, 503) is sent again up to POST_MAX_RETRIES times,
+# after POST_RETRY_DELAY seconds doubling each time
+POST_MAX_RETRIES = 3
+POST_RETRY_DELAY = 2.0
+
 DEFAULT_SORT = "number"
 
+MAX_CONNECTIONS_PER_HOST = 2
+CONNECTION_IDLE_TIMEOUT = 30
+
+# "hedged", "html" or "dat"
+THREAD_SYNC = "hedged"
+# Seconds to wait for the first endpoint before hedging, until its latency has been measured
+HEDGE_DELAY = 1.0
+
+# "progressive" or "full"
+THREAD_OPEN = "progressive"
+PROGRESSIVE_OPEN_COUNT = 50
+BACKFILL_CHUNK = 200
+
+MAX_CLIENT_WORKERS = 8
+
+# Proxies ("host:port") to fetch dat through in turn, skipping one for PROXY_COOLDOWN seconds after it fails
+DAT_PROXIES = []
+PROXY_COOLDOWN = 60
+
+# Transfers running at the same time, apart from interactive ones
+MAX_TRANSFERS = 6
+# Transfers running at the same time for each priority class
+TRANSFER_LIMITS = {"interactive": 4, "visible_refresh": 4, "prefetch": 2, "archival": 1}
+
+RATE_LIMIT = 2.0
+RATE_LIMIT_BURST = 5
+
+REQUEST_TIMEOUT = 10
+HOST_TIMEOUTS = {}
+
+CIRCUIT_THRESHOLD = 3
+CIRCUIT_RESET_TIMEOUT = 60
+
+# "network", "record" or "replay"
+TRANSPORT = "network"
+FIXTURE_PATH = APP_DIR / "fixtures"
+REPLAY_LATENCY = 0
+REPLAY_BANDWIDTH = None
+
 conf_file = APP_DIR / "conf.json"
 
 if conf_file.is_file():
@@ -41,6 +102,16 @@ if conf_file.is_file():
         CACHE_IMAGE = conf["cache_image"]
     if "max_image_cache" in conf:
         MAX_IMAGE_CACHE = conf["max_image_cache"]
+    if "max_image_size" in conf:
+        MAX_IMAGE_SIZE = conf["max_image_size"]
+    if "prefetch_images" in conf:
+        PREFETCH_IMAGES = conf["prefetch_images"]
+    if "prefetch_image_count" in conf:
+        PREFETCH_IMAGE_COUNT = conf["prefetch_image_count"]
+    if "prefetch_image_bytes" in conf:
+        PREFETCH_IMAGE_BYTES = conf["prefetch_image_bytes"]
+    if "prefetch_image_workers" in conf:
+        PREFETCH_IMAGE_WORKERS = conf["prefetch_image_workers"]
     if "cache_thread" in conf:
         CACHE_THREAD = conf["cache_thread"]
     if "max_thread_cache" in conf:
@@ -49,13 +120,77 @@ if conf_file.is_file():
         CACHE_BOARD = conf["cache_board"]
     if "max_board_cache" in conf:
         MAX_BOARD_CACHE = conf["max_board_cache"]
+    if "http_cache" in conf:
+        HTTP_CACHE = conf["http_cache"]
+    if "http_cache_size" in conf:
+        HTTP_CACHE_SIZE = conf["http_cache_size"]
+    if "http_cache_ttls" in conf:
+        HTTP_CACHE_TTLS.update(conf["http_cache_ttls"])
     if "max_history" in conf:
         MAX_HISTORY = conf["max_history"]
     if "user_agent" in conf:
         USER_AGENT = conf["user_agent"]
     if "cookie" in conf:
         COOKIE = conf["cookie"]
+    if "post_max_retries" in conf:
+        POST_MAX_RETRIES = conf["post_max_retries"]
+    if "post_retry_delay" in conf:
+        POST_RETRY_DELAY = conf["post_retry_delay"]
     if "default_sort" in conf:
         DEFAULT_SORT = conf["default_sort"]
     if "new_state_interval" in conf:
         NEW_THREAD_INTERVAL = conf["new_thread_interval"]
+    if "max_connections_per_host" in conf:
+        MAX_CONNECTIONS_PER_HOST = conf["max_connections_per_host"]
+    if "connection_idle_timeout" in conf:
+        CONNECTION_IDLE_TIMEOUT = conf["connection_idle_timeout"]
+    if "thread_sync" in conf:
+        THREAD_SYNC = conf["thread_sync"]
+    if "hedge_delay" in conf:
+        HEDGE_DELAY = conf["hedge_delay"]
+    if "thread_open" in conf:
+        THREAD_OPEN = conf["thread_open"]
+    if "progressive_open_count" in conf:
+        PROGRESSIVE_OPEN_COUNT = conf["progressive_open_count"]
+    if "backfill_chunk" in conf:
+        BACKFILL_CHUNK = conf["backfill_chunk"]
+    if "max_client_workers" in conf:
+        MAX_CLIENT_WORKERS = conf["max_client_workers"]
+    if "dat_proxies" in conf:
+        DAT_PROXIES = conf["dat_proxies"]
+    if "proxy_cooldown" in conf:
+        PROXY_COOLDOWN = conf["proxy_cooldown"]
+    if "max_transfers" in conf:
+        MAX_TRANSFERS = conf["max_transfers"]
+    if "transfer_limits" in conf:
+        TRANSFER_LIMITS.update(conf["transfer_limits"])
+    if "rate_limit" in conf:
+        RATE_LIMIT = conf["rate_limit"]
+    if "rate_limit_burst" in conf:
+        RATE_LIMIT_BURST = conf["rate_limit_burst"]
+    if "request_timeout" in conf:
+        REQUEST_TIMEOUT = conf["request_timeout"]
+    if "host_timeouts" in conf:
+        HOST_TIMEOUTS = conf["host_timeouts"]
+    if "circuit_threshold" in conf:
+        CIRCUIT_THRESHOLD = conf["circuit_threshold"]
+    if "circuit_reset_timeout" in conf:
+        CIRCUIT_RESET_TIMEOUT = conf["circuit_reset_timeout"]
+    if "transport" in conf:
+        TRANSPORT = conf["transport"]
+    if "fixture_path" in conf:
+        FIXTURE_PATH = Path(conf["fixture_path"]).expanduser()
+    if "replay_latency" in conf:
+        REPLAY_LATENCY = conf["replay_latency"]
+    if "replay_bandwidth" in conf:
+        REPLAY_BANDWIDTH = conf["replay_bandwidth"]
+
+# Environment variables take precedence so that benchmarks can switch the transport without editing conf.json
+if "GOCHAN_TRANSPORT" in os.environ:
+    TRANSPORT = os.environ["GOCHAN_TRANSPORT"]
+if "GOCHAN_FIXTURE_PATH" in os.environ:
+    FIXTURE_PATH = Path(os.environ["GOCHAN_FIXTURE_PATH"]).expanduser()
+if "GOCHAN_REPLAY_LATENCY" in os.environ:
+    REPLAY_LATENCY = float(os.environ["GOCHAN_REPLAY_LATENCY"])
+if "GOCHAN_REPLAY_BANDWIDTH" in os.environ:
+    REPLAY_BANDWIDTH = float(os.environ["GOCHAN_REPLAY_BANDWIDTH"])
@@ -0,0 +1,49 @@
+import asyncio
+import queue
+from typing import Any, Callable
+
+
+class Dispatcher:
+    """
+    Queue of callbacks posted from background threads, to be run on the UI thread.
+    Models and view models are not thread-safe, so results of background work must go through here.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._queue = queue.SimpleQueue()
+
+    def invoke(self, fn: Callable, *args):
+        self._queue.put((fn, args))
+
+    async def invoke_async(self, fn: Callable, *args) -> Any:
+        """
+        Run fn on the UI thread and wait until it has finished.
+        Returns what fn returns, and raises what it raises here instead of on the UI thread.
+        """
+
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+
+        def run():
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                loop.call_soon_threadsafe(done.set_exception, e)
+            else:
+                loop.call_soon_threadsafe(done.set_result, result)
+
+        self.invoke(run)
+        return await done
+
+    def run_pending(self):
+        while True:
+            try:
+                (fn, args) = self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+            fn(*args)
+
+
+dispatcher = Dispatcher()
@@ -0,0 +1,29 @@
+from asciimatics.effects import Effect
+from asciimatics.screen import Screen
+
+from gochan.dispatcher import dispatcher
+
+
+class EventPump(Effect):
+    """
+    Invisible effect which runs the callbacks posted to the dispatcher on every frame.
+    Add it to every scene, before the frame, so that results of background work are drawn in the same frame.
+    """
+
+    def __init__(self, screen: Screen):
+        super().__init__(screen)
+
+    def reset(self):
+        pass
+
+    def _update(self, frame_no):
+        dispatcher.run_pending()
+
+    @property
+    def stop_frame(self):
+        return 0
+
+    @property
+    def frame_update_count(self):
+        # Keep polling even when there is no input
+        return 5
@@ -1,17 +1,23 @@
-import re
-import tempfile
-from typing import Optional, Union
+import io
+from typing import List, Optional, Union
 from urllib.request import HTTPError, URLError
 
-from gochan.client import download_image
-from gochan.config import (FAVORITES_PATH, HISTORY_PATH, MAX_HISTORY, NG_PATH, CACHE_THREAD, CACHE_BOARD,
-                           CACHE_IMAGE)
+import gochan.client
+from gochan.client import Priority, aio, download_image, priority, save_image
+from gochan.config import (BACKFILL_CHUNK, FAVORITES_PATH, HISTORY_PATH, MAX_HISTORY, MAX_IMAGE_CACHE, NG_PATH,
+                           CACHE_THREAD, CACHE_BOARD, CACHE_IMAGE, PREFETCH_IMAGE_BYTES, PREFETCH_IMAGE_COUNT,
+                           POST_MAX_RETRIES, POST_RETRY_DELAY, PREFETCH_IMAGE_WORKERS, PREFETCH_IMAGES, SERVERS_PATH,
+                           THREAD_OPEN, THREAD_SYNC)
+from gochan.dispatcher import dispatcher
 from gochan.event_handler import PropertyChangedEventArgs, PropertyChangedEventHandler
 from gochan.models.bbsmenu import Bbsmenu
 from gochan.models.board import Board
 from gochan.models.favorites import Favorites
 from gochan.models.history import History
 from gochan.models.ng import NG
+from gochan.models.post_queue import PostQueue
+from gochan.models.prefetch import ImagePrefetcher, image_file_name
+from gochan.models.relocation import BoardResolver, board_move
 from gochan.models.thread import Thread
 from gochan.storage import board_cache, image_cache, thread_cache
 
@@ -22,7 +28,7 @@ class AppContext:
         self.bbsmenu: Optional[Bbsmenu] = None
         self.board: Optional[Board] = None
         self.thread: Optional[Thread] = None
-        self.image: Optional[Union[str, HTTPError, URLError]] = None
+        self.image: Optional[Union[str, io.BytesIO, HTTPError, URLError]] = None
 
         self.ng: NG = NG()
 
@@ -45,20 +51,43 @@ class AppContext:
             s = FAVORITES_PATH.read_text()
             self.favorites.deserialize(s)
 
+        self.posts = PostQueue(POST_MAX_RETRIES, POST_RETRY_DELAY)
+
+        self.resolver = BoardResolver()
+
+        if SERVERS_PATH.is_file():
+            self.resolver.deserialize(SERVERS_PATH.read_text())
+
+        # Fetches that were redirected to another server tell us where a board has moved
+        gochan.client.redirect_listeners.append(self._redirected)
+
+        # Leave room in the image cache so that prefetched images don't push each other out
+        self.prefetcher = ImagePrefetcher(min(PREFETCH_IMAGE_COUNT, MAX_IMAGE_CACHE - 1),
+                                          PREFETCH_IMAGE_BYTES, PREFETCH_IMAGE_WORKERS)
+
         self.on_property_changed = PropertyChangedEventHandler()
 
     def set_bbsmenu(self):
         self.bbsmenu = Bbsmenu()
         self.bbsmenu.update()
+
+        for c in self.bbsmenu.categories:
+            for b in c.boards:
+                self.relocate(b.board, b.server)
+
         self.on_property_changed.invoke(PropertyChangedEventArgs(self, "bbsmenu"))
 
     def set_board(self, server: str, board: str):
+        server = self.resolver.resolve(server, board)
+
         if CACHE_BOARD:
             self.save_board()
 
             if board_cache.contains(board):
                 s = board_cache.get(board)
                 self.board = Board.deserialize(s)
+                # The cached copy may be from before the board moved
+                self.board.server = server
                 self.board.update()
                 self.on_property_changed.invoke(PropertyChangedEventArgs(self, "board"))
                 return
@@ -68,19 +97,89 @@ class AppContext:
         self.on_property_changed.invoke(PropertyChangedEventArgs(self, "board"))
 
     def set_thread(self, server: str, board: str, key: str):
+        server = self.resolver.resolve(server, board)
+        self.prefetcher.reset()
+
         if CACHE_THREAD:
             self.save_thread()
 
             if thread_cache.contains(board + key):
                 s = thread_cache.get(board + key)
                 self.thread = Thread.deserialize(s)
+                self.thread.server = server
                 self.thread.update()
                 self.on_property_changed.invoke(PropertyChangedEventArgs(self, "thread"))
+                self._start_backfill()
                 return
 
         self.thread = Thread(server, board, key)
-        self.thread.init()
+
+        if THREAD_OPEN == "progressive" and THREAD_SYNC != "dat":
+            history = self.history.get(board, key)
+            self.thread.init_progressive(history.bookmark if history is not None else None)
+        else:
+            self.thread.init()
+
         self.on_property_changed.invoke(PropertyChangedEventArgs(self, "thread"))
+        self._start_backfill()
+
+    def relocate(self, board: str, server: str):
+        """
+        Record that board is on server. If it has moved, the favorites and the open board and thread
+        are pointed to the new server; cached copies are corrected when they are opened.
+        """
+
+        self.resolver.update(board, server)
+        self.favorites.relocate(board, server)
+
+        if self.board is not None and self.board.board == board:
+            self.board.server = server
+
+        if self.thread is not None and self.thread.board == board:
+            self.thread.server = server
+
+    def _redirected(self, url: str, new_url: str):
+        move = board_move(url, new_url)
+
+        if move is not None:
+            dispatcher.invoke(self.relocate, *move)
+
+    def prefetch_images(self, urls: List[str]):
+        if CACHE_IMAGE and PREFETCH_IMAGES:
+            self.prefetcher.prefetch(urls)
+
+    def _start_backfill(self):
+        if len(self.thread.missing) != 0:
+            aio.run_in_background(self._backfill(self.thread))
+
+    async def _backfill(self, thread: Thread):
+        """
+        Fetch the responses left out by Thread.init_progressive, newest first, while the thread is open
+        """
+
+        with priority(Priority.VISIBLE_REFRESH):
+            while len(thread.missing) != 0 and self.thread is thread:
+                (start, end) = thread.missing[0]
+
+                if end is not None:
+                    start = max(start, end - BACKFILL_CHUNK + 1)
+
+                try:
+                    responses = await thread.fetch_range_async(start, end)
+                except URLError:
+                    # The rest is fetched next time the thread is opened
+                    return
+
+                await dispatcher.invoke_async(thread.merge, responses, start, end)
+
+    def refresh_favorites(self):
+        aio.run_in_background(self._refresh_favorites())
+
+    async def _refresh_favorites(self):
+        with priority(Priority.VISIBLE_REFRESH):
+            counts = await self.favorites.fetch_counts_async()
+
+        await dispatcher.invoke_async(self.favorites.set_counts, counts)
 
     def save_board(self):
         if self.board is not None:
@@ -108,29 +207,27 @@ class AppContext:
         s = self.favorites.serialzie()
         FAVORITES_PATH.write_text(s)
 
+        s = self.resolver.serialize()
+        SERVERS_PATH.write_text(s)
+
+        gochan.client.cookies.save()
+
     def set_image(self, url: str):
         if CACHE_IMAGE:
-            file_name = re.sub(r'https?://|/', "", url)
+            file_name = image_file_name(url)
 
             if image_cache.contains(file_name):
                 self.image = image_cache.path + "/" + file_name
             else:
-                result = download_image(url)
-
-                if isinstance(result, HTTPError) or isinstance(result, URLError):
-                    self.image = result
-                else:
-                    image_cache.store(file_name, result)
+                # If the image is being prefetched, this waits for that download
+                try:
+                    save_image(url, image_cache.file_path(file_name))
+                    image_cache.trim()
                     self.image = image_cache.path + "/" + file_name
+                except URLError as e:
+                    self.image = e
         else:
-            result = download_image(url)
-
-            if isinstance(result, HTTPError) or isinstance(result, URLError):
-                self.image = result
-            else:
-                f = tempfile.NamedTemporaryFile()
-                f.write(result)
-                self.image = f.name
-                f.close()
+            # The renderer reads the image straight from memory
+            self.image = download_image(url)
 
         self.on_property_changed.invoke(PropertyChangedEventArgs(self, "image"))
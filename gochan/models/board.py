@@ -1,9 +1,11 @@
 import json
 import time
-from typing import List
+from typing import List, Optional
+from urllib.error import URLError
 
-from gochan.client import get_board
+from gochan.client import Document, Validator, aio, get_board_document, is_unavailable
 from gochan.config import NEW_THREAD_INTERVAL
+from gochan.dispatcher import dispatcher
 from gochan.event_handler import PropertyChangedEventArgs, PropertyChangedEventHandler
 from gochan.parser import BoardParser
 
@@ -43,11 +45,62 @@ class Board:
         self.server = server
         self.board = board
         self.threads: List[ThreadHeader] = []
+        self.validator: Optional[Validator] = None
+        self._is_stale = False
         self.on_property_changed = PropertyChangedEventHandler()
 
+    @property
+    def is_stale(self) -> bool:
+        """
+        True if the server couldn't be reached and the threads are the last copy we have
+        """
+
+        return self._is_stale
+
+    @is_stale.setter
+    def is_stale(self, value: bool):
+        if self._is_stale != value:
+            self._is_stale = value
+            self.on_property_changed.invoke(PropertyChangedEventArgs(self, "is_stale"))
+
     def update(self):
-        s = get_board(self.server, self.board)
-        parser = BoardParser(s)
+        try:
+            doc = get_board_document(self.server, self.board, self.validator)
+        except URLError as e:
+            self._fetch_failed(e)
+            return
+
+        self._update(doc)
+
+    async def update_async(self):
+        """
+        Fetch on the background loop, then apply the result on the UI thread
+        """
+
+        try:
+            doc = await aio.get_board_document(self.server, self.board, self.validator)
+        except URLError as e:
+            await dispatcher.invoke_async(self._fetch_failed, e)
+            return
+
+        await dispatcher.invoke_async(self._update, doc)
+
+    def _fetch_failed(self, e: URLError):
+        # Keep showing the threads we have if the server is down
+        if not is_unavailable(e) or len(self.threads) == 0:
+            raise e
+
+        self.is_stale = True
+
+    def _update(self, doc: Document):
+        self.is_stale = False
+
+        # subject.txt has not been changed since the last update
+        if not doc.modified:
+            return
+
+        self.validator = doc.validator
+        parser = BoardParser(doc.text)
 
         new_threads = []
 
@@ -90,6 +143,7 @@ class Board:
         d = {}
         d["server"] = self.server
         d["board"] = self.board
+        d["validator"] = self.validator.to_dict() if self.validator is not None else None
         d["threads"] = []
 
         for t in self.threads:
@@ -110,6 +164,9 @@ class Board:
 
         b = Board(obj["server"], obj["board"])
 
+        if obj.get("validator") is not None:
+            b.validator = Validator.from_dict(obj["validator"])
+
         for t in obj["threads"]:
             b.threads.append(ThreadHeader(t["key"], t["number"], t["title"], t["count"], t["is_new"]))
 
@@ -1,8 +1,11 @@
+import asyncio
 import json
-from typing import Union
+from typing import Dict, List, Optional, Set, Tuple, Union
 
+from gochan.dispatcher import dispatcher
 from gochan.event_handler import (OrderChangedEventArg, OrderChangedEventHandler, PropertyChangedEventArgs,
                                   PropertyChangedEventHandler)
+from gochan.models.board import Board
 
 
 class FavoriteThread:
@@ -26,6 +29,9 @@ class Favorites:
     def __init__(self):
         super().__init__()
         self.list = []
+        # board + key -> response count in subject.txt at the last refresh
+        self.counts: Dict[str, int] = {}
+        self._boards: Dict[str, Board] = {}
         self.on_property_changed = PropertyChangedEventHandler()
         self.on_order_changed = OrderChangedEventHandler()
 
@@ -61,6 +67,72 @@ class Favorites:
                     self.on_order_changed.invoke(OrderChangedEventArg(self, "list", x, i+1))
                     return
 
+    def relocate(self, board: str, server: str):
+        """
+        Point the favorites of board to server, which board has moved to
+        """
+
+        changed = False
+
+        for item in self.list:
+            if item.board == board and item.server != server:
+                item.server = server
+                changed = True
+
+        if board in self._boards:
+            self._boards[board].server = server
+
+        if changed:
+            self.on_property_changed.invoke(PropertyChangedEventArgs(self, "list"))
+
+    def count(self, item: FavoriteThread) -> Optional[int]:
+        return self.counts.get(item.board + item.key)
+
+    async def fetch_counts_async(self) -> Dict[str, int]:
+        """
+        Fetch subject.txt of each board that has favorite threads once, concurrently.
+        Boards that can't be fetched are skipped.
+
+        Returns
+        -------
+        board + key -> response count, for the favorite threads found in subject.txt
+        """
+
+        # The list and the boards belong to the UI thread, so only the requests are made here
+        (keys, boards) = await dispatcher.invoke_async(self._boards_to_fetch)
+        results = await asyncio.gather(*[b.update_async() for b in boards], return_exceptions=True)
+
+        return await dispatcher.invoke_async(self._counts, keys, boards, results)
+
+    def _boards_to_fetch(self) -> Tuple[Set[str], List[Board]]:
+        keys = set()
+
+        for item in self.list:
+            if isinstance(item, FavoriteThread):
+                keys.add(item.board + item.key)
+
+                # Boards are kept so that the next refresh is a conditional request
+                if item.board not in self._boards:
+                    self._boards[item.board] = Board(item.server, item.board)
+
+        return (keys, list(self._boards.values()))
+
+    def _counts(self, keys: Set[str], boards: List[Board], results: List[Optional[BaseException]]) -> Dict[str, int]:
+        counts = {}
+        for (b, result) in zip(boards, results):
+            if isinstance(result, Exception):
+                continue
+
+            for t in b.threads:
+                if b.board + t.key in keys:
+                    counts[b.board + t.key] = t.count
+
+        return counts
+
+    def set_counts(self, counts: Dict[str, int]):
+        self.counts.update(counts)
+        self.on_property_changed.invoke(PropertyChangedEventArgs(self, "counts"))
+
     def serialzie(self) -> str:
         d = {"items": []}
 
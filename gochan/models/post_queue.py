@@ -0,0 +1,120 @@
+import asyncio
+from enum import Enum
+from typing import Optional
+from urllib.error import HTTPError, URLError
+
+from gochan.client import aio, is_undelivered
+from gochan.dispatcher import dispatcher
+from gochan.event_handler import PropertyChangedEventArgs, PropertyChangedEventHandler
+from gochan.models.thread import Thread
+from gochan.parser import PostResultParser
+
+
+class PostStatus(Enum):
+    QUEUED = 0
+    SENDING = 1
+    RETRYING = 2
+    DONE = 3
+    FAILED = 4
+
+
+class PostJob:
+    def __init__(self, thread: Thread, name: str, mail: str, msg: str):
+        super().__init__()
+        self.thread = thread
+        self.name = name
+        self.mail = mail
+        self.msg = msg
+        self.status = PostStatus.QUEUED
+        # Message from the server, or the reason of the failure
+        self.message: Optional[str] = None
+        self.attempts = 0
+        self.confirmed = False
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status == PostStatus.DONE or self.status == PostStatus.FAILED
+
+
+class PostQueue:
+    """
+    Send posts one at a time in the background. A post that fails because the server is unavailable is
+    sent again after retry_delay seconds, doubling each time, up to max_retries times.
+    Each status change is reported on the UI thread through on_property_changed, with the job as the sender.
+    After a successful post the thread is updated once.
+    """
+
+    def __init__(self, max_retries: int, retry_delay: float):
+        super().__init__()
+        self._max_retries = max_retries
+        self._retry_delay = retry_delay
+        self._lock: Optional[asyncio.Lock] = None
+        self.on_property_changed = PropertyChangedEventHandler()
+
+    def submit(self, thread: Thread, name: str, mail: str, msg: str) -> PostJob:
+        job = PostJob(thread, name, mail, msg)
+        aio.run_in_background(self._run(job))
+        return job
+
+    async def _run(self, job: PostJob):
+        # Created on the background loop, which runs every job
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            await self._send(job)
+
+        if job.status == PostStatus.DONE:
+            try:
+                result = await job.thread.fetch_update_async()
+            except URLError:
+                # The post went through; the new responses show up on the next update
+                return
+
+            await dispatcher.invoke_async(job.thread.apply_update, *result)
+
+    async def _send(self, job: PostJob):
+        while True:
+            job.attempts += 1
+            await self._set_status(job, PostStatus.SENDING)
+
+            try:
+                html = await job.thread.post_async(job.name, job.mail, job.msg)
+            except URLError as e:
+                # Posting isn't idempotent, so it's only sent again when the server never got it
+                if is_undelivered(e) and job.attempts <= self._max_retries:
+                    await self._set_status(job, PostStatus.RETRYING, str(e.reason))
+                    await asyncio.sleep(self._retry_delay * 2 ** (job.attempts - 1))
+                    continue
+
+                if is_undelivered(e) or isinstance(e, HTTPError) and e.code < 500:
+                    await self._set_status(job, PostStatus.FAILED, str(e.reason))
+                else:
+                    await self._set_status(job, PostStatus.FAILED,
+                                           f"{e.reason}\nThe post may have gone through. Check the thread before "
+                                           "sending it again.")
+
+                return
+
+            parser = PostResultParser(html)
+
+            # The confirmation page has set the cookies it asks for, so sending it again completes the post
+            if parser.is_confirmation() and not job.confirmed:
+                job.confirmed = True
+                job.attempts -= 1
+                continue
+
+            if parser.is_success():
+                await self._set_status(job, PostStatus.DONE, parser.message())
+            else:
+                await self._set_status(job, PostStatus.FAILED, parser.message())
+
+            return
+
+    async def _set_status(self, job: PostJob, status: PostStatus, message: Optional[str] = None):
+        def apply():
+            job.status = status
+            job.message = message
+            self.on_property_changed.invoke(PropertyChangedEventArgs(job, "status"))
+
+        await dispatcher.invoke_async(apply)
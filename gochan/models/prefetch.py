@@ -0,0 +1,88 @@
+import asyncio
+import re
+from typing import List, Optional, Set
+from urllib.error import URLError
+
+from gochan.client import Priority, aio, priority
+from gochan.config import MAX_IMAGE_SIZE
+from gochan.storage import image_cache
+
+
+def image_file_name(url: str) -> str:
+    return re.sub(r'https?://|/', "", url)
+
+
+class ImagePrefetcher:
+    """
+    Download images linked from the open thread (the "image" tokens of its messages) into the image cache
+    in the background, up to max_count images and max_bytes bytes per thread, at most workers at a time.
+    Call reset() when another thread is opened.
+    """
+
+    def __init__(self, max_count: int, max_bytes: int, workers: int):
+        super().__init__()
+        self._max_count = max_count
+        self._max_bytes = max_bytes
+        self._workers = workers
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._urls: Set[str] = set()
+        self._bytes = 0
+        self._generation = 0
+
+    def reset(self):
+        self._generation += 1
+        self._urls = set()
+        self._bytes = 0
+
+    def prefetch(self, images: List[str]):
+        urls = []
+
+        for url in images:
+            if len(self._urls) >= self._max_count:
+                break
+
+            if url not in self._urls:
+                self._urls.add(url)
+                urls.append(url)
+
+        if len(urls) != 0:
+            aio.run_in_background(self._prefetch(urls, self._generation))
+
+    async def _prefetch(self, urls: List[str], generation: int):
+        # Created on the background loop, which runs every prefetch
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._workers)
+
+        with priority(Priority.PREFETCH):
+            await asyncio.gather(*[self._download(url, generation) for url in urls])
+
+    async def _download(self, url: str, generation: int):
+        async with self._semaphore:
+            # Another thread has been opened, or the budget is used up
+            if generation != self._generation or self._bytes >= self._max_bytes:
+                return
+
+            file_name = image_file_name(url)
+
+            if image_cache.contains(file_name):
+                return
+
+            max_bytes = self._max_bytes - self._bytes
+
+            if MAX_IMAGE_SIZE is not None:
+                max_bytes = min(max_bytes, MAX_IMAGE_SIZE)
+
+            # The other workers may be downloading at the same time, so the most this one can take is reserved
+            # up front and what it didn't use is given back afterwards
+            self._bytes += max_bytes
+            size = 0
+
+            try:
+                size = await aio.save_image(url, image_cache.file_path(file_name), max_bytes)
+            except URLError:
+                return
+            finally:
+                if generation == self._generation:
+                    self._bytes -= max_bytes - size
+
+            image_cache.trim()
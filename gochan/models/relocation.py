@@ -0,0 +1,70 @@
+import json
+import re
+import threading
+from typing import Dict, Match, Optional, Tuple
+
+from gochan.event_handler import PropertyChangedEventArgs, PropertyChangedEventHandler
+
+# subject.txt, read.cgi and dat URLs, which name the board. Others such as /test/bbs.cgi don't
+_BOARD_URL = re.compile(r'https?://(\w+)\.5ch\.net(?::\d+)?/(?:test/read\.cgi/(\w+)/|(\w+)/(?:subject\.txt|dat/))')
+
+
+def _board(m: Match) -> str:
+    return m.group(2) or m.group(3)
+
+
+def board_move(old_url: str, new_url: str) -> Optional[Tuple[str, str]]:
+    """
+    Returns
+    -------
+    (board, new server) if a redirect from old_url to new_url means the board has moved, otherwise None
+    """
+
+    old = _BOARD_URL.match(old_url)
+    new = _BOARD_URL.match(new_url)
+
+    if old is None or new is None:
+        return None
+
+    if _board(old) != _board(new) or old.group(1) == new.group(1):
+        return None
+
+    return (_board(new), new.group(1))
+
+
+class BoardResolver:
+    """
+    Current server of each board, learned from bbsmenu and from redirects of moved boards
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._servers: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.on_property_changed = PropertyChangedEventHandler()
+
+    def resolve(self, server: str, board: str) -> str:
+        """
+        Returns
+        -------
+        the server board is on now, or server if it isn't known
+        """
+
+        with self._lock:
+            return self._servers.get(board, server)
+
+    def update(self, board: str, server: str):
+        with self._lock:
+            old = self._servers.get(board)
+            self._servers[board] = server
+
+        if old != server:
+            self.on_property_changed.invoke(PropertyChangedEventArgs(self, "servers"))
+
+    def serialize(self) -> str:
+        with self._lock:
+            return json.dumps(self._servers)
+
+    def deserialize(self, s: str):
+        with self._lock:
+            self._servers.update(json.loads(s))
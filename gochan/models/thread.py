@@ -1,14 +1,27 @@
+import bisect
 import json
-from typing import List
+from typing import Dict, List, Optional, Tuple
+from urllib.error import URLError
 
-from gochan.client import get_responses_after, post_response
+from gochan.client import (Document, Validator, aio, get_dat_document, get_last_responses_document,
+                           get_responses_after_document, get_responses_range_document, get_thread_document,
+                           is_unavailable)
+from gochan.config import PROGRESSIVE_OPEN_COUNT, THREAD_SYNC
 from gochan.event_handler import (CollectionChangedEventArgs, CollectionChangedEventHandler, CollectionChangedEventKind,
                                   PropertyChangedEventArgs, PropertyChangedEventHandler)
-from gochan.parser import ThreadParserH
+from gochan.parser import RawMessage, ThreadParserD, ThreadParserH, Token, tokenize
 
 
 class Response:
-    def __init__(self, number: int, name: str, mail: str, date: str, id: str, message: str):
+    def __init__(self, number: int, name: str, mail: str, date: str, id: str, message: Optional[str],
+                 tokens: Optional[List[Token]] = None, raw: Optional[RawMessage] = None):
+        """
+        Parameters
+        ----------
+        tokens : message split into text, anchors and urls. It's made from message if not given.
+        raw : message as parsed, given in place of message. It's decoded the first time message or tokens is read.
+        """
+
         super().__init__()
 
         self.number = number
@@ -16,7 +29,53 @@ class Response:
         self.mail = mail
         self.date = date
         self.id = id
-        self.message = message
+        self._message = message
+        self._tokens = tokens
+        self._raw = raw if message is None else None
+
+    @property
+    def message(self) -> str:
+        if self._message is None:
+            self._message = self._raw.decode()
+            self._raw = None
+
+        return self._message
+
+    @property
+    def tokens(self) -> List[Token]:
+        if self._tokens is None:
+            self._tokens = tokenize(self.message)
+
+        return self._tokens
+
+    @property
+    def raw(self) -> Optional[RawMessage]:
+        """
+        The undecoded message, or None once message has been read
+        """
+
+        return self._raw
+
+    def is_plain(self) -> bool:
+        """
+        True if the message has no anchors or urls, checked without decoding it if it hasn't been yet
+        """
+
+        if self._raw is not None:
+            return self._raw.is_plain()
+
+        return all(t.kind == "text" for t in self.tokens)
+
+    @staticmethod
+    def from_dict(d: Dict) -> "Response":
+        """
+        Make a response from an item of ThreadParserH.responses() or ThreadParserD.responses()
+        """
+
+        if "raw" in d:
+            return Response(d["number"], d["name"], d["mail"], d["date"], d["id"], None, raw=d["raw"])
+
+        return Response(d["number"], d["name"], d["mail"], d["date"], d["id"], d["message"], d["tokens"])
 
 
 class Thread:
@@ -29,6 +88,15 @@ class Thread:
         self.title = None
         self.responses: List[Response] = []
         self._is_pastlog: bool = False
+        self._is_stale: bool = False
+        self.validator: Optional[Validator] = None
+        # Byte length of the local copy of the dat, used by the dat sync mode
+        self.dat_size = 0
+        # Number of responses in the first dat_size bytes of the dat
+        self.dat_count = 0
+        # Ranges of responses (start, end) not fetched yet when the thread was opened progressively.
+        # end is None if the range reaches the last response.
+        self.missing: List[Tuple[int, Optional[int]]] = []
         self.on_property_changed = PropertyChangedEventHandler()
         self.on_collection_changed = CollectionChangedEventHandler()
 
@@ -41,6 +109,24 @@ class Thread:
         self._is_pastlog = value
         self.on_property_changed.invoke(PropertyChangedEventArgs(self, "is_pastlog"))
 
+    @property
+    def is_stale(self) -> bool:
+        """
+        True if the server couldn't be reached and the responses are the last copy we have
+        """
+
+        return self._is_stale
+
+    @is_stale.setter
+    def is_stale(self, value: bool):
+        if self._is_stale != value:
+            self._is_stale = value
+            self.on_property_changed.invoke(PropertyChangedEventArgs(self, "is_stale"))
+
+    @property
+    def last_number(self) -> int:
+        return self.responses[-1].number if len(self.responses) != 0 else 0
+
     def serialize(self) -> str:
         d = {}
         d["server"] = self.server
@@ -48,6 +134,10 @@ class Thread:
         d["key"] = self.key
         d["title"] = self.title
         d["is_pastlog"] = self.is_pastlog
+        d["validator"] = self.validator.to_dict() if self.validator is not None else None
+        d["dat_size"] = self.dat_size
+        d["dat_count"] = self.dat_count
+        d["missing"] = self.missing
         d["responses"] = []
 
         for r in self.responses:
@@ -57,7 +147,13 @@ class Thread:
             d2["mail"] = r.mail
             d2["date"] = r.date
             d2["id"] = r.id
-            d2["message"] = r.message
+
+            if r.raw is not None:
+                # Not read since it was parsed, so it's kept undecoded
+                d2["raw"] = r.raw.to_list()
+            else:
+                # The message is the text of the tokens joined
+                d2["tokens"] = [t.to_list() for t in r.tokens]
 
             d["responses"].append(d2)
 
@@ -71,22 +167,156 @@ class Thread:
         t.title = d["title"]
         t.is_pastlog = d["is_pastlog"]
 
+        if d.get("validator") is not None:
+            t.validator = Validator.from_dict(d["validator"])
+
+        # Without the count, appended lines can't be numbered, so the whole dat is fetched again
+        if "dat_count" in d:
+            t.dat_size = d.get("dat_size", 0)
+            t.dat_count = d["dat_count"]
+        t.missing = [tuple(x) for x in d.get("missing", [])]
+
         for r in d["responses"]:
-            t.responses.append(Response(r["number"], r["name"], r["mail"], r["date"], r["id"], r["message"]))
+            if "raw" in r:
+                t.responses.append(Response(r["number"], r["name"], r["mail"], r["date"], r["id"], None,
+                                            raw=RawMessage.from_list(r["raw"])))
+                continue
+
+            if "tokens" in r:
+                tokens = [Token.from_list(x) for x in r["tokens"]]
+                message = "".join(x.text for x in tokens)
+            else:
+                # Saved before messages were tokenized
+                (tokens, message) = (None, r["message"])
+
+            t.responses.append(Response(r["number"], r["name"], r["mail"], r["date"], r["id"], message, tokens))
 
         return t
 
     def init(self):
-        html = get_responses_after(self.server, self.board, self.key, len(self.responses))
-        parser = ThreadParserH(html)
+        self._init(*self._fetch())
 
-        self.is_pastlog = parser.is_pastlog()
+    def init_progressive(self, around: Optional[int] = None):
+        """
+        Fetch only the last responses, or the ones around the response number around, so that the thread
+        can be shown right away. The others are recorded in missing, to be fetched with fetch_range_async
+        and merged.
+        """
 
-        if self.title is None:
-            self.title = parser.title()
+        half = PROGRESSIVE_OPEN_COUNT // 2
+
+        if around is None:
+            doc = get_last_responses_document(self.server, self.board, self.key, PROGRESSIVE_OPEN_COUNT)
+        else:
+            # Near the top, the page starts from response 1 so that the same number of responses is shown
+            start = max(around - half, 1)
+            doc = get_responses_range_document(self.server, self.board, self.key, start, around + half)
+
+        self._init("html", doc)
+
+        numbers = [r.number for r in self.responses if r.number != 1]
+
+        if len(numbers) != 0:
+            if around is not None:
+                self.missing.append((self.last_number + 1, None))
+
+            if numbers[0] > 2:
+                self.missing.append((2, numbers[0] - 1))
+
+    async def fetch_range_async(self, start: int, end: Optional[int]) -> List[Response]:
+        doc = await aio.get_responses_range_document(self.server, self.board, self.key, start, end)
+        parser = ThreadParserH(doc.text)
+
+        return [Response.from_dict(r) for r in parser.responses(lazy=True, after=start - 1, until=end)]
+
+    def merge(self, responses: List[Response], start: int, end: Optional[int]):
+        """
+        Insert responses fetched for the missing range start to end, keeping self.responses in order
+        """
+
+        self._remove_missing(start, end)
+
+        numbers = [r.number for r in self.responses]
+        known = set(numbers)
+        new_responses = [r for r in responses if r.number not in known]
+
+        if len(new_responses) == 0:
+            return
+
+        if len(self.responses) == 0 or new_responses[0].number > self.last_number:
+            last_count = len(self.responses)
+            self.responses.extend(new_responses)
 
-        for r in parser.responses():
-            self.responses.append(Response(r["number"], r["name"], r["mail"], r["date"], r["id"], r["message"]))
+            self.on_collection_changed.invoke(CollectionChangedEventArgs(
+                self, "responses", CollectionChangedEventKind.EXTEND, self.responses[last_count:]))
+        else:
+            for r in new_responses:
+                idx = bisect.bisect_left(numbers, r.number)
+                numbers.insert(idx, r.number)
+                self.responses.insert(idx, r)
+
+            self.on_collection_changed.invoke(CollectionChangedEventArgs(
+                self, "responses", CollectionChangedEventKind.ADD, new_responses))
+
+    def _remove_missing(self, start: int, end: Optional[int]):
+        stop = float("inf") if end is None else end
+        missing = []
+
+        for (s, e) in self.missing:
+            last = float("inf") if e is None else e
+
+            if s < start:
+                missing.append((s, int(min(last, start - 1))))
+
+            if last > stop:
+                missing.append((int(max(s, stop + 1)), e))
+
+        self.missing = missing
+
+    def update(self):
+        try:
+            (endpoint, doc) = self._fetch()
+        except URLError as e:
+            self._fetch_failed(e)
+            return
+
+        self._update(endpoint, doc)
+
+    def _fetch_failed(self, e: URLError):
+        # Keep showing the responses we have if the server is down
+        if not is_unavailable(e) or len(self.responses) == 0:
+            raise e
+
+        self.is_stale = True
+
+    def _fetch(self) -> Tuple[str, Document]:
+        """
+        Returns
+        -------
+        (endpoint the document came from ("html" or "dat"), document)
+        """
+
+        if THREAD_SYNC == "dat":
+            return ("dat", get_dat_document(self.server, self.board, self.key, self.dat_size))
+        elif THREAD_SYNC == "hedged":
+            return get_thread_document(self.server, self.board, self.key, self.last_number, self.dat_size,
+                                       self.validator)
+        else:
+            return ("html", get_responses_after_document(self.server, self.board, self.key, self.last_number,
+                                                         self.validator))
+
+    async def _fetch_async(self) -> Tuple[str, Document]:
+        if THREAD_SYNC == "dat":
+            return ("dat", await aio.get_dat_document(self.server, self.board, self.key, self.dat_size))
+        elif THREAD_SYNC == "hedged":
+            return await aio.get_thread_document(self.server, self.board, self.key, self.last_number,
+                                                 self.dat_size, self.validator)
+        else:
+            return ("html", await aio.get_responses_after_document(self.server, self.board, self.key,
+                                                                   self.last_number, self.validator))
+
+    def _init(self, endpoint: str, doc: Document):
+        self.responses.extend(self._parse(endpoint, doc))
 
         self.on_property_changed.invoke(PropertyChangedEventArgs(self, "is_pastlog"))
         self.on_property_changed.invoke(PropertyChangedEventArgs(self, "title"))
@@ -94,27 +324,93 @@ class Thread:
         self.on_collection_changed.invoke(CollectionChangedEventArgs(
             self, "responses", CollectionChangedEventKind.EXTEND, self.responses[0:]))
 
-    def update(self):
-        html = get_responses_after(self.server, self.board, self.key, len(self.responses))
-        parser = ThreadParserH(html)
+    def _update(self, endpoint: str, doc: Document):
+        self.is_stale = False
+        new_responses = self._parse(endpoint, doc)
+
+        if len(new_responses) == 0:
+            return
+
+        last_count = len(self.responses)
+        self.responses.extend(new_responses)
+
+        self.on_collection_changed.invoke(CollectionChangedEventArgs(
+            self, "responses", CollectionChangedEventKind.EXTEND, self.responses[last_count:]))
+
+    def _parse(self, endpoint: str, doc: Document) -> List[Response]:
+        """
+        Returns
+        -------
+        responses in doc which are not in self.responses yet
+        """
+
+        if endpoint == "dat":
+            return self._parse_dat(doc)
+        else:
+            return self._parse_html(doc)
+
+    def _parse_html(self, doc: Document) -> List[Response]:
+        # Nothing has been posted since the last update
+        if not doc.modified:
+            return []
+
+        self.validator = doc.validator
+        parser = ThreadParserH(doc.text)
 
         self.is_pastlog = parser.is_pastlog()
-        self.on_property_changed.invoke(PropertyChangedEventArgs(self, "is_pastlog"))
 
+        if self.title is None:
+            self.title = parser.title()
+
+        # The page starts with response 1, which is passed over with the others we already have
+        return [Response.from_dict(r) for r in parser.responses(lazy=True, after=self.last_number)]
+
+    def _parse_dat(self, doc: Document) -> List[Response]:
+        """
+        doc is either the whole dat or only the bytes appended since the last sync
+        """
+
+        if doc.partial:
+            # Fetched in the background and applied after an update already took these bytes
+            if doc.offset != self.dat_size:
+                return []
+
+            start = self.dat_count + 1
+            parser = ThreadParserD(doc.text, start)
+            self.dat_size += doc.size
+        else:
+            start = 1
+            parser = ThreadParserD(doc.text)
+            self.dat_size = doc.size
+
+            if self.title is None:
+                self.title = parser.title()
+
+            self.is_pastlog = parser.is_pastlog()
+
+        # Every line counts, including deleted responses the parser can't read, so that the lines appended next
+        # get the right numbers
+        text = doc.text.rstrip("\n")
+        self.dat_count = start + text.count("\n") if len(text) != 0 else start - 1
+
+        # The thread may have been updated through read.cgi since the dat was last read
         new_responses = []
-        for r in parser.responses():
-            new_responses.append(Response(r["number"], r["name"], r["mail"], r["date"], r["id"], r["message"]))
+        for r in parser.responses(lazy=True):
+            if r["number"] > self.last_number:
+                new_responses.append(Response.from_dict(r))
 
-        last_count = len(self.responses)
+        return new_responses
 
-        # There are no new posts
-        if len(new_responses) == 1:
-            return
+    async def fetch_update_async(self) -> Tuple[str, Document]:
+        """
+        Fetch what update() would, without changing the thread.
+        The result is applied with apply_update() on the UI thread.
+        """
 
-        self.responses.extend(new_responses[1:])
+        return await self._fetch_async()
 
-        self.on_collection_changed.invoke(CollectionChangedEventArgs(
-            self, "responses", CollectionChangedEventKind.EXTEND, self.responses[last_count:]))
+    def apply_update(self, endpoint: str, doc: Document):
+        self._update(endpoint, doc)
 
-    def post(self, name: str, mail: str, message: str) -> str:
-        return post_response(self.server, self.board, self.key, name, mail, message)
+    async def post_async(self, name: str, mail: str, message: str) -> str:
+        return await aio.post_response(self.server, self.board, self.key, name, mail, message)
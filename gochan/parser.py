@@ -1,6 +1,139 @@
 import re
 from html import unescape
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Tuple, Union
+
+# Markup of read.cgi scanned by ThreadParserH
+POST_START = '<div class="post" id="'
+MAILTO = '<a href="mailto:'
+SPAN_END = "</span>"
+MESSAGE_END = "</div></div><br>"
+
+# Lines of dat which _split_dat_line can't handle
+DAT_LINE = re.compile(r"(.*?)<>(.*?)<>(.*? .*?) (.*?)<> (.*?) <>.*")
+DAT_BOLD = re.compile(r"</?b>")
+DAT_BREAK = re.compile(r" ?<br> ")
+TAG = re.compile(r"<.*?>")
+
+# Urls run until a space or a line break. An anchor is a list of numbers and ranges (>>1, >>1-3, >>1,3-5).
+MESSAGE_TOKEN = re.compile(r"(https?://[^ \n]*)|>>(\d{1,4}(?:-\d{1,4})?(?:,\d{1,4}(?:-\d{1,4})?)*)")
+IMAGE_LINK = re.compile(r".*\.(jpg|png|jpeg|gif)")
+
+
+class Token:
+    """
+    Piece of a message: "text", "anchor", "url" or "image" (a url of an image).
+    targets of an anchor are the ranges (start, end) of response numbers it points to.
+    """
+
+    __slots__ = ("kind", "text", "targets")
+
+    def __init__(self, kind: str, text: str, targets: Optional[List[Tuple[int, int]]] = None):
+        super().__init__()
+        self.kind = kind
+        self.text = text
+        self.targets = targets
+
+    def numbers(self, limit: int) -> List[int]:
+        """
+        Response numbers an anchor points to, at most limit of each range
+        """
+
+        numbers = []
+
+        for (start, end) in self.targets or []:
+            numbers.extend(range(start, min(end, start + limit - 1) + 1))
+
+        return numbers
+
+    def to_list(self) -> list:
+        if self.targets is None:
+            return [self.kind, self.text]
+
+        return [self.kind, self.text, self.targets]
+
+    @staticmethod
+    def from_list(x: list) -> "Token":
+        return Token(x[0], x[1], [tuple(t) for t in x[2]] if len(x) > 2 else None)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Token) and self.to_list() == other.to_list()
+
+    def __repr__(self) -> str:
+        return f"Token{tuple(self.to_list())}"
+
+
+def tokenize(message: str) -> List[Token]:
+    """
+    Split a decoded message into tokens. Joining their text gives back the message.
+    """
+
+    tokens = []
+    pos = 0
+
+    for m in MESSAGE_TOKEN.finditer(message):
+        if m.start() > pos:
+            tokens.append(Token("text", message[pos:m.start()]))
+
+        url = m.group(1)
+
+        if url is not None:
+            tokens.append(Token("image" if IMAGE_LINK.match(url) is not None else "url", url))
+        else:
+            targets = []
+
+            for part in m.group(2).split(","):
+                (start, _, end) = part.partition("-")
+                (start, end) = (int(start), int(end or start))
+                targets.append((min(start, end), max(start, end)))
+
+            tokens.append(Token("anchor", m.group(0), targets))
+
+        pos = m.end()
+
+    if pos < len(message):
+        tokens.append(Token("text", message[pos:]))
+
+    return tokens
+
+
+class RawMessage:
+    """
+    Message as it appears in read.cgi (dat is False) or dat, decoded (tags stripped, line breaks and
+    entities converted) only when decode() is called
+    """
+
+    __slots__ = ("markup", "dat")
+
+    def __init__(self, markup: str, dat: bool):
+        super().__init__()
+        self.markup = markup
+        self.dat = dat
+
+    def decode(self) -> str:
+        msg = self.markup
+
+        if self.dat:
+            if "<" in msg:
+                msg = TAG.sub("", DAT_BREAK.sub("\n", msg))
+        else:
+            msg = _strip_tags(msg, True)
+
+        return unescape(msg) if "&" in msg else msg
+
+    def is_plain(self) -> bool:
+        """
+        True if the decoded message can't have anchors or urls, which is known without decoding it:
+        ">" outside tags is always escaped and urls keep their scheme
+        """
+
+        return "http" not in self.markup and "&gt" not in self.markup and "&#" not in self.markup
+
+    def to_list(self) -> list:
+        return [self.markup, self.dat]
+
+    @staticmethod
+    def from_list(x: list) -> "RawMessage":
+        return RawMessage(x[0], x[1])
 
 
 class CategoryParser():
@@ -120,55 +253,76 @@ class ThreadParserH:
         return self._html
 
     def title(self) -> str:
-        return unescape(re.search("<title>(.*?)\n</title>", self._html).group(1)).strip()
+        return unescape(re.search("<title>(.*?)\n</title>", self._header()).group(1)).strip()
 
     def is_pastlog(self) -> bool:
-        return re.search('<div class="stoplight stopred stopdone', self._html) is None
+        return '<div class="stoplight stopred stopdone' not in self._header()
 
-    def responses(self) -> List[Dict[str, Union[str, int]]]:
+    def responses(self, lazy: bool = False, after: int = 0,
+                  until: Optional[int] = None) -> List[Dict[str, Union[str, int]]]:
         """
+        Parameters
+        ----------
+        lazy : if True, the messages are left undecoded as "raw" (RawMessage) in place of message and tokens
+        after : posts numbered up to after (those already known) are passed over without being read
+        until : scanning stops at the first post numbered above until
+
         Returns
         -------
-        [{number, mail, name, date, id, message}]
+        [{number, mail, name, date, id, message, tokens}]
         """
-        re_res = re.compile(
-            r'<div class="post" id="(?P<num>\d+)".*?"name"><b>(<a href="mailto:(?P<mail>.*?)">)?(?P<name>.*?)(</a>)?'
-            r'</b></span>.*?"date">(?P<date>.*?)<.*?"uid">(?P<id>.*?)<.*?(<span.*?>)+? (?P<msg>.*?) (</span>)+?</div>'
-            r'</div><br>'
-        )
 
-        # re_link = re.compile(r'<a href="http.*?>(.*?)</a>|<a class="image".*?>(.*?)</a>')
+        html = self._html
+        responses = []
+        pos = html.find(POST_START)
 
-        # re_anchor = re.compile(r'<a href.*?class="reply_link">(.*?)</a>')
+        while pos != -1:
+            # Posts are in order of number, so only the number is read until after is passed
+            number = _post_number(html, pos + len(POST_START))
 
-        br = re.compile(r' ?<br> ')
-        tag = re.compile(r'<.*?>')
+            if number is not None and until is not None and number > until:
+                break
 
-        responses = []
-        for res in re_res.finditer(self._html):
-            number = int(res.group("num"))
-            mail = res.group("mail")
-            name = tag.sub("", res.group("name"))
-            date = res.group("date")
-            id = res.group("id")
-            msg = res.group("msg")
-
-            msg = br.sub("\n", msg)
-            msg = tag.sub("", msg)
-            msg = unescape(msg)
-
-            responses.append({
-                "number": number, "name": name, "mail": mail, "date": date, "id": id, "message": msg
-            })
+            next_pos = html.find(POST_START, pos + len(POST_START))
+
+            if number is not None and number <= after:
+                pos = next_pos
+                continue
+
+            end = next_pos if next_pos != -1 else len(html)
+
+            # A post never spans lines, so a broken one can't run into the rest of the page
+            line_end = html.find("\n", pos, end)
+            res = _scan_post(html, pos + len(POST_START), line_end if line_end != -1 else end, lazy)
+
+            if res is not None:
+                responses.append(res)
+
+            pos = next_pos
 
         return responses
 
+    def _header(self) -> str:
+        """
+        The page up to the first post, which has the title and the stoplight
+        """
+
+        pos = self._html.find(POST_START)
+        return self._html if pos == -1 else self._html[:pos]
+
 
 class ThreadParserD:
-    def __init__(self, dat: str):
+    def __init__(self, dat: str, start: int = 1):
+        """
+        Parameters
+        ----------
+        start : response number of the first line, used when parsing only the lines appended to a dat
+        """
+
         super().__init__()
         self._dat = dat
         self._lines = dat.split("\n")
+        self._start = start
 
     @property
     def text(self):
@@ -181,46 +335,261 @@ class ThreadParserD:
         if len(self._lines) == 2:
             r = self.responses()
 
-            if r[1]["name"] == "５ちゃんねる ★"\
+            if len(r) == 2 and r[1]["name"] == "５ちゃんねる ★"\
                     and r[1]["message"].startswith("このスレッドは過去ログです"):
                 return True
 
         return False
 
-    def responses(self) -> List[Dict[str, Union[str, int]]]:
+    def responses(self, lazy: bool = False) -> List[Dict[str, Union[str, int]]]:
         """
+        If lazy is True, the messages are left undecoded as "raw" (RawMessage) in place of message and tokens
+
         Returns
         -------
-        [{number, mail, name, date, id, message}]
+        [{number, mail, name, date, id, message, tokens}]
         """
 
-        re_res = re.compile(r"(.*?)<>(.*?)<>(.*? .*?) (.*?)<> (.*?) <>.*")
-        re_b = re.compile(r"</?b>")
-        # re_img = re.compile(r'<a class="image".*?>(.*?)</a>')
-        # re_link = re.compile(r'(http.*?)(?: |$)')
-        br = re.compile(r'< ?<br> >')
-        tag = re.compile(r'<.*?>')
-
         responses = []
 
-        for i, l in enumerate(self._lines, 1):
-            m = re_res.search(l)
+        for i, l in enumerate(self._lines, self._start):
+            fields = _split_dat_line(l)
 
-            if m is None:
-                continue
+            # Malformed lines are left to the regular expression, which is slower but more forgiving
+            if fields is None:
+                m = DAT_LINE.search(l)
+
+                if m is None:
+                    continue
+
+                fields = m.groups()
 
-            name = re_b.sub("", m.group(1))
-            mail = m.group(2)
-            date = m.group(3)
-            id = m.group(4)
-            msg = m.group(5)
+            (name, mail, date, id, msg) = fields
 
-            msg = br.sub("\n", msg)
-            msg = tag.sub("", msg)
-            msg = unescape(msg)
+            if "<" in name:
+                name = DAT_BOLD.sub("", name)
 
-            responses.append({
-                "number": i, "name": name, "mail": mail, "date": date, "id": id, "message": msg
-            })
+            res = {"number": i, "name": name, "mail": mail, "date": date, "id": id}
+            _add_message(res, RawMessage(msg, True), lazy)
+            responses.append(res)
 
         return responses
+
+
+class PostResultParser:
+    """
+    Page returned by bbs.cgi after posting
+    """
+
+    def __init__(self, html: str):
+        super().__init__()
+        self._html = html
+
+    @property
+    def text(self):
+        return self._html
+
+    def title(self) -> str:
+        m = re.search(r"<title>(.*?)</title>", self._html, re.DOTALL)
+        return unescape(m.group(1)).strip() if m is not None else ""
+
+    def is_success(self) -> bool:
+        return "書きこみました" in self.title()
+
+    def is_confirmation(self) -> bool:
+        """
+        True if the server asks to confirm the post (e.g. the cookie wasn't set yet)
+        """
+
+        return "書き込み確認" in self.title()
+
+    def message(self) -> str:
+        """
+        Text of the body without tags, to be shown to the user
+        """
+
+        m = re.search(r"<body.*?>(.*)</body>", self._html, re.DOTALL | re.IGNORECASE)
+        body = m.group(1) if m is not None else self._html
+        body = re.sub(r"<br>", "\n", body, flags=re.IGNORECASE)
+        body = re.sub(r"<(script|style|form).*?</\1>", "", body, flags=re.DOTALL | re.IGNORECASE)
+        body = unescape(re.sub(r"<.*?>", "", body, flags=re.DOTALL))
+
+        return "\n".join(x.strip() for x in body.splitlines() if len(x.strip()) != 0)
+
+
+def _post_number(html: str, pos: int) -> Optional[int]:
+    """
+    Number in the id of the post starting at pos (just after POST_START)
+    """
+
+    i = html.find('"', pos, pos + 16)
+    return int(html[pos:i]) if i != -1 and html[pos:i].isdecimal() else None
+
+
+def _scan_post(html: str, pos: int, end: int, lazy: bool) -> Optional[Dict[str, Union[str, int]]]:
+    """
+    Read one post of read.cgi from pos (just after POST_START) to end with str.find, which never backtracks.
+    Returns None if a part is missing.
+    """
+
+    i = html.find('"', pos, end)
+
+    if i == -1 or not html[pos:i].isdecimal():
+        return None
+
+    number = int(html[pos:i])
+
+    i = html.find('"name"><b>', i, end)
+
+    if i == -1:
+        return None
+
+    i += len('"name"><b>')
+    mail = None
+
+    if html.startswith(MAILTO, i):
+        j = html.find('">', i + len(MAILTO), end)
+
+        if j == -1:
+            return None
+
+        mail = html[i + len(MAILTO):j]
+        i = j + 2
+
+    j = html.find("</b></span>", i, end)
+
+    if j == -1:
+        return None
+
+    name = html[i:j - 4] if j - 4 >= i and html.startswith("</a>", j - 4) else html[i:j]
+    (date, i) = _scan_field(html, '"date">', j, end)
+    (id, i) = _scan_field(html, '"uid">', i, end)
+
+    if date is None or id is None:
+        return None
+
+    # The message starts after the first <span ...> followed by a space
+    while True:
+        i = html.find("<span", i, end)
+
+        if i == -1:
+            return None
+
+        i = html.find(">", i, end)
+
+        if i == -1:
+            return None
+
+        if html.startswith(" ", i + 1):
+            msg_start = i + 2
+            break
+
+    # and ends before a space and one or more </span> which close the post
+    j = html.find(MESSAGE_END, msg_start, end)
+
+    if j == -1:
+        return None
+
+    closes = []
+
+    while j - len(SPAN_END) >= msg_start and html.startswith(SPAN_END, j - len(SPAN_END)):
+        j -= len(SPAN_END)
+        closes.append(j)
+
+    # The earliest space that only </span> follow
+    msg_end = next((k - 1 for k in reversed(closes) if k - 1 >= msg_start and html[k - 1] == " "), None)
+
+    if msg_end is None:
+        return None
+
+    res = {"number": number, "name": _strip_tags(name), "mail": mail, "date": date, "id": id}
+    _add_message(res, RawMessage(html[msg_start:msg_end], False), lazy)
+
+    return res
+
+
+def _add_message(res: Dict, raw: RawMessage, lazy: bool):
+    if lazy:
+        res["raw"] = raw
+    else:
+        res["message"] = raw.decode()
+        res["tokens"] = tokenize(res["message"])
+
+
+def _scan_field(html: str, marker: str, pos: int, end: int) -> Tuple[Optional[str], int]:
+    """
+    Returns
+    -------
+    (text from after marker up to the next tag, position of that tag), or (None, pos) if there's no marker
+    """
+
+    i = html.find(marker, pos, end)
+
+    if i == -1:
+        return (None, pos)
+
+    i += len(marker)
+    j = html.find("<", i, end)
+
+    if j == -1:
+        return (None, pos)
+
+    return (html[i:j], j)
+
+
+def _strip_tags(text: str, breaks: bool = False) -> str:
+    """
+    Remove tags. If breaks is True, " <br> " (the leading space is optional) becomes a newline
+    """
+
+    if "<" not in text:
+        return text
+
+    parts = []
+    i = 0
+
+    while True:
+        j = text.find("<", i)
+
+        if j == -1:
+            break
+
+        k = text.find(">", j)
+
+        if k == -1:
+            break
+
+        if breaks and text.startswith("<br> ", j):
+            # A space before it goes too, unless it was the one after the previous <br>
+            parts.append(text[i:j - 1] if j - 1 >= i and text[j - 1] == " " else text[i:j])
+            parts.append("\n")
+            i = k + 2
+        else:
+            parts.append(text[i:j])
+            i = k + 1
+
+    parts.append(text[i:])
+    return "".join(parts)
+
+
+def _split_dat_line(line: str) -> Optional[Tuple[str, str, str, str, str]]:
+    """
+    Split a line of dat (name<>mail<>date ID<> message <>title) into (name, mail, date, id, message)
+    the same way DAT_LINE does, or return None if it isn't well formed
+    """
+
+    parts = line.split("<>", 4)
+
+    if len(parts) != 5:
+        return None
+
+    (name, mail, stamp, msg, _) = parts
+
+    # The date itself has a space in it ("2020/05/01(金) 00:00:00.00"), the id comes after the next one
+    i = stamp.find(" ")
+    j = stamp.find(" ", i + 1) if i != -1 else -1
+
+    if j == -1 or len(msg) < 2 or msg[0] != " " or msg[-1] != " ":
+        return None
+
+    return (name, mail, stamp[:j], stamp[j + 1:], msg[1:-1])
@@ -20,14 +20,22 @@ class Storage:
         return self._path.joinpath(file_name).read_bytes()
 
     def store(self, file_name, data):
+        self.file_path(file_name).write_bytes(data)
+        self.trim()
+
+    def file_path(self, file_name) -> Path:
+        """
+        Path to write file_name to directly. Call trim() after writing it.
+        """
+
         if not self._path.exists():
             self._path.mkdir(mode=0o777, parents=True)
 
-        dst = self._path.joinpath(file_name)
-        dst.write_bytes(data)
+        return self._path.joinpath(file_name)
 
-        # remove overflowed file
-        items = list(self._path.iterdir())
+    def trim(self):
+        # remove overflowed file (files still being written are left alone)
+        items = [x for x in self._path.iterdir() if x.suffix != ".part"]
         items.sort(key=lambda x: x.stat().st_atime)
 
         for i in range((len(items) + 1) - self._max_cache):
@@ -55,6 +55,10 @@ class BoardVM:
     def threads(self) -> Optional[List[ThreadHeader]]:
         return self._threads
 
+    @property
+    def is_stale(self) -> Optional[bool]:
+        return self._board.is_stale if self._board is not None else None
+
     @property
     def name(self) -> Optional[str]:
         return self._app_context.bbsmenu.dns[self._board.board] \
@@ -152,6 +156,8 @@ class BoardVM:
         if e.property_name == "threads":
             self._search_word = None
             self._update_threads()
+        elif e.property_name == "is_stale":
+            self.on_property_changed.invoke(PropertyChangedEventArgs(self, "is_stale"))
 
     def _ng_changed(self, e: CollectionChangedEventArgs):
         self._search_word = None
@@ -1,4 +1,4 @@
-from typing import Union
+from typing import Optional, Union
 
 from gochan.event_handler import (OrderChangedEventArg, OrderChangedEventHandler, PropertyChangedEventArgs,
                                   PropertyChangedEventHandler)
@@ -12,6 +12,7 @@ class FavoritesVM:
         self._app_context = app_context
         self._app_context.favorites.on_property_changed.add(self._context_changed)
         self._app_context.favorites.on_order_changed.add(self._order_changed)
+        self._app_context.history.on_property_changed.add(self._history_changed)
 
         self.on_property_changed = PropertyChangedEventHandler()
         self.on_order_changed = OrderChangedEventHandler()
@@ -32,6 +33,24 @@ class FavoritesVM:
     def lower_order(self, item: Union[FavoriteThread, FavoriteBoard]):
         self._app_context.favorites.lower_order(item)
 
+    def refresh(self):
+        self._app_context.refresh_favorites()
+
+    def unread(self, item: FavoriteThread) -> Optional[int]:
+        """
+        Returns
+        -------
+        number of responses after the bookmark, or None if the thread hasn't been read or refreshed
+        """
+
+        count = self._app_context.favorites.count(item)
+        history = self._app_context.history.get(item.board, item.key)
+
+        if count is None or history is None:
+            return None
+
+        return max(count, history.retrieved_reses) - history.bookmark
+
     def open_thread(self, item: FavoriteThread):
         self._app_context.set_thread(item.server, item.board, item.key)
 
@@ -39,7 +58,13 @@ class FavoritesVM:
         self._app_context.set_board(item.server, item.board)
 
     def _context_changed(self, e: PropertyChangedEventArgs):
-        self.on_property_changed.invoke(PropertyChangedEventArgs(self, "list"))
+        if e.property_name == "counts":
+            self.on_property_changed.invoke(PropertyChangedEventArgs(self, "unread"))
+        else:
+            self.on_property_changed.invoke(PropertyChangedEventArgs(self, "list"))
+
+    def _history_changed(self, e: PropertyChangedEventArgs):
+        self.on_property_changed.invoke(PropertyChangedEventArgs(self, "unread"))
 
     def _order_changed(self, e: OrderChangedEventArg):
         self.on_order_changed.invoke(e)
@@ -1,3 +1,4 @@
+import io
 from typing import Optional, Union
 from urllib.error import HTTPError, URLError
 
@@ -13,7 +14,7 @@ class ImageVM:
         self.on_property_changed = PropertyChangedEventHandler()
 
     @property
-    def image(self) -> Optional[Union[str, HTTPError, URLError]]:
+    def image(self) -> Optional[Union[str, io.BytesIO, HTTPError, URLError]]:
         return self._app_context.image
 
     def _context_changed(self, e: PropertyChangedEventArgs):
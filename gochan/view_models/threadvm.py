@@ -1,4 +1,3 @@
-import re
 from typing import Dict, List, Optional, Union
 
 from gochan.event_handler import (CollectionChangedEventArgs, CollectionChangedEventHandler, CollectionChangedEventKind,
@@ -6,8 +5,12 @@ from gochan.event_handler import (CollectionChangedEventArgs, CollectionChangedE
 from gochan.models.app_context import AppContext
 from gochan.models.favorites import FavoriteThread
 from gochan.models.ng import NG, NGKind, Hide, Aborn
+from gochan.models.post_queue import PostJob, PostStatus  # noqa: F401
 from gochan.models.thread import Response
 
+# An anchor to a range counts as a reply to this many of its responses at most (>>1-1000 isn't a reply to all)
+ANCHOR_RANGE_LIMIT = 10
+
 
 class ThreadVM:
     def __init__(self, app_context: AppContext):
@@ -17,8 +20,10 @@ class ThreadVM:
         self._thread = app_context.thread
         self._responses = None
         self._links = None
+        self._images = None
         self._replies = None
         self._ids = None
+        self._post_job: Optional[PostJob] = None
         self.on_property_changed = PropertyChangedEventHandler()
         self.on_collection_changed = CollectionChangedEventHandler()
 
@@ -26,6 +31,7 @@ class ThreadVM:
         app_context.ng.on_collection_changed.add(self._ng_changed)
         app_context.history.on_property_changed.add(self._history_changed)
         app_context.favorites.on_property_changed.add(self._favorites_changed)
+        app_context.posts.on_property_changed.add(self._post_changed)
 
     @property
     def server(self) -> Optional[str]:
@@ -47,6 +53,10 @@ class ThreadVM:
     def is_pastlog(self) -> Optional[bool]:
         return self._thread.is_pastlog if self._thread is not None else None
 
+    @property
+    def is_stale(self) -> Optional[bool]:
+        return self._thread.is_stale if self._thread is not None else None
+
     @property
     def responses(self) -> Optional[List[Union[Response, Aborn, Hide]]]:
         return self._responses
@@ -55,6 +65,14 @@ class ThreadVM:
     def links(self) -> Optional[List[str]]:
         return self._links
 
+    @property
+    def images(self) -> Optional[List[str]]:
+        """
+        The links which are images, in the same order
+        """
+
+        return self._images
+
     @property
     def replies(self) -> Optional[List[str]]:
         return self._replies
@@ -77,6 +95,14 @@ class ThreadVM:
             else:
                 return False
 
+    @property
+    def post_job(self) -> Optional[PostJob]:
+        """
+        The last post made from this view
+        """
+
+        return self._post_job
+
     @property
     def ng(self) -> NG:
         return self._app_context.ng
@@ -91,11 +117,9 @@ class ThreadVM:
     def set_image(self, url: str):
         self._app_context.set_image(url)
 
-    def post(self, name: str, mail: str, msg: str) -> Optional[str]:
+    def post(self, name: str, mail: str, msg: str):
         if self._thread is not None:
-            return self._thread.post(name, mail, msg)
-
-        return None
+            self._post_job = self._app_context.posts.submit(self._thread, name, mail, msg)
 
     def add_ng_name(self, value, use_reg, hide, auto_ng_id, board, key):
         self._app_context.ng.add_ng_name(value, use_reg, hide, auto_ng_id, board, key)
@@ -107,7 +131,7 @@ class ThreadVM:
         self._app_context.ng.add_ng_word(value, use_reg, hide, auto_ng_id, board, key)
 
     def save_history(self, bookmark: int):
-        self._app_context.history.save(self._thread.board, self._thread.key, bookmark, len(self._thread.responses))
+        self._app_context.history.save(self._thread.board, self._thread.key, bookmark, self._thread.last_number)
 
     def favorite(self):
         if self._app_context.thread is not None:
@@ -135,12 +159,15 @@ class ThreadVM:
 
             self._responses = []
             self._links = []
+            self._images = []
             self._replies = {}
             self._ids = {}
 
             for r in self._thread.responses:
                 self._filter_response(r)
 
+            self._app_context.prefetch_images(self._images)
+
             self.on_property_changed.invoke(PropertyChangedEventArgs(self, "server"))
             self.on_property_changed.invoke(PropertyChangedEventArgs(self, "board"))
             self.on_property_changed.invoke(PropertyChangedEventArgs(self, "key"))
@@ -152,14 +179,34 @@ class ThreadVM:
     def _thread_property_changed(self, e: PropertyChangedEventArgs):
         if e.property_name == "is_pastlog":
             self.on_property_changed.invoke(PropertyChangedEventArgs(self, "is_pastlog"))
+        elif e.property_name == "is_stale":
+            self.on_property_changed.invoke(PropertyChangedEventArgs(self, "is_stale"))
 
     def _thread_collection_changed(self, e: CollectionChangedEventArgs):
-        if e.property_name == "responses":
+        if e.property_name == "responses" and e.kind == CollectionChangedEventKind.ADD:
+            # Responses were inserted in the middle, so the filtered lists are built again
+            self._responses = []
+            self._links = []
+            self._images = []
+            self._replies = {}
+            self._ids = {}
+
+            for r in self._thread.responses:
+                self._filter_response(r)
+
+            self._app_context.prefetch_images(self._images)
+
+            self.on_collection_changed.invoke(CollectionChangedEventArgs(
+                self, "responses", CollectionChangedEventKind.ADD, e.item))
+        elif e.property_name == "responses":
             last_count = len(self._responses)
+            last_image_count = len(self._images)
 
             for r in e.item:
                 self._filter_response(r)
 
+            self._app_context.prefetch_images(self._images[last_image_count:])
+
             self.on_collection_changed.invoke(CollectionChangedEventArgs(
                 self, "responses", CollectionChangedEventKind.EXTEND, self._responses[last_count:]))
 
@@ -167,6 +214,7 @@ class ThreadVM:
         if self._thread is not None:
             self._responses = []
             self._links = []
+            self._images = []
             self._replies = {}
             self._ids = {}
 
@@ -180,13 +228,17 @@ class ThreadVM:
     def _history_changed(self, e: PropertyChangedEventArgs):
         self.on_property_changed.invoke(PropertyChangedEventArgs(self, "history"))
 
+    def _post_changed(self, e: PropertyChangedEventArgs):
+        if e.sender is self._post_job:
+            self.on_property_changed.invoke(PropertyChangedEventArgs(self, "post_job"))
+
     def _favorites_changed(self, e: PropertyChangedEventArgs):
         self.on_property_changed.invoke(PropertyChangedEventArgs(self, "is_favorite"))
 
     def _filter_response(self, r: Response):
         """
         Before calling this method, make sure self._thread is not None &
-        self._responses, self._links, self._replies and self._ids have been initialized
+        self._responses, self._links, self._images, self._replies and self._ids have been initialized
         """
 
         kind = self._app_context.ng.is_ng_response(r, self._thread.board, self._thread.key)
@@ -194,17 +246,22 @@ class ThreadVM:
         if kind == NGKind.NOT_NG:
             self._responses.append(r)
 
-            for link in re.finditer(r'(https?://.*?)(?=$|\n| )', r.message):
-                self._links.append(link.group(1))
+            # Nothing to collect, and the message is left undecoded if it hasn't been read yet
+            tokens = [] if r.is_plain() else r.tokens
 
-            for reply in re.finditer(r'>>(\d{1,4})', r.message):
-                key = int(reply.group(1))
+            for t in tokens:
+                if t.kind == "url" or t.kind == "image":
+                    self._links.append(t.text)
 
-                if key not in self._replies:
-                    self._replies[key] = []
+                    if t.kind == "image":
+                        self._images.append(t.text)
+                elif t.kind == "anchor":
+                    for key in t.numbers(ANCHOR_RANGE_LIMIT):
+                        if key not in self._replies:
+                            self._replies[key] = []
 
-                if r not in self._replies[key]:
-                    self._replies[key].append(r)
+                        if r not in self._replies[key]:
+                            self._replies[key].append(r)
 
             if r.id in self._ids:
                 self._ids[r.id].append(r)
@@ -79,7 +79,7 @@ class BoardView(Frame):
             self._threads = self._data_context.threads
             self._update_options()
             self._update_title()
-        elif e.property_name == "is_favorite":
+        elif e.property_name == "is_favorite" or e.property_name == "is_stale":
             self._update_title()
 
     def _back_btn_clicked(self):
@@ -111,6 +111,9 @@ class BoardView(Frame):
         if self._data_context.is_favorite:
             title += " ★"
 
+        if self._data_context.is_stale:
+            title += " (offline)"
+
         self._title_label.text = title
 
     def _update_options(self):
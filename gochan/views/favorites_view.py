@@ -67,6 +67,9 @@ class FavoritesView(Frame):
                 if self._selected_item is not None:
                     self._context.remove(self._selected_item)
                 return None
+            elif event.key_code == ord("U"):
+                self._context.refresh()
+                return None
 
         return super().process_event(event)
 
@@ -75,7 +78,12 @@ class FavoritesView(Frame):
 
         for i, item in enumerate(self._list):
             if isinstance(item, FavoriteThread):
-                options.append((item.title, i))
+                unread = self._context.unread(item)
+
+                if unread is not None and unread > 0:
+                    options.append((item.title + " (" + str(unread) + ")", i))
+                else:
+                    options.append((item.title, i))
             else:
                 options.append((item.name, i))
 
@@ -100,6 +108,13 @@ class FavoritesView(Frame):
                 raise NextScene("Board")
 
     def _context_changed(self, e: PropertyChangedEventArgs):
+        if e.property_name == "unread":
+            # Only the labels change, so keep the selection
+            idx = self._list_box.value
+            self._update_list()
+            self._list_box.value = idx
+            return
+
         self._list = self._context.list
         self._selected_item = None
         self._update_list()
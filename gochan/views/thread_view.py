@@ -15,11 +15,9 @@ from gochan.effects.help import Help
 from gochan.event_handler import CollectionChangedEventArgs, PropertyChangedEventArgs
 from gochan.keybinding import KEY_BINDINGS
 from gochan.theme import THREAD_BRUSHES
-from gochan.view_models.threadvm import ThreadVM
+from gochan.view_models.threadvm import PostStatus, ThreadVM
 from gochan.widgets.responses_viewer import ResponsesViewer
 
-link_reg = re.compile(r'(https?://.*?)(?=$|\n| )')
-
 
 class ThreadView(Frame):
     def __init__(self, screen: Screen, data_context: ThreadVM):
@@ -99,8 +97,14 @@ class ThreadView(Frame):
                                                 self._data_context.bookmark)
                 self._update_title()
                 self._responses_viewer.scroll_to_bookmark()
-        elif e.property_name == "is_favorite":
+        elif e.property_name == "is_favorite" or e.property_name == "is_stale":
+            self._update_title()
+        elif e.property_name == "post_job":
             self._update_title()
+            job = self._data_context.post_job
+
+            if job.is_finished and job.message is not None:
+                self._scene.add_effect(PopUpDialog(self._screen, job.message, ["Close"], theme="user_theme"))
 
     def _collection_changed(self, e: CollectionChangedEventArgs):
         self._responses_viewer.set_data(self._data_context.responses,
@@ -116,6 +120,16 @@ class ThreadView(Frame):
         if self._data_context.is_favorite:
             title += " ★"
 
+        if self._data_context.is_stale:
+            title += " (offline)"
+
+        job = self._data_context.post_job
+
+        if job is not None and job.status == PostStatus.SENDING:
+            title += " (posting...)"
+        elif job is not None and job.status == PostStatus.RETRYING:
+            title += " (posting, retry " + str(job.attempts) + ")"
+
         self._title_label.text = title
 
     def _on_load(self):
@@ -134,9 +148,8 @@ class ThreadView(Frame):
         self._scene.add_effect(PostForm(self._screen, self._form_closed, "response"))
 
     def _form_closed(self, name: str, mail: str, msg: str):
-        result = self._data_context.post(name, mail, msg)
-        self._scene.add_effect(PopUpDialog(self._screen, result, ["Close"], theme="user_theme"))
-        self._data_context.update()
+        # The post is sent in the background; its progress is shown in the title
+        self._data_context.post(name, mail, msg)
 
     def process_event(self, event):
         if isinstance(event, KeyboardEvent):
@@ -208,7 +221,7 @@ class ThreadView(Frame):
             if self._data_context.links is not None and len(self._data_context.links) > idx:
                 link = self._data_context.links[idx]
 
-                if re.match(r'.*\.(jpg|png|jpeg|gif)', link) is not None:
+                if link in self._data_context.images:
                     self._data_context.set_image(link)
                     self._save_history()
                     raise NextScene("Image")
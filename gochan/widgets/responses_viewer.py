@@ -1,21 +1,22 @@
-import re
-from typing import Dict, List, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 from gochan.models.thread import Response
 from gochan.widgets.richtext import Brush, Buffer, RichText
 from gochan.models.ng import Hide, Aborn
 
-link_reg = re.compile(r'(https?://.*?)(?=$|\n| )')
-
 
 def _convert_to_buffer(responses: List[Union[Response, Hide, Aborn]], replies: Dict[int, List[Response]],
-                       ids: Dict[str, List[Response]], bookmark: int, width: int, brushes: Dict[str, Brush])\
+                       ids: Dict[str, List[Response]], bookmark: int, width: int, brushes: Dict[str, Brush],
+                       first: int = 0, last: Optional[int] = None, link_idx: int = 0)\
         -> Tuple[Buffer, Dict[int, Tuple[int, int]]]:
+    """
+    Render responses[first:last]. link_idx is the number of links in the responses before first.
+    """
+
     buf = Buffer(width)
     anchors = {}
-    link_idx = 0
 
-    for r in responses:
+    for r in responses[first:last]:
         if isinstance(r, Aborn):
             start = len(buf)
             buf.push(str(r.origin.number) + " " + "あぼーん", brushes["normal"])
@@ -55,14 +56,17 @@ def _convert_to_buffer(responses: List[Union[Response, Hide, Aborn]], replies: D
         buf.break_line(2)
 
         # Add index suffix so that user can select url easily
-        def _mark_link(match):
-            nonlocal link_idx
-            url = match.group(1)
-            repl = url + "(" + str(link_idx) + ")"
-            link_idx += 1
-            return repl
+        parts = []
+
+        # A message without links is shown as it is, without being tokenized
+        for t in r.tokens if not r.is_plain() else []:
+            parts.append(t.text)
 
-        marked_msg = link_reg.sub(_mark_link, r.message)
+            if t.kind == "url" or t.kind == "image":
+                parts.append("(" + str(link_idx) + ")")
+                link_idx += 1
+
+        marked_msg = "".join(parts) if len(parts) != 0 else r.message
 
         for l in marked_msg.split("\n"):
             buf.push(l, brushes["normal"])
@@ -83,23 +87,104 @@ def _convert_to_buffer(responses: List[Union[Response, Hide, Aborn]], replies: D
     return (buf, anchors)
 
 
+def _count_links(r: Union[Response, Hide, Aborn]) -> int:
+    if isinstance(r, (Hide, Aborn)) or r.is_plain():
+        return 0
+
+    return sum(1 for t in r.tokens if t.kind == "url" or t.kind == "image")
+
+
 class ResponsesViewer(RichText):
+    """
+    Only the responses around what is on screen are rendered (and their messages decoded).
+    The rendered part grows as the view is scrolled, and starts over around a response jumped to outside it.
+    """
+
     def __init__(self, height, brushes: Dict[str, Brush], keybindings, **kwargs):
         super().__init__(height, brushes["normal"], keybindings, **kwargs)
         self._brushes = brushes
         self._bookmark = None
-        self._anchors = None
+        self._anchors = {}
+        self._responses: List[Union[Response, Hide, Aborn]] = []
+        self._replies: Dict[int, List[Response]] = {}
+        self._ids: Dict[str, List[Response]] = {}
+        # Number of links before each response, so that any part can be rendered with the right link indices
+        self._link_starts: List[int] = []
+        # responses[self._first:self._last] are rendered in self._value
+        self._first = 0
+        self._last = 0
+        self._value = Buffer(0)
 
     def set_data(self, responses: List[Response], replies: Dict[int, List[Response]],
                  ids: Dict[str, List[Response]], bookmark: int = None):
+        # Keep the same response at the same place on screen
+        first = self.get_first_response_displayed()
+        offset = self._scrl_offset - (self._anchors[first][0] - 1) if first is not None else 0
+
         self._bookmark = bookmark
-        (buffer, anchors) = _convert_to_buffer(responses, replies, ids, bookmark, self.width, self._brushes)
-        self._anchors = anchors
-        self._value = buffer
+        self._responses = responses
+        self._replies = replies
+        self._ids = ids
+        self._link_starts = [0]
+
+        for r in responses:
+            self._link_starts.append(self._link_starts[-1] + _count_links(r))
+
+        self._reset(0)
+
+        if first is not None and self._index_of(first) is not None:
+            self.jump_to(first)
+            self._fill_below(self._anchors[first][0] + offset + self._h)
+            self.go_to(self._anchors[first][0] + offset)
+
+    def update(self, frame_no):
+        self._fill_below(self._scrl_offset + self._h)
+        super().update(frame_no)
+
+    def scroll_down(self):
+        self._fill_below(self._scrl_offset + self._h + 1)
+        super().scroll_down()
+
+    def scroll_up(self):
+        self._fill_above(1)
+        super().scroll_up()
+
+    def page_down(self):
+        self._fill_below(self._scrl_offset + self._h * 2)
+        super().page_down()
+
+    def page_up(self):
+        self._fill_above(self._h)
+        super().page_up()
+
+    def go_to_top(self):
+        self._reset(0)
+        super().go_to_top()
+
+    def go_to_bottom(self):
+        self._reset(len(self._responses))
+        self._fill_above(self._h)
+        super().go_to_bottom()
 
     def jump_to(self, number: int):
-        if number in self._anchors:
-            self.go_to(self._anchors[number][0])
+        if number not in self._anchors:
+            idx = self._index_of(number)
+
+            if idx is None:
+                return
+
+            self._reset(idx)
+            self._fill_below(2)
+
+        self._fill_below(self._anchors[number][0] + self._h)
+        self.go_to(self._anchors[number][0])
+
+    def get_first_response_displayed(self) -> Optional[int]:
+        for k, v in self._anchors.items():
+            if v[1] > self.scroll_offset:
+                return k
+
+        return None
 
     def get_last_respones_displayed(self):
         displayed_end_line = self.scroll_offset + self._h
@@ -112,9 +197,64 @@ class ResponsesViewer(RichText):
         return last_response
 
     def scroll_to_bookmark(self):
-        for k, v in self._anchors.items():
-            if k == self._bookmark:
-                self.go_to(v[1] + 2)
-                return
+        if self._bookmark is not None and self._index_of(self._bookmark) is not None:
+            self.jump_to(self._bookmark)
+            self._fill_below(self._anchors[self._bookmark][1] + 2 + self._h)
+            self.go_to(self._anchors[self._bookmark][1] + 2)
+            return
 
+        self._reset(0)
         self.reset_offset()
+
+    def _index_of(self, number: int) -> Optional[int]:
+        for (i, r) in enumerate(self._responses):
+            if isinstance(r, Aborn) and r.origin.number == number or isinstance(r, Response) and r.number == number:
+                return i
+
+        return None
+
+    def _reset(self, idx: int):
+        """
+        Start rendering over from responses[idx]
+        """
+
+        (self._first, self._last) = (idx, idx)
+        self._value = Buffer(self.width)
+        self._anchors = {}
+        self._scrl_offset = 0
+
+    def _render(self, first: int, last: int) -> Tuple[Buffer, Dict[int, Tuple[int, int]]]:
+        return _convert_to_buffer(self._responses, self._replies, self._ids, self._bookmark, self.width,
+                                  self._brushes, first, last, self._link_starts[first])
+
+    def _fill_below(self, lines: int):
+        """
+        Render responses after the rendered part until it has lines lines or there are no more
+        """
+
+        while len(self._value) < lines and self._last < len(self._responses):
+            (buf, anchors) = self._render(self._last, self._last + 1)
+            shift = len(self._value) - 1
+
+            # The last line of a rendered part is the empty one the next response starts on
+            del self._value[-1]
+            self._value.extend(buf)
+            self._anchors.update({k: (s + shift, e + shift) for (k, (s, e)) in anchors.items()})
+            self._last += 1
+
+    def _fill_above(self, lines: int):
+        """
+        Render responses before the rendered part until lines lines are above what is on screen
+        or there are no more
+        """
+
+        while self._scrl_offset < lines and self._first > 0:
+            (buf, anchors) = self._render(self._first - 1, self._first)
+            shift = len(buf) - 1
+
+            del buf[-1]
+            buf.extend(self._value)
+            self._value = buf
+            self._anchors = {**anchors, **{k: (s + shift, e + shift) for (k, (s, e)) in self._anchors.items()}}
+            self._scrl_offset += shift
+            self._first -= 1
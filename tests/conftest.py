@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+
+import gochan.client
+from gochan.client.cookies import CookieStore
+from gochan.client.httpcache import HttpCache
+from gochan.client.proxies import ProxyPool
+from gochan.client.ratelimit import RateLimiter
+from gochan.dispatcher import dispatcher
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limit(monkeypatch):
+    # Every test server is on localhost, so don't let the tests throttle each other
+    monkeypatch.setattr(gochan.client, "limiter", RateLimiter(0, 0))
+
+
+@pytest.fixture(autouse=True)
+def no_saved_cookies(monkeypatch):
+    # Keep the cookies of the user out of the tests and the cookies of the tests out of ~/.gochan
+    monkeypatch.setattr(gochan.client, "cookies", CookieStore())
+
+
+@pytest.fixture(autouse=True)
+def no_http_cache(monkeypatch):
+    # Every test sees the server, not what an earlier test (or the user) has fetched
+    monkeypatch.setattr(gochan.client, "http_cache", HttpCache(None, {}, 0))
+
+
+@pytest.fixture(autouse=True)
+def no_proxies(monkeypatch):
+    monkeypatch.setattr(gochan.client, "proxies", ProxyPool([], 0))
+
+
+@pytest.fixture
+def pump():
+    # Stands in for the UI thread
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(0.01):
+            dispatcher.run_pending()
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    yield t
+    stop.set()
+    t.join()
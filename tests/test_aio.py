@@ -0,0 +1,50 @@
+import asyncio
+import gzip
+import threading
+from urllib.error import URLError
+
+import pytest
+
+import gochan.client
+from gochan.client import aio
+from gochan.client.replay import ReplayTransport, save_fixture
+from gochan.models.board import Board
+from tests.test_client import BBSMENU, SUBJECT
+
+
+@pytest.fixture(autouse=True)
+def replay(tmp_path, monkeypatch):
+    save_fixture(tmp_path, "GET", "https://menu.5ch.net/bbsmenu.html", {}, 200, "OK", [],
+                 BBSMENU.encode("shift-jis"))
+    save_fixture(tmp_path, "GET", "https://hebi.5ch.net/news4vip/subject.txt", {}, 200, "OK",
+                 [("Content-Encoding", "gzip"), ("ETag", '"s1"')], gzip.compress(SUBJECT.encode("shift-jis")))
+
+    monkeypatch.setattr(gochan.client, "transport", ReplayTransport(tmp_path))
+
+
+def test_concurrent_fetch():
+    async def fetch_all():
+        return await asyncio.gather(aio.get_bbsmenu(), aio.get_board("hebi", "news4vip"),
+                                    aio.get_board_document("hebi", "news4vip"))
+
+    for (bbsmenu, subject, doc) in [asyncio.run(fetch_all()), aio.run_in_background(fetch_all()).result(5)]:
+        assert bbsmenu == BBSMENU
+        assert subject == SUBJECT
+        assert doc.text == SUBJECT
+        assert doc.validator.etag == '"s1"'
+
+
+def test_errors_are_raised():
+    with pytest.raises(URLError):
+        aio.run_in_background(aio.get_board("hebi", "none")).result(5)
+
+
+def test_board_is_updated_on_ui_thread(pump):
+    board = Board("hebi", "news4vip")
+    threads = []
+    board.on_property_changed.add(lambda e: threads.append(threading.current_thread()))
+
+    aio.run_in_background(board.update_async()).result(5)
+
+    assert [t.key for t in board.threads] == ["1588219909", "1588219000"]
+    assert threads == [pump]
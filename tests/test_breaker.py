@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+import gochan.client
+from gochan.client import _get_content
+from gochan.client.breaker import CircuitBreaker, CircuitOpenError
+
+
+def test_open_after_threshold():
+    breaker = CircuitBreaker(2, 0.1)
+    breaker.failed("a")
+    assert breaker.allow("a")
+
+    breaker.failed("a")
+    assert not breaker.allow("a")
+    assert breaker.allow("b")
+
+    # half-open: only one trial
+    time.sleep(0.1)
+    assert breaker.allow("a")
+    assert not breaker.allow("a")
+
+    breaker.succeeded("a")
+    assert breaker.allow("a")
+
+
+def test_open_circuit_does_not_touch_network(monkeypatch):
+    monkeypatch.setattr(gochan.client, "breaker", CircuitBreaker(1, 60))
+    gochan.client.breaker.failed("127.0.0.1")
+
+    def fail(*args):
+        raise AssertionError("network was used")
+
+    monkeypatch.setattr(gochan.client.transport, "request", fail)
+
+    with pytest.raises(CircuitOpenError):
+        _get_content("http://127.0.0.1:1/subject.txt")
+
+
+def test_board_serves_last_copy(monkeypatch):
+    import gochan.models.board
+    from gochan.models.board import Board, ThreadHeader
+
+    def unavailable(*args):
+        raise CircuitOpenError("hebi.5ch.net")
+
+    monkeypatch.setattr(gochan.models.board, "get_board_document", unavailable)
+
+    board = Board("hebi", "news4vip")
+
+    with pytest.raises(CircuitOpenError):
+        board.update()
+
+    board.threads.append(ThreadHeader("1588219909", 1, "スレ", 10, False))
+    board.update()
+    assert board.is_stale
+    assert len(board.threads) == 1
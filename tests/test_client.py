@@ -1,14 +1,50 @@
+import gzip
+
+import pytest
+
+import gochan.client
 from gochan.client import get_bbsmenu, get_board
+from gochan.client.replay import ReplayTransport, save_fixture
+from gochan.models.bbsmenu import Bbsmenu
+from gochan.models.board import Board
+from gochan.parser import BbsmenuParser
+
+BBSMENU = """<B>地震</B><br>
+<A HREF=https://egg.5ch.net/eq/>地震headline</A><br>
+<A HREF=https://egg.5ch.net/eqplus/>地震速報</A>
+<br><br><B>ニュース</B><br>
+<A HREF=https://hebi.5ch.net/news4vip/>ニュー速VIP</A>
+"""
+
+SUBJECT = """1588219909.dat<>テストスレ (12)
+1588219000.dat<>別のスレ (345)
+"""
+
+
+@pytest.fixture(autouse=True)
+def replay(tmp_path, monkeypatch):
+    save_fixture(tmp_path, "GET", "https://menu.5ch.net/bbsmenu.html", {}, 200, "OK", [],
+                 BBSMENU.encode("shift-jis"))
+    save_fixture(tmp_path, "GET", "https://hebi.5ch.net/news4vip/subject.txt", {}, 200, "OK",
+                 [("Content-Encoding", "gzip")], gzip.compress(SUBJECT.encode("shift-jis")))
+
+    monkeypatch.setattr(gochan.client, "transport", ReplayTransport(tmp_path))
 
 
 def test_get_bbsmenu():
-    bbs = get_bbsmenu()
-    assert bbs.categories[0].name == '地震'
+    bbs = BbsmenuParser(get_bbsmenu())
+    assert bbs.categories()[0]["name"] == '地震'
+
+    bbsmenu = Bbsmenu()
+    bbsmenu.update()
+    assert bbsmenu.categories[1].boards[0].server == "hebi"
 
 
 def test_get_board():
-    board = get_board("hebi", "news4vip")
+    assert get_board("hebi", "news4vip") == SUBJECT
+
+    board = Board("hebi", "news4vip")
+    board.update()
 
-    for t in board.threads:
-        print(t.server)
-        print(t.board)
+    assert [t.key for t in board.threads] == ["1588219909", "1588219000"]
+    assert board.threads[1].count == 345
@@ -0,0 +1,31 @@
+from gochan.client import _get_document
+from tests.server import LocalServer
+
+
+def _subject(handler):
+    if handler.headers.get("If-None-Match") == '"v1"':
+        return (304, {}, b"")
+
+    return (200, {"ETag": '"v1"'}, "1234567890.dat<>スレ (1)\n".encode("shift-jis"))
+
+
+def test_not_modified():
+    with LocalServer() as server:
+        server.routes["/subject.txt"] = _subject
+
+        doc = _get_document(server.url + "/subject.txt")
+        assert doc.modified
+        assert doc.validator.etag == '"v1"'
+
+        doc2 = _get_document(server.url + "/subject.txt", doc.validator)
+        assert not doc2.modified
+        assert doc2.text is None
+
+
+def test_validator_of_other_url_is_ignored():
+    with LocalServer() as server:
+        server.routes["/a"] = _subject
+        server.routes["/b"] = _subject
+
+        doc = _get_document(server.url + "/a")
+        assert _get_document(server.url + "/b", doc.validator).modified
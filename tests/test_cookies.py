@@ -0,0 +1,44 @@
+from http.client import HTTPMessage
+
+from gochan.client import _get_content
+from gochan.client.cookies import CookieStore
+from tests.server import LocalServer
+
+
+def test_cookies_are_sent_back():
+    with LocalServer() as server:
+        server.routes["/set"] = lambda h: (200, {"Set-Cookie": "session=abc; Path=/"}, b"")
+        server.routes["/get"] = lambda h: (200, {}, h.headers.get("Cookie", "").encode())
+
+        assert _get_content(server.url + "/get") == ""
+        _get_content(server.url + "/set")
+        assert _get_content(server.url + "/get") == "session=abc"
+
+
+def test_received_cookie_overrides_configured_one():
+    store = CookieStore()
+    store.extract("http://127.0.0.1/", _headers([("Set-Cookie", "yuki=new; Path=/")]))
+
+    headers = store.add_header("http://127.0.0.1/test/bbs.cgi", {"Cookie": "yuki=akari; other=1", "Referer": "r"})
+    assert headers == {"Referer": "r", "Cookie": "yuki=new; other=1"}
+
+    # Nothing is received from other hosts
+    assert store.add_header("http://127.0.0.2/", {"Cookie": "a=1"}) == {"Cookie": "a=1"}
+
+
+def test_cookies_persist(tmp_path):
+    store = CookieStore(tmp_path / "cookies.txt")
+    store.extract("http://127.0.0.1/", _headers([("Set-Cookie", "session=abc; Path=/")]))
+    store.save()
+
+    restored = CookieStore(tmp_path / "cookies.txt")
+    assert restored.add_header("http://127.0.0.1/", {}) == {"Cookie": "session=abc"}
+
+
+def _headers(items):
+    msg = HTTPMessage()
+
+    for k, v in items:
+        msg[k] = v
+
+    return msg
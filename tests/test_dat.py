@@ -0,0 +1,98 @@
+import re
+
+from gochan.client import _get_dat
+from gochan.models.thread import Thread
+from gochan.parser import ThreadParserD
+from tests.server import LocalServer
+
+LINE = "名無しさん<>sage<>2020/05/01(金) 00:00:00.00 ID:abcdefgh0<> 本文{} <>{}\n"
+
+
+def _dat(n: int) -> bytes:
+    return "".join(LINE.format(i, "タイトル" if i == 1 else "") for i in range(1, n + 1)).encode("shift-jis")
+
+
+def _range_route(data: bytes):
+    def route(handler):
+        m = re.match(r"bytes=(\d+)-", handler.headers.get("Range", ""))
+
+        if m is None:
+            return (200, {}, data)
+
+        start = int(m.group(1))
+
+        if start >= len(data):
+            return (416, {}, b"")
+
+        return (206, {"Content-Range": "bytes %d-%d/%d" % (start, len(data) - 1, len(data))}, data[start:])
+
+    return route
+
+
+def test_fetch_appended_lines():
+    with LocalServer() as server:
+        server.routes["/1.dat"] = _range_route(_dat(3))
+        doc = _get_dat(server.url + "/1.dat", 0)
+        assert not doc.partial
+        assert doc.size == len(_dat(3))
+
+        server.routes["/1.dat"] = _range_route(_dat(5))
+        doc2 = _get_dat(server.url + "/1.dat", doc.size)
+        assert doc2.partial
+        assert doc.size + doc2.size == len(_dat(5))
+
+    responses = ThreadParserD(doc2.text, 4).responses()
+    assert [r["number"] for r in responses] == [4, 5]
+    assert responses[1]["message"] == "本文5"
+
+
+def test_fall_back_to_full_fetch():
+    with LocalServer() as server:
+        # The dat has shrunk
+        server.routes["/1.dat"] = _range_route(_dat(2))
+        doc = _get_dat(server.url + "/1.dat", len(_dat(3)))
+        assert not doc.partial
+        assert doc.size == len(_dat(2))
+
+        # The dat has been rewritten
+        server.routes["/1.dat"] = _range_route(b"x" * len(_dat(3)))
+        doc = _get_dat(server.url + "/1.dat", len(_dat(2)))
+        assert not doc.partial
+
+
+def test_update_applied_twice():
+    thread = Thread("server", "board", "1")
+
+    with LocalServer() as server:
+        server.routes["/1.dat"] = _range_route(_dat(3))
+        thread._init("dat", _get_dat(server.url + "/1.dat", 0))
+
+        server.routes["/1.dat"] = _range_route(_dat(5))
+        doc = _get_dat(server.url + "/1.dat", thread.dat_size)
+        assert doc.offset == len(_dat(3))
+
+        # A post's update fetched in the background lands after the user's own update
+        thread._update("dat", doc)
+        thread._update("dat", doc)
+
+    assert [r.number for r in thread.responses] == [1, 2, 3, 4, 5]
+    assert thread.dat_size == len(_dat(5))
+    assert thread.dat_count == 5
+
+
+def test_unreadable_last_line_is_counted():
+    thread = Thread("server", "board", "1")
+    dat = _dat(2) + "あぼーん<>あぼーん<>あぼーん<>あぼーん<>\n".encode("shift-jis")
+    appended = (LINE.format(4, "") + LINE.format(5, "")).encode("shift-jis")
+
+    with LocalServer() as server:
+        server.routes["/1.dat"] = _range_route(dat)
+        thread._init("dat", _get_dat(server.url + "/1.dat", 0))
+        assert thread.dat_count == 3
+
+        server.routes["/1.dat"] = _range_route(dat + appended)
+        thread._update("dat", _get_dat(server.url + "/1.dat", thread.dat_size))
+
+    assert [r.number for r in thread.responses] == [1, 2, 4, 5]
+    assert [r.message for r in thread.responses[2:]] == ["本文4", "本文5"]
+    assert thread.dat_count == 5
@@ -0,0 +1,39 @@
+import gzip
+import zlib
+
+from gochan.client import _get_content, transfer_log
+from gochan.client.encoding import ContentDecoder
+from tests.server import LocalServer
+
+TEXT = "1234567890.dat<>テストスレ (12)\n" * 200
+
+
+def _decode_in_chunks(encoding: str, data: bytes) -> str:
+    decoder = ContentDecoder(encoding)
+    s = "".join(decoder.feed(data[i:i + 7]) for i in range(0, len(data), 7))
+    return s + decoder.flush()
+
+
+def test_gzip():
+    assert _decode_in_chunks("gzip", gzip.compress(TEXT.encode("shift-jis"))) == TEXT
+
+
+def test_deflate():
+    assert _decode_in_chunks("deflate", zlib.compress(TEXT.encode("shift-jis"))) == TEXT
+
+    raw = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    data = raw.compress(TEXT.encode("shift-jis")) + raw.flush()
+    assert _decode_in_chunks("deflate", data) == TEXT
+
+
+def test_get_content_records_transfer():
+    body = gzip.compress(TEXT.encode("shift-jis"))
+
+    with LocalServer() as server:
+        server.routes["/subject.txt"] = lambda h: (200, {"Content-Encoding": "gzip"}, body)
+        assert _get_content(server.url + "/subject.txt") == TEXT
+        assert "gzip" in server.requests[-1][2]["Accept-Encoding"]
+
+    record = transfer_log[-1]
+    assert record.wire_bytes == len(body)
+    assert record.decoded_bytes == len(TEXT.encode("shift-jis"))
@@ -0,0 +1,34 @@
+import asyncio
+
+import gochan.client.aio
+from gochan.client import Document
+from gochan.models.favorites import FavoriteBoard, FavoriteThread, Favorites
+
+SUBJECTS = {
+    "news": "1600000100.dat<>スレ1 (10)\n1600000200.dat<>スレ2 (20)\n",
+    "tech": "1600000300.dat<>スレ3 (30)\n"
+}
+
+
+def test_each_board_is_fetched_once(monkeypatch, pump):
+    fetched = []
+
+    async def get_board_document(server, board, validator=None):
+        fetched.append(board)
+        return Document(SUBJECTS[board], None)
+
+    monkeypatch.setattr(gochan.client.aio, "get_board_document", get_board_document)
+
+    favorites = Favorites()
+    favorites.list = [FavoriteThread("スレ1", "a", "news", "1600000100"),
+                      FavoriteThread("スレ2", "a", "news", "1600000200"),
+                      FavoriteThread("スレ3", "b", "tech", "1600000300"),
+                      FavoriteBoard("ニュース", "a", "news")]
+
+    counts = asyncio.run(favorites.fetch_counts_async())
+
+    assert sorted(fetched) == ["news", "tech"]
+    assert counts == {"news1600000100": 10, "news1600000200": 20, "tech1600000300": 30}
+
+    favorites.set_counts(counts)
+    assert favorites.count(favorites.list[2]) == 30
@@ -0,0 +1,89 @@
+import time
+
+import gochan.client
+from gochan.client import _get_document, _get_hedged
+from gochan.client.hedge import LatencyHistogram, LatencyTracker
+from tests.server import LocalServer
+
+
+def _slow(body: bytes, seconds: float):
+    def route(handler):
+        time.sleep(seconds)
+        return (200, {}, body)
+
+    return route
+
+
+def _fetchers(server: LocalServer):
+    return {
+        "html": lambda: _get_document(server.url + "/html"),
+        "dat": lambda: _get_document(server.url + "/dat")
+    }
+
+
+def test_percentile():
+    h = LatencyHistogram()
+    assert h.percentile(50) is None
+
+    for _ in range(19):
+        h.record(0.01)
+    h.record(1.0)
+
+    assert h.percentile(50) == 0.01
+    assert 1.0 <= h.percentile(99) < 1.5
+
+    h.record(float("inf"))
+    assert h.percentile(100) == float("inf")
+
+
+def test_order_prefers_faster_endpoint():
+    tracker = LatencyTracker(1.0, min_samples=2)
+    assert tracker.order("a", ["html", "dat"]) == ["html", "dat"]
+    assert tracker.deadline("a", "html") == 1.0
+
+    for _ in range(2):
+        tracker.record("a", "html", 0.5)
+        tracker.record("a", "dat", 0.05)
+
+    assert tracker.order("a", ["html", "dat"]) == ["dat", "html"]
+    assert tracker.deadline("a", "dat") < 0.1
+
+    for _ in range(4):
+        tracker.failed("a", "dat")
+
+    assert tracker.order("a", ["html", "dat"]) == ["html", "dat"]
+
+
+def test_hedge_after_deadline(monkeypatch):
+    monkeypatch.setattr(gochan.client, "latency", LatencyTracker(0.1))
+
+    with LocalServer() as server:
+        server.routes["/html"] = _slow(b"html", 1.0)
+        server.routes["/dat"] = _slow(b"dat", 0)
+
+        start = time.monotonic()
+        (endpoint, doc) = _get_hedged("a", _fetchers(server))
+
+        assert endpoint == "dat"
+        assert doc.text == "dat"
+        assert time.monotonic() - start < 0.5
+
+
+def test_fast_primary_is_not_hedged(monkeypatch):
+    monkeypatch.setattr(gochan.client, "latency", LatencyTracker(1.0))
+
+    with LocalServer() as server:
+        server.routes["/html"] = _slow(b"html", 0)
+        server.routes["/dat"] = _slow(b"dat", 0)
+
+        assert _get_hedged("a", _fetchers(server))[0] == "html"
+        assert [x[1] for x in server.requests] == ["/html"]
+
+
+def test_failed_primary_fires_next_at_once(monkeypatch):
+    monkeypatch.setattr(gochan.client, "latency", LatencyTracker(10))
+
+    with LocalServer() as server:
+        server.routes["/dat"] = _slow(b"dat", 0)
+
+        assert _get_hedged("a", _fetchers(server))[0] == "dat"
@@ -0,0 +1,117 @@
+import gochan.client
+from gochan.client import _get_dat, _get_document
+from gochan.client.httpcache import HttpCache, endpoint_of
+from tests.server import LocalServer
+from tests.test_dat import _dat, _range_route
+
+SUBJECT = "1234567890.dat<>スレ (1)\n".encode("shift-jis")
+
+
+def _use_cache(monkeypatch, tmp_path, ttl: float) -> HttpCache:
+    ttls = {"bbsmenu": ttl, "subject": ttl, "dat": ttl}
+    cache = HttpCache(tmp_path, ttls, 1024 * 1024)
+    monkeypatch.setattr(gochan.client, "http_cache", cache)
+    return cache
+
+
+def _subject(handler):
+    if handler.headers.get("If-None-Match") == '"v1"':
+        return (304, {"ETag": '"v1"'}, b"")
+
+    return (200, {"ETag": '"v1"'}, SUBJECT)
+
+
+def test_endpoint_of():
+    assert endpoint_of("https://menu.5ch.net/bbsmenu.html") == "bbsmenu"
+    assert endpoint_of("https://a.5ch.net/b/subject.txt") == "subject"
+    assert endpoint_of("http://a.5ch.net:80/b/dat/1234567890.dat") == "dat"
+    assert endpoint_of("https://a.5ch.net/test/read.cgi/b/1234567890/") is None
+
+
+def test_fresh_copy_is_served_without_request(monkeypatch, tmp_path):
+    _use_cache(monkeypatch, tmp_path, 60)
+
+    with LocalServer() as server:
+        server.routes["/b/subject.txt"] = _subject
+
+        doc = _get_document(server.url + "/b/subject.txt")
+        doc2 = _get_document(server.url + "/b/subject.txt")
+        assert doc2.text == doc.text
+        assert doc2.validator.etag == '"v1"'
+
+        # The caller already has this version
+        assert not _get_document(server.url + "/b/subject.txt", doc.validator).modified
+        assert len(server.requests) == 1
+
+
+def test_stale_copy_is_revalidated(monkeypatch, tmp_path):
+    cache = _use_cache(monkeypatch, tmp_path, 0)
+
+    with LocalServer() as server:
+        server.routes["/b/subject.txt"] = _subject
+
+        doc = _get_document(server.url + "/b/subject.txt")
+        fetched = cache.get(server.url + "/b/subject.txt").fetched
+
+        # The caller has nothing, so the cached body is used for the 304
+        doc2 = _get_document(server.url + "/b/subject.txt")
+        assert doc2.modified
+        assert doc2.text == doc.text
+        assert server.requests[1][2]["If-None-Match"] == '"v1"'
+        assert cache.get(server.url + "/b/subject.txt").fetched >= fetched
+
+
+def test_no_store(monkeypatch, tmp_path):
+    cache = _use_cache(monkeypatch, tmp_path, 60)
+
+    with LocalServer() as server:
+        server.routes["/b/subject.txt"] = lambda handler: (200, {"Cache-Control": "no-store"}, SUBJECT)
+
+        _get_document(server.url + "/b/subject.txt")
+        assert cache.get(server.url + "/b/subject.txt") is None
+
+
+def test_dat_range_from_cache(monkeypatch, tmp_path):
+    cache = _use_cache(monkeypatch, tmp_path, 60)
+
+    with LocalServer() as server:
+        url = server.url + "/b/dat/1234567890.dat"
+        server.routes["/b/dat/1234567890.dat"] = _range_route(_dat(5))
+        cache.store(url, _dat(5), [])
+
+        doc = _get_dat(url, len(_dat(3)))
+        assert doc.partial
+        assert doc.size == len(_dat(5)) - len(_dat(3))
+        assert len(server.requests) == 0
+
+
+def test_dat_range_extends_copy(monkeypatch, tmp_path):
+    cache = _use_cache(monkeypatch, tmp_path, 0)
+
+    with LocalServer() as server:
+        url = server.url + "/b/dat/1234567890.dat"
+        server.routes["/b/dat/1234567890.dat"] = _range_route(_dat(3))
+        _get_dat(url, 0)
+
+        server.routes["/b/dat/1234567890.dat"] = _range_route(_dat(5))
+        doc = _get_dat(url, len(_dat(3)))
+        assert doc.partial
+        assert cache.get(url).body == _dat(5)
+
+
+def test_least_recently_used_is_removed(tmp_path):
+    cache = HttpCache(tmp_path, {}, 25)
+    cache.store("http://a/1", b"x" * 10, [])
+    cache.store("http://a/2", b"x" * 10, [])
+    cache.get("http://a/1")
+    cache.store("http://a/3", b"x" * 10, [])
+
+    assert cache.get("http://a/2") is None
+    assert cache.get("http://a/1") is not None
+    assert cache.stats() == {"entries": 2, "bytes": 20}
+
+    # The order is read back from the metadata
+    cache = HttpCache(tmp_path, {}, 25)
+    cache.get("http://a/3")
+    cache.store("http://a/4", b"x" * 10, [])
+    assert cache.get("http://a/1") is None
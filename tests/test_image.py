@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+
+from gochan.client import ImageTooLargeError, NotAnImageError, download_image, save_image
+from tests.server import LocalServer
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 400
+
+
+def test_save_image(tmp_path):
+    with LocalServer() as server:
+        server.routes["/a.png"] = lambda handler: (200, {"Content-Type": "image/png"}, PNG)
+
+        path = tmp_path / "a.png"
+        assert save_image(server.url + "/a.png", path) == len(PNG)
+        assert path.read_bytes() == PNG
+        assert list(tmp_path.iterdir()) == [path]
+
+
+def test_too_large_image_is_not_kept(tmp_path):
+    with LocalServer() as server:
+        server.routes["/a.png"] = lambda handler: (200, {"Content-Type": "image/png"}, PNG)
+
+        with pytest.raises(ImageTooLargeError):
+            save_image(server.url + "/a.png", tmp_path / "a.png", 1024)
+
+        assert list(tmp_path.iterdir()) == []
+
+
+def test_smaller_limit_is_not_shared(tmp_path):
+    def route(handler):
+        time.sleep(0.2)
+        return (200, {"Content-Type": "image/png"}, PNG)
+
+    with LocalServer() as server:
+        server.routes["/a.png"] = route
+        errors = []
+
+        def prefetch():
+            try:
+                save_image(server.url + "/a.png", tmp_path / "a.png", 1024)
+            except ImageTooLargeError as e:
+                errors.append(e)
+
+        t = threading.Thread(target=prefetch)
+        t.start()
+        time.sleep(0.05)
+
+        # Opened while the prefetch with its smaller limit is still running
+        assert save_image(server.url + "/a.png", tmp_path / "a.png") == len(PNG)
+        t.join()
+
+        assert len(errors) == 1
+        assert (tmp_path / "a.png").read_bytes() == PNG
+
+
+def test_non_image_is_rejected(tmp_path):
+    with LocalServer() as server:
+        server.routes["/a.png"] = lambda handler: (200, {"Content-Type": "text/html"}, b"<html>" * 10000)
+
+        with pytest.raises(NotAnImageError):
+            save_image(server.url + "/a.png", tmp_path / "a.png")
+
+        assert list(tmp_path.iterdir()) == []
+        assert isinstance(download_image(server.url + "/a.png"), NotAnImageError)
+
+
+def test_download_image_into_memory():
+    with LocalServer() as server:
+        server.routes["/a.png"] = lambda handler: (200, {"Content-Type": "image/png"}, PNG)
+
+        assert download_image(server.url + "/a.png").read() == PNG
+        assert isinstance(download_image(server.url + "/a.png", 1024), ImageTooLargeError)
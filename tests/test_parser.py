@@ -0,0 +1,127 @@
+from bench.parser import make_dat, make_page, regex_dat_responses, regex_responses
+from gochan.models.thread import Response
+from gochan.parser import ThreadParserD, ThreadParserH, Token, _split_dat_line, tokenize
+
+
+def _without_tokens(responses):
+    return [{k: v for (k, v) in r.items() if k != "tokens"} for r in responses]
+
+
+def test_same_as_regex():
+    html = make_page(200)
+    responses = ThreadParserH(html).responses()
+
+    assert len(responses) == 200
+    assert responses == regex_responses(html)
+
+
+def test_fields():
+    responses = _without_tokens(ThreadParserH(make_page(14)).responses())
+
+    assert responses[0] == {"number": 1, "name": "名無しさん", "mail": "sage", "date": "2020/05/01(金) 00:01:00.00",
+                            "id": "ID:abcd0001", "message": "一行目\n二行目\n\n四行目"}
+    assert responses[1]["mail"] == ""
+    assert responses[2]["name"] == "名無し ◆Abc.dEf123 "
+    assert responses[1]["message"] == ">>1\nそれな&これ"
+    assert responses[3]["message"] == '<script> "引用" A'
+    assert responses[4]["message"] == "本文5"
+    # Wrapped in two spans
+    assert responses[6]["message"] == ">>1\nそれな&これ"
+
+
+def test_broken_posts_are_skipped():
+    responses = ThreadParserH(make_page(30, broken=True)).responses()
+
+    assert [r["number"] for r in responses] == [n for n in range(1, 31) if n % 10 != 0]
+
+
+def test_dat_same_as_regex():
+    dat = make_dat(200)
+    responses = ThreadParserD(dat).responses()
+
+    assert len(responses) == 200
+    assert responses == regex_dat_responses(dat)
+    assert responses[0]["message"] == "一行目\n二行目\n\n四行目"
+    assert responses[2]["name"] == "名無し ◆Abc.dEf123 "
+
+
+def test_malformed_dat_lines():
+    lines = [
+        # No weekday and time, so only one space before the id
+        "名無し<>sage<>2020/05/01 ID:abc<> 本文 <>",
+        # No space around the message
+        "名無し<><>2020/05/01(金) 00:00:00.00 ID:abc<>本文<>",
+        "名無し<><>2020/05/01(金) 00:00:00.00 ID:abc<>  <>",
+        "名無し<><>2020/05/01(金) 00:00:00.00 ID:abc<> <> <> x <>",
+        "壊れた行",
+    ]
+    dat = "\n".join(lines)
+
+    assert [_split_dat_line(x) for x in lines] == [
+        None, None, ("名無し", "", "2020/05/01(金) 00:00:00.00", "ID:abc", ""), None, None
+    ]
+    assert ThreadParserD(dat).responses() == regex_dat_responses(dat)
+
+
+def test_tokenize():
+    message = ">>1 >>2-4,10\nhttps://example.com/a.jpg 見て http://example.com/\n>>12345"
+    tokens = tokenize(message)
+
+    assert tokens == [
+        Token("anchor", ">>1", [(1, 1)]), Token("text", " "), Token("anchor", ">>2-4,10", [(2, 4), (10, 10)]),
+        Token("text", "\n"), Token("image", "https://example.com/a.jpg"), Token("text", " 見て "),
+        Token("url", "http://example.com/"), Token("text", "\n"), Token("anchor", ">>1234", [(1234, 1234)]),
+        Token("text", "5")
+    ]
+    assert "".join(t.text for t in tokens) == message
+    assert tokens[2].numbers(2) == [2, 3, 10]
+    assert [Token.from_list(t.to_list()) for t in tokens] == tokens
+
+
+def test_parsers_emit_tokens():
+    (h, d) = (ThreadParserH(make_page(5)).responses(), ThreadParserD(make_dat(5)).responses())
+
+    assert [r["tokens"] for r in h] == [r["tokens"] for r in d]
+    assert h[1]["tokens"][0] == Token("anchor", ">>1", [(1, 1)])
+    assert h[2]["tokens"][0] == Token("image", "https://example.com/a.jpg")
+
+
+def test_lazy_responses():
+    html = make_page(20)
+    dat = make_dat(20)
+
+    for (lazy, eager) in [(ThreadParserH(html).responses(lazy=True), ThreadParserH(html).responses()),
+                          (ThreadParserD(dat).responses(lazy=True), ThreadParserD(dat).responses())]:
+        assert all("message" not in r for r in lazy)
+        assert [Response.from_dict(r).message for r in lazy] == [r["message"] for r in eager]
+        assert [Response.from_dict(r).tokens for r in lazy] == [r["tokens"] for r in eager]
+        # Checked on the markup, so it may only miss plain messages
+        for (r, r2) in zip(lazy, eager):
+            assert not Response.from_dict(r).is_plain() or Response.from_dict(r2).is_plain()
+
+
+def test_message_is_decoded_once():
+    r = Response.from_dict(ThreadParserD(make_dat(2)).responses(lazy=True)[0])
+
+    assert r.raw is not None
+    assert r.is_plain()
+    message = r.message
+    assert r.raw is None
+    assert r.message is message
+
+
+def test_responses_after_and_until():
+    parser = ThreadParserH(make_page(30))
+
+    assert [r["number"] for r in parser.responses(after=25)] == list(range(26, 31))
+    assert [r["number"] for r in parser.responses(after=9, until=12)] == [10, 11, 12]
+    assert parser.responses(after=12, until=13) == parser.responses()[12:13]
+
+
+def test_header_only():
+    # A post quoting the markers doesn't count
+    html = make_page(3).replace("本文", '<div class="stoplight stopred stopdone"><title>x\n</title>')
+    parser = ThreadParserH(html)
+
+    assert parser.title() == "スレッド"
+    assert parser.is_pastlog()
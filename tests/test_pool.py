@@ -0,0 +1,94 @@
+import time
+
+from gochan.client import _request
+from gochan.client.pool import ConnectionPool
+from tests.server import LocalServer
+
+
+def test_connection_is_reused():
+    pool = ConnectionPool(2, 30)
+
+    with LocalServer() as server:
+        server.routes["/a"] = lambda h: (200, {}, b"aaa")
+
+        for _ in range(3):
+            with pool.request("GET", server.url + "/a", {}) as res:
+                assert res.read() == b"aaa"
+
+    assert pool.misses == 1
+    assert pool.hits == 2
+
+
+def test_idle_timeout():
+    pool = ConnectionPool(2, 0)
+
+    with LocalServer() as server:
+        server.routes["/a"] = lambda h: (200, {}, b"aaa")
+
+        for _ in range(2):
+            with pool.request("GET", server.url + "/a", {}) as res:
+                res.read()
+
+    assert pool.misses == 2
+    assert pool.hits == 0
+
+
+def test_unread_response_is_not_reused():
+    pool = ConnectionPool(2, 30)
+
+    with LocalServer() as server:
+        server.routes["/a"] = lambda h: (200, {}, b"a" * 100)
+
+        with pool.request("GET", server.url + "/a", {}) as res:
+            res.read(10)
+
+        with pool.request("GET", server.url + "/a", {}) as res:
+            assert len(res.read()) == 100
+
+    assert pool.hits == 0
+
+
+def test_redirect():
+    with LocalServer() as server:
+        server.routes["/old"] = lambda h: (301, {"Location": "/new"}, b"")
+        server.routes["/new"] = lambda h: (200, {}, b"moved")
+
+        with _request("GET", server.url + "/old", {}) as res:
+            assert res.read() == b"moved"
+
+
+def test_read_past_end_releases_once():
+    pool = ConnectionPool(2, 30)
+
+    with LocalServer() as server:
+        server.routes["/"] = lambda h: (200, {}, b"abc")
+
+        with pool.request("GET", server.url + "/", {}) as res:
+            assert res.read(16) == b"abc"
+            assert res.read(16) == b""
+            assert res.read(16) == b""
+
+        assert pool.stats()["idle"] == 1
+
+
+def test_post_is_not_sent_on_idle_connection():
+    pool = ConnectionPool(2, 30)
+
+    def drop(handler):
+        # The server closes the connection after answering, without telling the client
+        handler.close_connection = True
+        return (200, {}, b"aaa")
+
+    with LocalServer() as server:
+        server.routes["/a"] = drop
+        server.routes["/post"] = lambda h: (200, {}, b"posted")
+
+        with pool.request("GET", server.url + "/a", {}) as res:
+            res.read()
+
+        time.sleep(0.1)
+
+        with pool.request("POST", server.url + "/post", {}, b"body") as res:
+            assert res.read() == b"posted"
+
+    assert pool.hits == 0
@@ -0,0 +1,89 @@
+import socket
+import threading
+from urllib.error import HTTPError, URLError
+
+import pytest
+
+from gochan.models.post_queue import PostQueue, PostStatus
+from gochan.models.thread import Thread
+from gochan.parser import PostResultParser
+
+SUCCESS = "<html><head><title>書きこみました。</title></head><body>書きこみが終わりました。<br><br></body></html>"
+ERROR = "<html><head><title>ＥＲＲＯＲ！</title></head><body><b>ＥＲＲＯＲ：本文がありません！</b></body></html>"
+
+
+class FakeThread(Thread):
+    def __init__(self, results):
+        super().__init__("server", "board", "1600000000")
+        self.results = results
+        self.updated = threading.Event()
+
+    async def post_async(self, name, mail, message):
+        result = self.results.pop(0)
+
+        if isinstance(result, Exception):
+            raise result
+
+        return result
+
+    async def fetch_update_async(self):
+        return ("html", None)
+
+    def apply_update(self, endpoint, doc):
+        self.updated.set()
+
+
+def _wait(queue: PostQueue, thread: Thread):
+    statuses = []
+    done = threading.Event()
+
+    def changed(e):
+        statuses.append(e.sender.status)
+
+        if e.sender.is_finished:
+            done.set()
+
+    queue.on_property_changed.add(changed)
+    job = queue.submit(thread, "", "sage", "本文")
+    assert done.wait(5)
+
+    return (job, statuses)
+
+
+def test_parse_post_result():
+    assert PostResultParser(SUCCESS).is_success()
+    assert PostResultParser(SUCCESS).message() == "書きこみが終わりました。"
+    assert not PostResultParser(ERROR).is_success()
+    assert PostResultParser(ERROR).message() == "ＥＲＲＯＲ：本文がありません！"
+
+
+def test_retry_then_update(pump):
+    thread = FakeThread([URLError(ConnectionRefusedError()), SUCCESS])
+    (job, statuses) = _wait(PostQueue(2, 0.01), thread)
+
+    assert statuses == [PostStatus.SENDING, PostStatus.RETRYING, PostStatus.SENDING, PostStatus.DONE]
+    assert job.attempts == 2
+    assert thread.updated.wait(5)
+
+
+@pytest.mark.parametrize("error", [URLError(socket.timeout("timed out")), HTTPError("url", 500, "Error", None, None)])
+def test_maybe_delivered_is_not_retried(pump, error):
+    (job, statuses) = _wait(PostQueue(2, 0.01), FakeThread([error]))
+
+    assert statuses == [PostStatus.SENDING, PostStatus.FAILED]
+    assert "Check the thread" in job.message
+
+
+def test_client_error_is_not_retried(pump):
+    thread = FakeThread([HTTPError("url", 403, "Forbidden", None, None)])
+    (job, statuses) = _wait(PostQueue(2, 0.01), thread)
+
+    assert statuses == [PostStatus.SENDING, PostStatus.FAILED]
+    assert job.message == "Forbidden"
+
+
+def test_error_page_fails(pump):
+    (job, statuses) = _wait(PostQueue(2, 0.01), FakeThread([ERROR]))
+
+    assert statuses[-1] == PostStatus.FAILED
+    assert "本文がありません" in job.message
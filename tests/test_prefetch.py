@@ -0,0 +1,35 @@
+import asyncio
+
+import gochan.models.prefetch
+from gochan.models.prefetch import ImagePrefetcher
+
+
+class _Cache:
+    def contains(self, file_name):
+        return False
+
+    def file_path(self, file_name):
+        return file_name
+
+    def trim(self):
+        pass
+
+
+def test_workers_share_budget(monkeypatch):
+    limits = []
+
+    async def save_image(url, path, max_bytes):
+        limits.append(max_bytes)
+        await asyncio.sleep(0.01)
+        # Every image is as large as it's allowed to be
+        return max_bytes
+
+    monkeypatch.setattr(gochan.models.prefetch, "image_cache", _Cache())
+    monkeypatch.setattr(gochan.models.prefetch, "MAX_IMAGE_SIZE", 40)
+    monkeypatch.setattr(gochan.models.prefetch.aio, "save_image", save_image)
+
+    prefetcher = ImagePrefetcher(10, 100, 2)
+    asyncio.run(prefetcher._prefetch([f"https://example.com/{i}.png" for i in range(5)], 0))
+
+    assert limits == [40, 40, 20]
+    assert prefetcher._bytes == 100
@@ -0,0 +1,156 @@
+import gochan.models.thread
+from bench.parser import make_page
+from gochan.client import Document
+from gochan.event_handler import CollectionChangedEventKind
+from gochan.models.thread import Response, Thread
+from gochan.parser import RawMessage
+
+
+def _responses(start: int, end: int):
+    return [Response(i, "名無しさん", "", "", "abcdefgh0", str(i)) for i in range(start, end + 1)]
+
+
+def _thread():
+    thread = Thread("server", "board", "1")
+    thread.responses = _responses(1, 1) + _responses(51, 100)
+    thread.missing = [(101, None), (2, 50)]
+    return thread
+
+
+def test_merge_fills_gap_in_order():
+    thread = _thread()
+    events = []
+    thread.on_collection_changed.add(events.append)
+
+    thread.merge(_responses(31, 50), 31, 50)
+    thread.merge(_responses(2, 30), 2, 30)
+
+    assert [r.number for r in thread.responses] == list(range(1, 101))
+    assert thread.missing == [(101, None)]
+    assert [e.kind for e in events] == [CollectionChangedEventKind.ADD] * 2
+
+
+def test_merge_appends_newer_responses():
+    thread = _thread()
+    events = []
+    thread.on_collection_changed.add(events.append)
+
+    thread.merge(_responses(95, 110), 101, None)
+
+    assert thread.last_number == 110
+    assert thread.missing == [(2, 50)]
+    assert events[0].kind == CollectionChangedEventKind.EXTEND
+    assert [r.number for r in events[0].item] == list(range(101, 111))
+
+
+def test_serialize_keeps_missing():
+    thread = _thread()
+    assert Thread.deserialize(thread.serialize()).missing == thread.missing
+
+
+def test_serialize_keeps_tokens():
+    thread = _thread()
+    thread.responses[0] = Response(1, "名無しさん", "", "", "abcdefgh0", ">>2 https://example.com/a.png")
+    s = thread.serialize()
+    r = Thread.deserialize(s).responses[0]
+
+    assert '"message"' not in s
+    assert r.message == ">>2 https://example.com/a.png"
+    assert r.tokens == thread.responses[0].tokens
+
+
+def test_deserialize_message_without_tokens():
+    s = '{"server": "s", "board": "b", "key": "1", "title": "t", "is_pastlog": false, "responses": ' \
+        '[{"number": 1, "name": "n", "mail": "", "date": "", "id": "ID:a", "message": ">>1"}]}'
+
+    assert Thread.deserialize(s).responses[0].tokens[0].kind == "anchor"
+
+
+def test_serialize_keeps_raw_message():
+    thread = _thread()
+    raw = RawMessage("&gt;&gt;2 <br> 本文", False)
+    thread.responses[0] = Response(1, "名無しさん", "", "", "abcdefgh0", None, raw=raw)
+    r = Thread.deserialize(thread.serialize()).responses[0]
+
+    assert r.raw.to_list() == raw.to_list()
+    assert r.message == ">>2\n本文"
+    assert r.raw is None
+
+
+def test_update_appends_only_new_responses():
+    thread = Thread("server", "board", "1")
+    thread._init("html", Document(make_page(3), None))
+
+    # /4- has response 1 followed by the new ones
+    page = make_page(5)
+    page = page[:page.find('<div class="post" id="2"')] + page[page.find('<div class="post" id="4"'):]
+    events = []
+    thread.on_collection_changed.add(events.append)
+    thread._update("html", Document(page, None))
+
+    assert [r.number for r in thread.responses] == [1, 2, 3, 4, 5]
+    assert [r.number for r in events[0].item] == [4, 5]
+    assert thread.title == "スレッド"
+
+
+def test_deserialize_dat_size_without_count():
+    s = '{"server": "s", "board": "b", "key": "1", "title": "t", "is_pastlog": false, "dat_size": 100, ' \
+        '"responses": [{"number": 1, "name": "n", "mail": "", "date": "", "id": "ID:a", "message": "本文"}]}'
+    t = Thread.deserialize(s)
+
+    assert (t.dat_size, t.dat_count) == (0, 0)
+
+
+def _page(count: int, start: int, end: int) -> str:
+    # read.cgi always puts response 1 before the requested ones
+    page = make_page(count)
+    head = page.find('<div class="post" id="2"')
+    tail = page.find("</div></body></html>")
+    first = page.find('<div class="post" id="{}"'.format(max(start, 2)))
+    last = page.find('<div class="post" id="{}"'.format(end + 1)) if end < count else tail
+
+    return page[:head] + page[first:last] + page[tail:]
+
+
+def _open(monkeypatch, around, count: int = 200):
+    requests = []
+
+    def get_last(server, board, key, n):
+        requests.append(("last", n))
+        return Document(_page(count, count - n + 1, count), None)
+
+    def get_range(server, board, key, start, end):
+        requests.append(("range", start, end))
+        return Document(_page(count, start, min(end, count)), None)
+
+    monkeypatch.setattr(gochan.models.thread, "get_last_responses_document", get_last)
+    monkeypatch.setattr(gochan.models.thread, "get_responses_range_document", get_range)
+
+    thread = Thread("server", "board", "1")
+    thread.init_progressive(around)
+
+    return (thread, requests)
+
+
+def test_init_progressive_fetches_tail(monkeypatch):
+    (thread, requests) = _open(monkeypatch, None)
+
+    assert requests == [("last", 50)]
+    assert [r.number for r in thread.responses] == [1] + list(range(151, 201))
+    assert thread.missing == [(2, 150)]
+
+
+def test_init_progressive_fetches_around_bookmark(monkeypatch):
+    (thread, requests) = _open(monkeypatch, 100)
+
+    assert requests == [("range", 75, 125)]
+    assert [r.number for r in thread.responses] == [1] + list(range(75, 126))
+    assert thread.missing == [(126, None), (2, 74)]
+
+
+def test_init_progressive_fetches_from_top_for_early_bookmark(monkeypatch):
+    (thread, requests) = _open(monkeypatch, 10)
+
+    assert requests == [("range", 1, 35)]
+    assert [r.number for r in thread.responses] == list(range(1, 36))
+    assert thread.missing == [(36, None)]
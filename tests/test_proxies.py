@@ -0,0 +1,129 @@
+from urllib.error import HTTPError, URLError
+
+import pytest
+
+import gochan.client
+from gochan.client import _read_text, get_dat_document, get_dat_documents, proxy_stats
+from gochan.client.breaker import CircuitBreaker
+from gochan.client.proxies import ProxyPool
+from tests.server import LocalServer
+from tests.test_dat import _dat
+
+# Nothing listens here, so connecting fails at once
+DEAD = "127.0.0.1:1"
+
+
+def test_round_robin():
+    pool = ProxyPool(["a", "b", "c"], 60)
+
+    for p in ["a", "b", "c"]:
+        pool.record(p, 0.1)
+
+    assert pool.order() == ["a", "b", "c"]
+    assert pool.order() == ["b", "c", "a"]
+    assert pool.order() == ["c", "a", "b"]
+
+
+def test_unhealthy_proxies_go_last():
+    pool = ProxyPool(["a", "b", "c"], 60)
+    pool.record("a", 0.1)
+    pool.record("b", 1.0)
+    pool.record("c", 0.1)
+    pool.failed("c")
+
+    assert pool.order() == ["a", "b", "c"]
+    assert pool.order() == ["a", "b", "c"]
+    assert pool.stats()["c"]["cooling"]
+
+
+def test_cooldown_ends():
+    pool = ProxyPool(["a", "b"], 0)
+    pool.record("b", 0.1)
+    pool.failed("a")
+
+    # a has only failed, so it's still behind b but no longer cooling
+    assert pool.order() == ["b", "a"]
+    assert not pool.stats()["a"]["cooling"]
+
+
+def _proxy_server(server: LocalServer, count: int):
+    # Requests through a proxy carry the absolute url
+    for i in range(count):
+        server.routes[f"http://a.5ch.net:80/b/dat/{1000000000 + i}.dat"] = lambda handler: (200, {}, _dat(3))
+
+
+def test_fail_over_to_next_proxy(monkeypatch):
+    with LocalServer() as server:
+        _proxy_server(server, 1)
+        live = server.url.replace("http://", "")
+        monkeypatch.setattr(gochan.client, "proxies", ProxyPool([DEAD, live], 60))
+
+        doc = get_dat_document("a", "b", "1000000000")
+        assert doc.size == len(_dat(3))
+
+        stats = proxy_stats()
+        assert stats[DEAD]["cooling"]
+        assert stats[live]["latency"] is not None
+
+        # The dead one isn't tried again while it cools down
+        get_dat_document("a", "b", "1000000000")
+        assert gochan.client.proxies.order()[-1] == DEAD
+
+
+def test_batch_survives_dead_proxy(monkeypatch):
+    with LocalServer() as server:
+        _proxy_server(server, 5)
+        live = server.url.replace("http://", "")
+        monkeypatch.setattr(gochan.client, "proxies", ProxyPool([DEAD, live], 60))
+
+        threads = [("a", "b", str(1000000000 + i)) for i in range(5)] + [("a", "b", "1999999999")]
+        results = get_dat_documents(threads)
+
+        assert [r.size for r in results[:5]] == [len(_dat(3))] * 5
+        # Not found is an answer of the server, so it's returned rather than failed over
+        assert results[5].code == 404
+        assert len(server.requests) == 6
+
+
+def test_server_error_is_not_blamed_on_proxy(monkeypatch):
+    monkeypatch.setattr(gochan.client, "breaker", CircuitBreaker(1, 60))
+
+    with LocalServer() as server, LocalServer() as other:
+        server.routes["http://a.5ch.net:80/b/dat/1000000000.dat"] = lambda handler: (500, {}, b"")
+        other.routes["http://a.5ch.net:80/b/dat/1000000000.dat"] = lambda handler: (200, {}, _dat(3))
+        (live, spare) = (server.url.replace("http://", ""), other.url.replace("http://", ""))
+        monkeypatch.setattr(gochan.client, "proxies", ProxyPool([live, spare], 60))
+
+        with pytest.raises(HTTPError) as e:
+            get_dat_document("a", "b", "1000000000")
+
+        assert e.value.code == 500
+        assert len(other.requests) == 0
+        assert not proxy_stats()[live]["cooling"]
+        assert not gochan.client.breaker.is_open(live)
+
+        # A bad gateway is the proxy's own failure
+        server.routes["http://a.5ch.net:80/b/dat/1000000000.dat"] = lambda handler: (502, {}, b"")
+        monkeypatch.setattr(gochan.client, "proxies", ProxyPool([live, spare], 60))
+
+        assert get_dat_document("a", "b", "1000000000").size == len(_dat(3))
+        assert proxy_stats()[live]["cooling"]
+        assert gochan.client.breaker.is_open(live)
+
+
+class _CutOffResponse:
+    def getheader(self, name):
+        return None
+
+    def read(self, size=None):
+        raise ConnectionResetError()
+
+
+def test_read_error_blames_proxy(monkeypatch):
+    monkeypatch.setattr(gochan.client, "breaker", CircuitBreaker(1, 60))
+
+    with pytest.raises(URLError):
+        _read_text("http://a.5ch.net:80/b/dat/1000000000.dat", _CutOffResponse(), DEAD)
+
+    assert gochan.client.breaker.is_open(DEAD)
+    assert not gochan.client.breaker.is_open("a.5ch.net")
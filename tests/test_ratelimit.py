@@ -0,0 +1,84 @@
+import threading
+import time
+
+import gochan.client
+from gochan.client import _get_content
+from gochan.client.priority import Priority
+from gochan.client.ratelimit import RateLimiter, TokenBucket
+from gochan.client.scheduler import Scheduler
+from tests.server import LocalServer
+
+
+def test_rate():
+    bucket = TokenBucket(20, 1)
+    start = time.monotonic()
+
+    for _ in range(5):
+        bucket.acquire()
+
+    assert time.monotonic() - start >= 0.15
+
+
+def test_interactive_goes_first():
+    bucket = TokenBucket(10, 1)
+    bucket.acquire()
+    order = []
+
+    def take(p):
+        bucket.acquire(p)
+        order.append(p)
+
+    background = [threading.Thread(target=take, args=(Priority.PREFETCH,)) for _ in range(3)]
+
+    for t in background:
+        t.start()
+
+    time.sleep(0.01)
+    interactive = threading.Thread(target=take, args=(Priority.INTERACTIVE,))
+    interactive.start()
+
+    for t in background + [interactive]:
+        t.join()
+
+    assert order[0] == Priority.INTERACTIVE
+
+
+def test_backoff():
+    bucket = TokenBucket(100, 10)
+    bucket.throttled(0.2)
+    assert bucket.rate == 50
+
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.15
+
+    bucket.succeeded()
+    assert bucket.rate == 60
+
+
+def test_retry_on_503():
+    responses = [(503, {"Retry-After": "0"}, b""), (200, {}, b"ok")]
+
+    with LocalServer() as server:
+        server.routes["/a"] = lambda h: responses.pop(0)
+        assert _get_content(server.url + "/a") == "ok"
+
+
+def test_throttled_host_gives_slot_back(monkeypatch):
+    monkeypatch.setattr(gochan.client, "limiter", RateLimiter(100, 1))
+    monkeypatch.setattr(gochan.client, "scheduler", Scheduler(1, {Priority.INTERACTIVE: 1}))
+
+    with LocalServer() as server:
+        server.routes["/a"] = lambda h: (200, {}, b"ok")
+        gochan.client.limiter.throttled("localhost", 1)
+
+        slow = threading.Thread(target=_get_content, args=(server.url.replace("127.0.0.1", "localhost") + "/a",))
+        slow.start()
+        time.sleep(0.05)
+
+        # Another host isn't kept waiting for the throttled one's slot
+        start = time.monotonic()
+        assert _get_content(server.url + "/a") == "ok"
+        assert time.monotonic() - start < 0.5
+
+        slow.join()
@@ -0,0 +1,55 @@
+from gochan.client import _get_content, redirect_listeners
+from gochan.models.favorites import FavoriteBoard, FavoriteThread, Favorites
+from gochan.models.relocation import BoardResolver, board_move
+from tests.server import LocalServer
+
+
+def test_board_move():
+    assert board_move("https://hayabusa9.5ch.net/news/subject.txt",
+                      "https://asahi.5ch.net/news/subject.txt") == ("news", "asahi")
+    assert board_move("https://asahi.5ch.net/test/read.cgi/news/1600000000/1-",
+                      "https://hayabusa9.5ch.net/test/read.cgi/news/1600000000/1-") == ("news", "hayabusa9")
+    assert board_move("https://asahi.5ch.net/news/subject.txt", "https://asahi.5ch.net/news/subject.txt") is None
+    assert board_move("https://asahi.5ch.net/news/subject.txt", "https://asahi.5ch.net/tech/subject.txt") is None
+    assert board_move("https://asahi.5ch.net/news/subject.txt", "https://example.com/news/") is None
+    assert board_move("https://asahi.5ch.net/news/dat/1600000000.dat",
+                      "https://hayabusa9.5ch.net/news/dat/1600000000.dat") == ("news", "hayabusa9")
+    assert board_move("https://asahi.5ch.net/test/bbs.cgi", "https://hayabusa9.5ch.net/test/bbs.cgi") is None
+
+
+def test_resolver_round_trip():
+    resolver = BoardResolver()
+    assert resolver.resolve("asahi", "news") == "asahi"
+
+    resolver.update("news", "hayabusa9")
+    assert resolver.resolve("asahi", "news") == "hayabusa9"
+
+    restored = BoardResolver()
+    restored.deserialize(resolver.serialize())
+    assert restored.resolve("asahi", "news") == "hayabusa9"
+
+
+def test_relocate_favorites():
+    favorites = Favorites()
+    favorites.list = [FavoriteThread("スレ", "asahi", "news", "1600000000"), FavoriteBoard("ニュース", "asahi", "news"),
+                      FavoriteBoard("技術", "asahi", "tech")]
+
+    favorites.relocate("news", "hayabusa9")
+    assert [x.server for x in favorites.list] == ["hayabusa9", "hayabusa9", "asahi"]
+
+
+def test_redirects_are_reported():
+    seen = []
+
+    with LocalServer() as server:
+        server.routes["/old"] = lambda h: (301, {"Location": "/new"}, b"")
+        server.routes["/new"] = lambda h: (200, {}, b"moved")
+
+        redirect_listeners.append(lambda url, new_url: seen.append((url, new_url)))
+
+        try:
+            assert _get_content(server.url + "/old") == "moved"
+        finally:
+            redirect_listeners.pop()
+
+    assert seen == [(server.url + "/old", server.url + "/new")]
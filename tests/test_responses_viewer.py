@@ -0,0 +1,71 @@
+from bench.parser import make_dat
+from gochan.models.thread import Response
+from gochan.parser import ThreadParserD
+from gochan.widgets.responses_viewer import ResponsesViewer, _convert_to_buffer
+from gochan.widgets.richtext import Brush, DEFALUT_KEYBINDINGS
+
+BRUSHES = {k: Brush(7, 0, 0) for k in [
+    "normal", "number_normal", "number_highlight1", "number_highlight2", "name", "id_normal", "id_highlight1",
+    "id_highlight2", "bookmark"
+]}
+
+
+def _viewer(count: int):
+    responses = [Response.from_dict(r) for r in ThreadParserD(make_dat(count)).responses(lazy=True)]
+    ids = {}
+
+    for r in responses:
+        ids.setdefault(r.id, []).append(r)
+
+    viewer = ResponsesViewer(10, BRUSHES, DEFALUT_KEYBINDINGS)
+    (viewer._w, viewer._h) = (40, 10)
+    viewer.set_data(responses, {}, ids, 150)
+
+    return (viewer, responses, ids)
+
+
+def _text(buf):
+    return ["".join(c.ch for c in line) for line in buf]
+
+
+def test_only_what_is_shown_is_decoded():
+    (viewer, responses, ids) = _viewer(200)
+    viewer.scroll_to_bookmark()
+
+    # Just below the bookmark line
+    assert viewer.get_first_response_displayed() == 151
+    # Messages without links are left undecoded until they come near the screen
+    assert responses[0].raw is not None
+    assert responses[-1].raw is not None
+
+    viewer.go_to_bottom()
+    assert responses[-1].raw is None
+    assert viewer.get_last_respones_displayed() == 200
+
+
+def test_same_as_full_render():
+    (viewer, responses, ids) = _viewer(100)
+    viewer.jump_to(50)
+
+    # Scroll up to the top and down to the bottom, so that everything is rendered around response 50
+    for _ in range(100):
+        viewer.page_up()
+
+    for _ in range(100):
+        viewer.page_down()
+
+    (buf, anchors) = _convert_to_buffer(responses, {}, ids, 150, 40, BRUSHES)
+
+    assert _text(viewer.value) == _text(buf)
+    assert viewer._anchors == anchors
+
+
+def test_set_data_keeps_position_when_older_responses_are_added():
+    (viewer, responses, ids) = _viewer(100)
+    partial = responses[:1] + responses[40:]
+    viewer.set_data(partial, {}, ids, 150)
+    viewer.jump_to(60)
+    assert viewer.get_first_response_displayed() == 60
+
+    viewer.set_data(responses, {}, ids, 150)
+    assert viewer.get_first_response_displayed() == 60
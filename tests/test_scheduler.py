@@ -0,0 +1,121 @@
+import threading
+import time
+
+from gochan.client.priority import Priority
+from gochan.client.scheduler import Scheduler
+
+
+def _hold(scheduler: Scheduler, p: Priority, started: list, release: threading.Event):
+    with scheduler.slot(p):
+        started.append(p)
+        release.wait(5)
+
+
+def test_interactive_bypasses_total():
+    scheduler = Scheduler(1, {Priority.INTERACTIVE: 2, Priority.PREFETCH: 1})
+    release = threading.Event()
+    started = []
+    threads = [threading.Thread(target=_hold, args=(scheduler, p, started, release))
+               for p in [Priority.PREFETCH, Priority.PREFETCH, Priority.INTERACTIVE]]
+
+    for t in threads:
+        t.start()
+        time.sleep(0.02)
+
+    assert started == [Priority.PREFETCH, Priority.INTERACTIVE]
+    assert scheduler.stats()["prefetch"] == {"running": 1, "waiting": 1}
+
+    release.set()
+
+    for t in threads:
+        t.join()
+
+    assert len(started) == 3
+
+
+def test_higher_class_goes_first():
+    scheduler = Scheduler(1, {})
+    release = threading.Event()
+    started = []
+    first = threading.Thread(target=_hold, args=(scheduler, Priority.ARCHIVAL, started, release))
+    first.start()
+    time.sleep(0.02)
+
+    waiting = [threading.Thread(target=_hold, args=(scheduler, p, started, release))
+               for p in [Priority.ARCHIVAL, Priority.PREFETCH, Priority.VISIBLE_REFRESH]]
+
+    for t in waiting:
+        t.start()
+        time.sleep(0.02)
+
+    release.set()
+
+    for t in [first] + waiting:
+        t.join()
+
+    assert started == [Priority.ARCHIVAL, Priority.VISIBLE_REFRESH, Priority.PREFETCH, Priority.ARCHIVAL]
+
+
+def test_yield_to_higher():
+    scheduler = Scheduler(1, {})
+    started = []
+    resumed = []
+
+    def transfer():
+        with scheduler.slot(Priority.PREFETCH) as p:
+            started.append(p)
+            time.sleep(0.05)
+            scheduler.yield_to_higher(p)
+            resumed.append(p)
+
+    def refresh():
+        with scheduler.slot(Priority.VISIBLE_REFRESH) as p:
+            started.append(p)
+
+    t1 = threading.Thread(target=transfer)
+    t1.start()
+    time.sleep(0.02)
+    t2 = threading.Thread(target=refresh)
+    t2.start()
+    t1.join()
+    t2.join()
+
+    assert started == [Priority.PREFETCH, Priority.VISIBLE_REFRESH]
+    assert resumed == [Priority.PREFETCH]
+    assert scheduler.stats()["prefetch"] == {"running": 0, "waiting": 0}
+
+
+def test_yield_without_waiters():
+    scheduler = Scheduler(1, {})
+
+    with scheduler.slot(Priority.ARCHIVAL) as p:
+        scheduler.yield_to_higher(p)
+        assert scheduler.stats()["archival"]["running"] == 1
+
+
+def test_released_slot_can_be_taken():
+    scheduler = Scheduler(1, {Priority.INTERACTIVE: 1})
+    release = threading.Event()
+    started = []
+
+    def wait_outside():
+        with scheduler.slot(Priority.INTERACTIVE):
+            with scheduler.released():
+                release.wait(5)
+
+            started.append("again")
+
+    t = threading.Thread(target=wait_outside)
+    t.start()
+    time.sleep(0.02)
+
+    with scheduler.slot(Priority.INTERACTIVE):
+        started.append("other")
+        release.set()
+        time.sleep(0.02)
+        assert started == ["other"]
+
+    t.join()
+
+    assert started == ["other", "again"]
+    assert scheduler.stats()["interactive"]["running"] == 0
@@ -0,0 +1,37 @@
+import threading
+import time
+
+from gochan.client.singleflight import SingleFlight
+
+
+def test_concurrent_calls_are_coalesced():
+    flight = SingleFlight()
+    count = 0
+    results = []
+
+    def fetch():
+        nonlocal count
+        count += 1
+        time.sleep(0.2)
+        return "subject"
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do("url", fetch))) for _ in range(5)]
+
+    for t in threads:
+        t.start()
+
+    for t in threads:
+        t.join()
+
+    assert count == 1
+    assert results == ["subject"] * 5
+    assert flight.deduplicated == 4
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_sequential_calls_are_not_coalesced():
+    flight = SingleFlight()
+
+    assert flight.do("url", lambda: 1) == 1
+    assert flight.do("url", lambda: 2) == 2
+    assert flight.deduplicated == 0